@@ -0,0 +1,260 @@
+"""
+agents/backends.py
+
+LLM backends the stylist agent can run on, selected by name.
+
+- "gemini": LangChain + ChatGoogleGenerativeAI (GOOGLE_API_KEY)
+- "openai": LangChain + ChatOpenAI (OPENAI_API_KEY)
+- "fake":   local, deterministic stand-in. Builds schema-valid AIRecommendations
+            from the real drawer ids, with configurable latency and error
+            injection; no network. For benchmarks, soak tests and CI.
+
+Register more with @register_backend("name"). Which one runs is chosen by the
+STYLIST_LLM_BACKEND setting (see agents/style_agent.get_backend).
+
+LangChain and provider SDKs are imported when a backend is built, not when
+this module is imported, so Django startup doesn't pay for them.
+"""
+
+import random
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Type
+
+from agents.conf import get_setting
+from agents.encoders import estimate_tokens
+from agents.stylist_types import AIRecommendations, StylistRequestPayload
+
+
+BACKENDS: Dict[str, Type["StylistBackend"]] = {}
+
+
+def register_backend(name: str) -> Callable[[Type["StylistBackend"]], Type["StylistBackend"]]:
+    def decorator(cls: Type["StylistBackend"]) -> Type["StylistBackend"]:
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+class StylistBackend:
+    """
+    Interface every backend implements.
+    `messages` are chat messages ({"role", "content"}) without the system prompt;
+    `payload` is the validated request, for backends that don't read prompts.
+    `usage`, when given, is filled with the call's input_tokens/output_tokens.
+    """
+    name = ""
+    model_name = ""
+
+    def __init__(self, system_prompt: str):
+        self.system_prompt = system_prompt
+
+    def invoke(
+        self,
+        messages: List[dict],
+        *,
+        payload: StylistRequestPayload,
+        config: dict,
+        usage: Optional[dict] = None,
+    ) -> AIRecommendations:
+        raise NotImplementedError
+
+    def stream(
+        self,
+        messages: List[dict],
+        *,
+        payload: StylistRequestPayload,
+        usage: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """Yield the raw answer text (the JSON schema from the system prompt) as it arrives."""
+        raise NotImplementedError
+
+    def estimate_usage(self, messages: List[dict], answer: str, usage: Optional[dict]) -> None:
+        """Fill `usage` from text lengths, for providers that report nothing."""
+        if usage is None or usage.get("input_tokens"):
+            return
+        prompt = self.system_prompt + "".join(str(m.get("content", "")) for m in messages)
+        usage["input_tokens"] = estimate_tokens(prompt)
+        usage["output_tokens"] = estimate_tokens(answer)
+        usage["estimated"] = True
+
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed message chunk (content may be a str or a list of parts)."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def _add_usage(usage: Optional[dict], metadata: Optional[dict]) -> None:
+    """Accumulate LangChain usage_metadata ({"input_tokens", "output_tokens", ...})."""
+    if usage is None or not metadata:
+        return
+    for key in ("input_tokens", "output_tokens"):
+        usage[key] = usage.get(key, 0) + int(metadata.get(key) or 0)
+
+
+class LangChainBackend(StylistBackend):
+    """Chat model wrapped in a LangChain agent with ToolStrategy structured output."""
+
+    def __init__(self, system_prompt: str):
+        from langchain.agents import create_agent
+        from langchain.agents.structured_output import ToolStrategy
+
+        super().__init__(system_prompt)
+        self.llm = self.build_llm()
+        # Using ToolStrategy explicitly to force structured output:
+        self.agent = create_agent(
+            model=self.llm,
+            tools=[],  # no external tools for now; pure reasoning on given JSON
+            system_prompt=system_prompt,
+            response_format=ToolStrategy(AIRecommendations),
+        )
+
+    def build_llm(self):
+        raise NotImplementedError
+
+    def invoke(
+        self,
+        messages: List[dict],
+        *,
+        payload: StylistRequestPayload,
+        config: dict,
+        usage: Optional[dict] = None,
+    ) -> AIRecommendations:
+        result = self.agent.invoke({"messages": messages}, config=config)
+        for message in result.get("messages", []):
+            _add_usage(usage, getattr(message, "usage_metadata", None))
+        # `create_agent` with ToolStrategy returns your structured result here:
+        structured = result["structured_response"]
+        self.estimate_usage(messages, structured.model_dump_json(), usage)
+        return structured
+
+    def stream(
+        self,
+        messages: List[dict],
+        *,
+        payload: StylistRequestPayload,
+        usage: Optional[dict] = None,
+    ) -> Iterator[str]:
+        # Tool calls arrive in one piece, so stream the bare model instead of the agent
+        answer = []
+        for chunk in self.llm.stream([{"role": "system", "content": self.system_prompt}, *messages]):
+            _add_usage(usage, getattr(chunk, "usage_metadata", None))
+            text = _chunk_text(chunk)
+            answer.append(text)
+            yield text
+        self.estimate_usage(messages, "".join(answer), usage)
+
+
+@register_backend("gemini")
+class GeminiBackend(LangChainBackend):
+    def build_llm(self):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        self.model_name = get_setting("STYLIST_GEMINI_MODEL", "gemini-2.5-flash")
+        return ChatGoogleGenerativeAI(
+            model=self.model_name,
+            temperature=0.7,
+            google_api_key=get_setting("GOOGLE_API_KEY"),
+            timeout=float(get_setting("STYLIST_LLM_TIMEOUT", 25)),
+            max_retries=0,  # retries are handled by recommendations/resilience.py
+        )
+
+
+@register_backend("openai")
+class OpenAIBackend(LangChainBackend):
+    def build_llm(self):
+        from langchain_openai import ChatOpenAI
+
+        self.model_name = get_setting("STYLIST_OPENAI_MODEL", "gpt-4o-mini")
+        return ChatOpenAI(
+            model=self.model_name,
+            temperature=0.7,
+            api_key=get_setting("OPENAI_API_KEY"),
+            timeout=float(get_setting("STYLIST_LLM_TIMEOUT", 25)),
+            max_retries=0,  # retries are handled by recommendations/resilience.py
+        )
+
+
+class FakeBackendError(RuntimeError):
+    """Injected failure of the fake backend."""
+
+
+@register_backend("fake")
+class FakeBackend(StylistBackend):
+    """
+    Offline stand-in for load tests. Settings:
+    - STYLIST_FAKE_LATENCY_MS: simulated provider latency per call
+    - STYLIST_FAKE_JITTER_MS: extra uniform random latency on top
+    - STYLIST_FAKE_ERROR_RATE: probability (0..1) a call raises FakeBackendError
+    - STYLIST_FAKE_SEED: seed for jitter/error injection (reproducible runs)
+    """
+    model_name = "fake-stylist"
+    OUTFITS = 5
+    ITEMS_PER_OUTFIT = 3
+    STREAM_CHUNK_CHARS = 32
+
+    def __init__(self, system_prompt: str):
+        super().__init__(system_prompt)
+        self.latency_ms = float(get_setting("STYLIST_FAKE_LATENCY_MS", 0))
+        self.jitter_ms = float(get_setting("STYLIST_FAKE_JITTER_MS", 0))
+        self.error_rate = float(get_setting("STYLIST_FAKE_ERROR_RATE", 0))
+        self._random = random.Random(int(get_setting("STYLIST_FAKE_SEED", 0)))
+
+    def invoke(
+        self,
+        messages: List[dict],
+        *,
+        payload: StylistRequestPayload,
+        config: dict,
+        usage: Optional[dict] = None,
+    ) -> AIRecommendations:
+        self._simulate_call()
+        structured = self._build(payload)
+        self.estimate_usage(messages, structured.model_dump_json(), usage)
+        return structured
+
+    def stream(
+        self,
+        messages: List[dict],
+        *,
+        payload: StylistRequestPayload,
+        usage: Optional[dict] = None,
+    ) -> Iterator[str]:
+        self._simulate_call()
+        text = self._build(payload).model_dump_json()
+        self.estimate_usage(messages, text, usage)
+        for i in range(0, len(text), self.STREAM_CHUNK_CHARS):
+            yield text[i:i + self.STREAM_CHUNK_CHARS]
+
+    def _simulate_call(self) -> None:
+        delay_ms = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms:
+            time.sleep(delay_ms / 1000.0)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise FakeBackendError("Injected fake backend failure")
+
+    def _build(self, payload: StylistRequestPayload) -> AIRecommendations:
+        """Deterministic outfits: consecutive windows over the drawer ids."""
+        ids = [p.id for p in payload.drawer_products]
+        if not ids:
+            return AIRecommendations(recommendations=[])
+        size = min(self.ITEMS_PER_OUTFIT, len(ids))
+        recommendations = []
+        for n in range(self.OUTFITS):
+            start = (n * size) % len(ids)
+            product_ids = [ids[(start + k) % len(ids)] for k in range(size)]
+            recommendations.append({
+                "name": f"Fake Outfit {n + 1}",
+                "description": f"Fake outfit for {payload.occasion or 'any occasion'} in {payload.location or 'any city'}.",
+                "product_ids": product_ids,
+            })
+        return AIRecommendations(recommendations=recommendations)
@@ -0,0 +1,16 @@
+import os
+from typing import Any
+
+
+def get_setting(name: str, default: Any = None) -> Any:
+    """
+    Read an agent setting from Django settings when Django is configured,
+    else from the environment (so agents/ also works outside Django).
+    """
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, name, os.environ.get(name, default))
+    except ImportError:
+        pass
+    return os.environ.get(name, default)
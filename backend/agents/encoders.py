@@ -0,0 +1,111 @@
+"""
+agents/encoders.py
+
+How a StylistRequestPayload is written into the user message.
+
+- "json":    the original pretty-printed JSON inside a ```json fence.
+- "compact": key/value lines for the request fields plus a table for
+             drawer_products (header row once, then one `|`-separated row per
+             item), so field names aren't repeated for every product.
+
+Both carry the same fields; pick one per call or with STYLIST_PAYLOAD_ENCODER
+to compare input tokens, latency and quality.
+"""
+
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from agents.conf import get_setting
+from agents.stylist_types import StylistRequestPayload
+
+INTRO = "Here is the styling payload. Use it to generate outfit recommendations.\n\n"
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap tokenizer-free estimate: every punctuation mark is one token and
+    words cost one token per ~4 characters. Good enough to compare encodings.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_RE.findall(text))
+
+
+class PayloadEncoder:
+    name = ""
+
+    def encode(self, payload: StylistRequestPayload) -> str:
+        raise NotImplementedError
+
+    def estimate_item_tokens(self, item: Dict[str, Any]) -> int:
+        """Tokens one drawer product adds to the encoded payload."""
+        raise NotImplementedError
+
+
+class PrettyJSONEncoder(PayloadEncoder):
+    name = "json"
+
+    def encode(self, payload: StylistRequestPayload) -> str:
+        payload_json = payload.model_dump_json(indent=2)
+        return f"{INTRO}```json\n{payload_json}\n```"
+
+    def estimate_item_tokens(self, item: Dict[str, Any]) -> int:
+        return estimate_tokens(json.dumps(item, indent=2, default=str))
+
+
+class CompactTableEncoder(PayloadEncoder):
+    name = "compact"
+
+    # Preferred column order; any other keys follow alphabetically
+    COLUMNS = ("id", "title", "name", "category", "color", "description")
+
+    def encode(self, payload: StylistRequestPayload) -> str:
+        data = payload.model_dump(mode="json", by_alias=True)
+        products: List[Dict[str, Any]] = data.pop("drawer_products")
+        user_info: Dict[str, Any] = data.pop("user_info")
+
+        lines = [INTRO.rstrip("\n"), "(compact format: key=value fields, drawer_products as a `|` table)"]
+        lines.append("user_info: " + "; ".join(f"{k}={self._cell(v)}" for k, v in user_info.items() if v not in (None, "", [])))
+        for key, value in data.items():
+            if value not in (None, "", []):
+                lines.append(f"{key}: {self._cell(value)}")
+
+        columns = self._columns(products)
+        lines.append(f"drawer_products ({len(products)}):")
+        lines.append("|".join(columns))
+        for product in products:
+            lines.append("|".join(self._cell(product.get(c)) for c in columns))
+        return "\n".join(lines)
+
+    def estimate_item_tokens(self, item: Dict[str, Any]) -> int:
+        return estimate_tokens("|".join(self._cell(v) for v in item.values()))
+
+    def _columns(self, products: List[Dict[str, Any]]) -> List[str]:
+        present = {k for p in products for k, v in p.items() if v not in (None, "")}
+        ordered = [c for c in self.COLUMNS if c in present]
+        return ordered + sorted(present - set(ordered))
+
+    @staticmethod
+    def _cell(value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            value = ",".join(str(v) for v in value)
+        return " ".join(str(value).replace("|", "/").split())
+
+
+ENCODERS: Dict[str, PayloadEncoder] = {
+    PrettyJSONEncoder.name: PrettyJSONEncoder(),
+    CompactTableEncoder.name: CompactTableEncoder(),
+}
+
+
+def get_encoder(name: Optional[str] = None) -> PayloadEncoder:
+    """Encoder by name, defaulting to the STYLIST_PAYLOAD_ENCODER setting ("json")."""
+    name = name or get_setting("STYLIST_PAYLOAD_ENCODER", "json")
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown payload encoder: {name!r} (choose from {', '.join(ENCODERS)})")
@@ -0,0 +1,44 @@
+"""
+agents/metrics.py
+
+Metrics of the recommendation pipeline, served on /metrics/ (see common/metrics.py).
+
+- STAGE_SECONDS: wall time per stage, labelled `stage`:
+  load_context, resolve_destination, prune, build_payload, cache_lookup
+  (recommendations/services.py),
+  validate_payload, encode_prompt, llm_invoke, llm_stream (agents/style_agent.py),
+  rule_engine, recommend (the whole service call) and response_validation
+  (RecommendResponseSerializer in the view).
+- LLM_CALLS / LLM_TOKENS: calls and input/output tokens per backend and model.
+  Tokens are what the provider reports, or an estimate (agents/encoders.py)
+  when it doesn't (fake backend, providers without usage metadata).
+"""
+
+from common.metrics import Counter, Histogram
+
+
+STAGE_SECONDS = Histogram(
+    "stylegenie_recommendation_stage_seconds",
+    "Wall time of each recommendation pipeline stage.",
+    ["stage"],
+)
+
+LLM_CALLS = Counter(
+    "stylegenie_llm_calls_total",
+    "Stylist LLM calls by backend, model and outcome (ok/error).",
+    ["backend", "model", "outcome"],
+)
+
+LLM_TOKENS = Counter(
+    "stylegenie_llm_tokens_total",
+    "Stylist LLM tokens by backend, model and direction (input/output).",
+    ["backend", "model", "direction"],
+)
+
+
+def record_llm_call(backend: str, model: str, outcome: str, usage: dict) -> None:
+    LLM_CALLS.inc(backend=backend, model=model, outcome=outcome)
+    for direction in ("input", "output"):
+        tokens = usage.get(f"{direction}_tokens")
+        if tokens:
+            LLM_TOKENS.inc(tokens, backend=backend, model=model, direction=direction)
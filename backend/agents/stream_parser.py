@@ -0,0 +1,77 @@
+import json
+from typing import Any, Dict, List
+
+
+class RecommendationStreamParser:
+    """
+    Incremental parser for the agent's JSON answer:
+
+        {"recommendations": [ {...}, {...}, ... ]}
+
+    Feed it text as it arrives from the model; every time an element of the
+    "recommendations" array is closed, it is returned as a dict.
+    Markdown fences or chatter before the JSON are skipped.
+    """
+
+    KEY = '"recommendations"'
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0            # next char of buffer to scan
+        self._in_array = False   # found `"recommendations": [`
+        self._done = False       # array closed
+        self._depth = 0          # brace depth inside the current element
+        self._start = -1         # buffer index of the current element's "{"
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self.buffer += text
+        out: List[Dict[str, Any]] = []
+
+        if not self._in_array and not self._seek_array():
+            return out
+
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf) and not self._done:
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._start >= 0:
+                    out.append(json.loads(buf[self._start:i + 1]))
+                    self._start = -1
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+            i += 1
+        self._pos = i
+        return out
+
+    def _seek_array(self) -> bool:
+        """Move past `"recommendations": [` once it has fully arrived."""
+        key_at = self.buffer.find(self.KEY)
+        if key_at < 0:
+            return False
+        bracket_at = self.buffer.find("[", key_at + len(self.KEY))
+        if bracket_at < 0:
+            return False
+        self._in_array = True
+        self._pos = bracket_at + 1
+        return True
@@ -1,29 +1,37 @@
-import os
 import json
-from typing import Union
+import logging
+import threading
+from typing import Iterator, Optional, Sequence, Union
 
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import create_agent
-from langchain.agents.structured_output import ToolStrategy
 
-from agents.stylist_types import StylistRequestPayload, AIRecommendations
+from agents.backends import BACKENDS, StylistBackend
+from agents.conf import get_setting
+from agents.stylist_types import StylistRequestPayload, AIRecommendations, Recommendation
+from agents.stream_parser import RecommendationStreamParser
+from agents.encoders import get_encoder
+from agents.metrics import STAGE_SECONDS, record_llm_call
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 # --------- 1. System prompt that defines behavior --------- #
 
 SYSTEM_PROMPT = """
 You are an AI personal stylist for an app called StyleGenie.
 
-You receive a single JSON payload with:
+You receive a single payload (as JSON, or in a compact format where drawer_products
+is a table: a header row of field names, then one `|`-separated row per item) with:
 - user_info {gender, skin_tone, color_preferences, face_shape, body_shape}
 - drawer_products: array of wardrobe items the user actually owns (each has an id)
 - location: trip destination / city (e.g. "Dhaka", "NYC")
 - occasion: what they are dressing for (e.g. "business meeting", "wedding", "date night")
 - datetime: ISO8601 timestamp for when the user will wear the outfit
-  (You or the calling system can use this with the location to infer weather/season/time-of-day.)
+- local_time, time_of_day, season, temperature_band, avg_temp_c (optional): already
+  resolved for the location and datetime (avg_temp_c is the climate normal for that day).
+  When present, use them as given; only infer weather/season/time-of-day yourself when absent.
 
 Your job:
 - Propose 5 complete outfits using ONLY items from drawer_products.
@@ -49,70 +57,211 @@ No extra keys, no comments, no markdown, no natural language outside this JSON.
 """
 
 
-# --------- 2. Base LLM (Gemini) --------- #
+# --------- 2. LLM backend (Gemini / OpenAI / fake, see agents/backends.py) --------- #
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0.7,
-    google_api_key=os.environ.get("GOOGLE_API_KEY"),
-)
+_backend: Optional[StylistBackend] = None
+_backend_lock = threading.Lock()
 
 
-# --------- 3. Agent with structured output --------- #
+def get_backend() -> StylistBackend:
+    """
+    The backend named by the STYLIST_LLM_BACKEND setting, built on first use.
+    Thread-safe: concurrent first requests build it exactly once.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = get_setting("STYLIST_LLM_BACKEND", "gemini")
+                try:
+                    backend_cls = BACKENDS[name]
+                except KeyError:
+                    raise ValueError(f"Unknown LLM backend: {name!r} (choose from {', '.join(BACKENDS)})")
+                _backend = backend_cls(SYSTEM_PROMPT)
+    return _backend
 
-# Using ToolStrategy explicitly to force structured output:
-stylist_agent = create_agent(
-    model=llm,
-    tools=[],  # no external tools for now; pure reasoning on given JSON
-    system_prompt=SYSTEM_PROMPT,
-    response_format=ToolStrategy(AIRecommendations),
-    # You could also pass response_format=AIRecommendations and let it choose strategy
-)
 
+def warm_up() -> bool:
+    """
+    Build the backend ahead of the first request. Call it in each worker
+    process after fork (gunicorn.conf.py, Celery worker_process_init), never
+    before: provider clients hold sockets that must not be shared across forks.
+    Returns False (and logs) instead of raising, so a bad key can't kill a worker.
+    """
+    try:
+        get_backend()
+    except Exception:
+        logger.exception("Stylist backend warm-up failed; it will be retried on first use")
+        return False
+    return True
+
+
+# --------- 3. High-level helper to call the agent --------- #
+
+def _validate_payload(payload: Union[StylistRequestPayload, dict]) -> StylistRequestPayload:
+    if isinstance(payload, dict):
+        return StylistRequestPayload.model_validate(payload)
+    return payload
+
+
+def _build_user_message(payload_obj: StylistRequestPayload, encoder: Optional[str] = None) -> dict:
+    """Encode the payload (see agents/encoders.py) as the agent's user message."""
+    return {
+        "role": "user",
+        "content": get_encoder(encoder).encode(payload_obj),
+    }
 
-# --------- 4. High-level helper to call the agent --------- #
 
 def get_outfit_recommendations(
     payload: Union[StylistRequestPayload, dict],
-    thread_id: str = "style-session-1",
+    thread_id: Optional[str] = None,
+    encoder: Optional[str] = None,
+    usage: Optional[dict] = None,
 ) -> AIRecommendations:
     """
     - Validates input against StylistRequestPayload
-    - Sends it to the agent
+    - Sends it to the agent, encoded with `encoder` ("json" | "compact", default from settings)
     - Returns a validated AIRecommendations instance
+    - Fills `usage` (if given) with backend, model, input_tokens and output_tokens
     """
 
-    # 1) Validate + normalize payload into Pydantic model
-    if isinstance(payload, dict):
-        payload_obj = StylistRequestPayload.model_validate(payload)
-    else:
-        payload_obj = payload
+    # 1) Validate + serialize payload into the user message
+    with STAGE_SECONDS.time(stage="validate_payload"):
+        payload_obj = _validate_payload(payload)
+    with STAGE_SECONDS.time(stage="encode_prompt"):
+        user_message = _build_user_message(payload_obj, encoder)
 
-    # 2) Serialize to clean JSON for the model
-    payload_json = payload_obj.model_dump_json(indent=2)
+    # 2) Call the agent on the configured backend
+    return _invoke(user_message, payload_obj, thread_id, usage)
 
-    user_message = {
-        "role": "user",
-        "content": (
-            "Here is the styling payload. Use it to generate outfit recommendations.\n\n"
-            "```json\n"
-            f"{payload_json}\n"
-            "```"
-        ),
-    }
 
-    # 3) Optional config (thread_id gives you conversation separation later)
-    config = {"configurable": {"thread_id": thread_id}}
+def _invoke(
+    user_message: dict,
+    payload_obj: StylistRequestPayload,
+    thread_id: Optional[str],
+    usage: Optional[dict],
+) -> AIRecommendations:
+    """One agent call on the configured backend, with LLM metrics recorded."""
+    # thread_id (e.g. "user-<id>") separates conversations per user
+    config = {"configurable": {"thread_id": thread_id}} if thread_id else {}
+    backend = get_backend()
+    usage = {} if usage is None else usage
+    usage.update(backend=backend.name, model=backend.model_name)
+    outcome = "error"
+    try:
+        with STAGE_SECONDS.time(stage="llm_invoke"):
+            structured: AIRecommendations = backend.invoke(
+                [user_message],
+                payload=payload_obj,
+                config=config,
+                usage=usage,
+            )
+        outcome = "ok"
+    finally:
+        record_llm_call(backend.name, backend.model_name, outcome, usage)
 
-    # 4) Call the agent
-    result = stylist_agent.invoke(
-        {
-            "messages": [user_message],
-        },
-        config=config,
-    )
+    return structured
 
-    # `create_agent` with ToolStrategy returns your structured result here:
-    structured: AIRecommendations = result["structured_response"]
 
-    return structured
+# --------- 4. Refinement of a previous answer --------- #
+
+REFINE_INTRO = (
+    "Refine your previous recommendations. Apply the change request, keep everything "
+    "the user did not ask to change, and answer with all outfits in the same schema, "
+    "using only ids from drawer_products.\n\n"
+)
+
+
+def _build_refinement_message(
+    payload_obj: StylistRequestPayload,
+    previous: dict,
+    change_request: str,
+    earlier_requests: Sequence[str] = (),
+    encoder: Optional[str] = None,
+) -> dict:
+    """
+    The delta turn: the (small) checkpoint payload, the previous outfits as
+    name + product_ids (descriptions are rewritten anyway) and the change
+    request. The full wardrobe is not sent again. Uses the compact encoder
+    unless `encoder` says otherwise.
+    """
+    outfits = [
+        {"name": o["name"], "product_ids": o["product_ids"]}
+        for o in previous.get("recommendations") or []
+    ]
+    parts = [
+        REFINE_INTRO + get_encoder(encoder or "compact").encode(payload_obj),
+        "previous_recommendations: " + json.dumps(outfits, separators=(",", ":")),
+    ]
+    if earlier_requests:
+        parts.append("earlier change requests (already applied): " + " / ".join(earlier_requests))
+    parts.append(f"change request: {change_request}")
+    return {"role": "user", "content": "\n\n".join(parts)}
+
+
+def refine_outfit_recommendations(
+    payload: Union[StylistRequestPayload, dict],
+    previous: dict,
+    change_request: str,
+    earlier_requests: Sequence[str] = (),
+    thread_id: Optional[str] = None,
+    encoder: Optional[str] = None,
+    usage: Optional[dict] = None,
+) -> AIRecommendations:
+    """
+    Revise `previous` ({"recommendations": [...]}) according to `change_request`
+    ("swap the shoes in outfit 2"). `payload` carries only the items the model
+    may pick from (see recommendations/refinement.py).
+    """
+    with STAGE_SECONDS.time(stage="validate_payload"):
+        payload_obj = _validate_payload(payload)
+    with STAGE_SECONDS.time(stage="encode_prompt"):
+        user_message = _build_refinement_message(payload_obj, previous, change_request, earlier_requests, encoder)
+    return _invoke(user_message, payload_obj, thread_id, usage)
+
+
+# --------- 5. Streaming helper --------- #
+
+def stream_outfit_recommendations(
+    payload: Union[StylistRequestPayload, dict],
+    encoder: Optional[str] = None,
+    usage: Optional[dict] = None,
+) -> Iterator[Recommendation]:
+    """
+    Streaming counterpart of get_outfit_recommendations.
+
+    Provider tool calls arrive in one piece, so instead of the agent's
+    ToolStrategy the backend streams the same model with the same SYSTEM_PROMPT
+    (which already pins the JSON schema) and this yields each outfit as soon as
+    its object closes. Every outfit is validated against `Recommendation`.
+    """
+    with STAGE_SECONDS.time(stage="validate_payload"):
+        payload_obj = _validate_payload(payload)
+    with STAGE_SECONDS.time(stage="encode_prompt"):
+        user_message = _build_user_message(payload_obj, encoder)
+
+    backend = get_backend()
+    usage = {} if usage is None else usage
+    usage.update(backend=backend.name, model=backend.model_name)
+    parser = RecommendationStreamParser()
+    emitted = 0
+    outcome = "error"
+    # llm_stream covers the whole stream, including time the client spends reading it
+    try:
+        with STAGE_SECONDS.time(stage="llm_stream"):
+            for text in backend.stream([user_message], payload=payload_obj, usage=usage):
+                for item in parser.feed(text):
+                    emitted += 1
+                    yield Recommendation.model_validate(item)
+        outcome = "ok"
+    finally:
+        record_llm_call(backend.name, backend.model_name, outcome, usage)
+
+    # Model ignored the schema mid-way: fall back to parsing the whole answer
+    if not emitted:
+        text = parser.buffer.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+        try:
+            structured = AIRecommendations.model_validate_json(text)
+        except ValueError:
+            raise ValueError("AI returned an invalid response. Please try again.")
+        yield from structured.recommendations
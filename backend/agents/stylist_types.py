@@ -40,6 +40,13 @@ class StylistRequestPayload(BaseModel):
         alias="datetime",
         description="When the outfit will be worn (ISO8601 datetime).",
     )
+    # Resolved offline from location + datetime when the city is known
+    # (recommendations/gazetteer.py); the model doesn't have to infer them
+    local_time: Optional[str] = Field(default=None, description="Event time in the destination's timezone.")
+    time_of_day: Optional[str] = Field(default=None, description="morning | afternoon | evening | night (local).")
+    season: Optional[str] = Field(default=None, description="winter | spring | summer | autumn | tropical.")
+    temperature_band: Optional[str] = Field(default=None, description="freezing | cold | cool | mild | warm | hot.")
+    avg_temp_c: Optional[float] = Field(default=None, description="Climate normal for that day, in °C.")
 
 # ---------- Response types ----------
 
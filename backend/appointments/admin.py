@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import UpcomingEvent
+
+
+@admin.register(UpcomingEvent)
+class UpcomingEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "occasion", "destination", "event_datetime", "status", "attempts", "generated_at")
+    list_filter = ("status",)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('recommendations', '0004_recommendation_rec_user_digest_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpcomingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occasion', models.CharField(max_length=50)),
+                ('destination', models.CharField(max_length=100)),
+                ('event_datetime', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Waiting for generation'), ('queued', 'Generation queued'), ('ready', 'Outfits ready'), ('failed', 'Generation failed')], default='pending', max_length=10)),
+                ('revision', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('queued_at', models.DateTimeField(blank=True, null=True)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recommendation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upcoming_events', to='recommendations.recommendation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upcoming_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['event_datetime', 'id'],
+                'indexes': [models.Index(fields=['user', 'event_datetime'], name='event_user_datetime_idx'), models.Index(fields=['status', 'event_datetime'], name='event_status_datetime_idx')],
+            },
+        ),
+    ]
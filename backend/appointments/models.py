@@ -1,3 +1,49 @@
 from django.db import models
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+User = get_user_model()
+
+
+class UpcomingEvent(models.Model):
+    """
+    An event the user told us about ahead of time, so its outfits can be
+    generated off-peak (see appointments/services.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Waiting for generation"
+        QUEUED = "queued", "Generation queued"
+        READY = "ready", "Outfits ready"
+        FAILED = "failed", "Generation failed"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upcoming_events")
+    occasion = models.CharField(max_length=50)
+    destination = models.CharField(max_length=100)
+    event_datetime = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    # Bumped whenever the event or the user's wardrobe/profile changes; a
+    # generation started for an older revision is discarded
+    revision = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+    recommendation = models.ForeignKey(
+        "recommendations.Recommendation",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upcoming_events",
+    )
+    queued_at = models.DateTimeField(null=True, blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["event_datetime", "id"]
+        indexes = [
+            models.Index(fields=["user", "event_datetime"], name="event_user_datetime_idx"),
+            models.Index(fields=["status", "event_datetime"], name="event_status_datetime_idx"),
+        ]
+
+    def __str__(self):
+        return f"UpcomingEvent<{self.user_id} {self.occasion} @ {self.destination} {self.event_datetime:%Y-%m-%d %H:%M}>"
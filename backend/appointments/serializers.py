@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import UpcomingEvent
+
+
+class UpcomingEventSerializer(serializers.ModelSerializer):
+    """
+    An upcoming event; `recommendations` holds the pre-generated outfits once
+    `status` is "ready" (same shape as POST /client/recommendations/).
+    """
+    datetime = serializers.DateTimeField(source="event_datetime")
+    recommendation_id = serializers.IntegerField(read_only=True)
+    recommendations = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UpcomingEvent
+        fields = [
+            "id", "occasion", "destination", "datetime", "status", "last_error",
+            "recommendation_id", "recommendations", "generated_at", "created_at", "updated_at",
+        ]
+        read_only_fields = ["id", "status", "last_error", "generated_at", "created_at", "updated_at"]
+
+    def validate_datetime(self, value):
+        if value <= timezone.now():
+            raise serializers.ValidationError("Upcoming events must be in the future.")
+        return value
+
+    def validate(self, attrs):
+        request = self.context["request"]
+        if self.instance is None:
+            limit = getattr(settings, "APPOINTMENTS_MAX_UPCOMING", 20)
+            upcoming = UpcomingEvent.objects.filter(user=request.user, event_datetime__gt=timezone.now()).count()
+            if upcoming >= limit:
+                raise serializers.ValidationError(f"You can register at most {limit} upcoming events.")
+        return attrs
+
+    def get_recommendations(self, obj):
+        if obj.status != UpcomingEvent.Status.READY or obj.recommendation is None:
+            return None
+        return [
+            {"name": o.name, "description": o.description, "product_ids": o.product_ids}
+            for o in obj.recommendation.outfits.all()
+        ]
@@ -0,0 +1,149 @@
+"""
+appointments/services.py
+
+Off-peak pre-generation of outfits for upcoming events.
+
+Design:
+- Users register events (occasion, destination, datetime). A Celery beat job
+  (`appointments.pregenerate_due_events`, scheduled in CELERY_BEAT_SCHEDULE for
+  off-peak hours) claims a bounded batch of events starting within the horizon
+  and enqueues one generation task per event, spaced out so generation starts at
+  most APPOINTMENTS_PREGEN_RATE_PER_MINUTE calls per minute. The LLM admission
+  limits still apply on top.
+- A generation runs the normal pipeline (no rule-engine fallback) and stores
+  the answer in history. recommendations.services serves answers linked from an
+  event to any process, so opening the app on the day is a DB read instead of
+  an LLM call.
+- Every event carries a revision. Editing the event or changing the user's
+  wardrobe/profile bumps it and puts the event back to pending
+  (appointments/signals.py). A generation finishing for an older revision is
+  discarded and the next run regenerates the event.
+- Events left queued by a crashed worker are reclaimed after QUEUED_TIMEOUT;
+  failed ones are retried up to APPOINTMENTS_PREGEN_MAX_ATTEMPTS times.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils import timezone
+
+from recommendations.admission import AdmissionRejected
+from recommendations.services import pregenerate
+
+from .models import UpcomingEvent
+
+
+logger = logging.getLogger(__name__)
+
+# A queued event whose task never reported back is claimed again after this
+QUEUED_TIMEOUT = timedelta(hours=1)
+
+
+def _due_filter(now: datetime) -> Q:
+    Status = UpcomingEvent.Status
+    horizon = now + timedelta(hours=getattr(settings, "APPOINTMENTS_PREGEN_HORIZON_HOURS", 72))
+    max_attempts = getattr(settings, "APPOINTMENTS_PREGEN_MAX_ATTEMPTS", 3)
+    return Q(event_datetime__gt=now, event_datetime__lte=horizon) & (
+        Q(status=Status.PENDING)
+        | Q(status=Status.FAILED, attempts__lt=max_attempts)
+        | Q(status=Status.QUEUED, queued_at__lt=now - QUEUED_TIMEOUT)
+        | Q(status=Status.READY, recommendation__isnull=True)  # its history row was deleted
+    )
+
+
+def claim_due_events(now: Optional[datetime] = None, limit: Optional[int] = None) -> List[UpcomingEvent]:
+    """Mark up to `limit` due events (soonest first) as queued and return them."""
+    now = now or timezone.now()
+    limit = limit if limit is not None else getattr(settings, "APPOINTMENTS_PREGEN_BATCH", 30)
+    with transaction.atomic():
+        events = list(
+            UpcomingEvent.objects.select_for_update(skip_locked=True)
+            .filter(_due_filter(now))
+            .order_by("event_datetime", "id")[:limit]
+        )
+        if events:
+            UpcomingEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+                status=UpcomingEvent.Status.QUEUED, queued_at=now
+            )
+    return events
+
+
+def dispatch_due_events(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Claim a batch and enqueue one generation per event, evenly spaced."""
+    from .tasks import pregenerate_event_task
+
+    events = claim_due_events(now)
+    rate = getattr(settings, "APPOINTMENTS_PREGEN_RATE_PER_MINUTE", 6)
+    spacing = 60.0 / rate if rate > 0 else 0.0
+    for position, event in enumerate(events):
+        pregenerate_event_task.apply_async((event.pk, event.revision), countdown=position * spacing)
+    return {"dispatched": len(events), "spacing_seconds": spacing}
+
+
+def _finish(event_id: int, revision: int, **fields) -> bool:
+    """Apply `fields` unless the event changed since generation started."""
+    return bool(UpcomingEvent.objects.filter(pk=event_id, revision=revision).update(**fields))
+
+
+def pregenerate_event(event_id: int, revision: int) -> str:
+    """
+    Generate outfits for one claimed event. Returns the resulting status, or
+    "skipped" when the event was edited, invalidated or deleted meanwhile.
+    AdmissionRejected propagates so the task can retry after Retry-After.
+    """
+    event = UpcomingEvent.objects.filter(pk=event_id, revision=revision).first()
+    if event is None or event.status != UpcomingEvent.Status.QUEUED:
+        return "skipped"
+
+    try:
+        recommendation = pregenerate(
+            user_id=event.user_id,
+            destination=event.destination,
+            occasion=event.occasion,
+            dt_iso=event.event_datetime.isoformat(),
+        )
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        if not isinstance(e, (ValueError, Http404)):
+            logger.warning("Pre-generation failed for event %s", event_id, exc_info=True)
+        detail = str(e) if isinstance(e, (ValueError, Http404)) else "The stylist could not generate outfits."
+        _finish(
+            event_id, revision,
+            status=UpcomingEvent.Status.FAILED, attempts=F("attempts") + 1, last_error=detail[:255],
+        )
+        return UpcomingEvent.Status.FAILED
+
+    updated = _finish(
+        event_id, revision,
+        status=UpcomingEvent.Status.READY,
+        recommendation=recommendation,
+        generated_at=timezone.now(),
+        attempts=0,
+        last_error="",
+    )
+    return UpcomingEvent.Status.READY if updated else "skipped"
+
+
+def release_event(event_id: int, revision: int) -> None:
+    """Give a claimed event back (e.g. admission retries exhausted) without counting an attempt."""
+    UpcomingEvent.objects.filter(pk=event_id, revision=revision, status=UpcomingEvent.Status.QUEUED).update(
+        status=UpcomingEvent.Status.PENDING, queued_at=None
+    )
+
+
+def invalidate_user_events(user_id: Any) -> int:
+    """Put the user's future events back to pending; an in-flight generation is discarded."""
+    events = UpcomingEvent.objects.filter(user_id=user_id, event_datetime__gt=timezone.now())
+    return events.exclude(status=UpcomingEvent.Status.PENDING).update(
+        status=UpcomingEvent.Status.PENDING,
+        revision=F("revision") + 1,
+        recommendation=None,
+        attempts=0,
+        queued_at=None,
+    )
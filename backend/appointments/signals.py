@@ -0,0 +1,31 @@
+"""
+appointments/signals.py
+
+Outfits pre-generated for upcoming events must match the current wardrobe and
+profile: any change puts the user's future events back to pending (one UPDATE),
+and the next off-peak run regenerates them. Bulk wardrobe writes do it once
+per batch.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from client.models import ClientProfile, WardrobeItem
+from client.signals import bulk_write_in_progress, wardrobe_bulk_changed
+
+from .services import invalidate_user_events
+
+
+@receiver(post_save, sender=WardrobeItem)
+@receiver(post_delete, sender=WardrobeItem)
+@receiver(post_save, sender=ClientProfile)
+@receiver(post_delete, sender=ClientProfile)
+def invalidate_pregenerated_outfits(sender, instance, **kwargs):
+    if bulk_write_in_progress():
+        return
+    invalidate_user_events(instance.user_id)
+
+
+@receiver(wardrobe_bulk_changed)
+def invalidate_after_bulk_change(sender, user_id, **kwargs):
+    invalidate_user_events(user_id)
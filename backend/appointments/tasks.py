@@ -0,0 +1,34 @@
+from typing import Any, Dict
+
+from celery import shared_task
+from django.conf import settings
+
+from recommendations.admission import AdmissionRejected
+
+from .services import dispatch_due_events, pregenerate_event, release_event
+
+
+@shared_task(name="appointments.pregenerate_due_events")
+def pregenerate_due_events_task() -> Dict[str, Any]:
+    """Beat entry point: enqueue generation for the next batch of upcoming events."""
+    return dispatch_due_events()
+
+
+@shared_task(
+    bind=True,
+    name="appointments.pregenerate_event",
+    max_retries=3,
+    rate_limit=f"{getattr(settings, 'APPOINTMENTS_PREGEN_RATE_PER_MINUTE', 6)}/m",
+)
+def pregenerate_event_task(self, event_id: int, revision: int) -> str:
+    """
+    Generate outfits for one upcoming event. Calls rejected by admission
+    control are retried after their Retry-After, then handed back to the next run.
+    """
+    try:
+        return pregenerate_event(event_id, revision)
+    except AdmissionRejected as e:
+        if self.request.retries >= self.max_retries:
+            release_event(event_id, revision)
+            return "released"
+        raise self.retry(countdown=e.retry_after)
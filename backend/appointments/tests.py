@@ -1,3 +1,151 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from client.models import ClientProfile, WardrobeItem
+from recommendations import services as recommendation_services
+from recommendations.admission import AdmissionController
+from recommendations.models import Recommendation
+from recommendations.rule_engine import generate_outfits
+from recommendations.services import recommend, recommendation_cache
+
+from .models import UpcomingEvent
+from .services import claim_due_events, dispatch_due_events, pregenerate_event
+
+User = get_user_model()
+
+
+def make_client(email="client@example.com"):
+    user = User.objects.create_user(email=email, username=email.split("@")[0], password="pw-123456!")
+    ClientProfile.objects.filter(user=user).update(gender="female", skin_tone="tan", body_shape="pear", face_shape="oval")
+    for title, category, color in (("White shirt", "top", "white"), ("Navy chinos", "bottom", "blue"),
+                                   ("Brown loafers", "footwear", "brown")):
+        WardrobeItem.objects.create(user=user, image_url="https://example.com/x.jpg", title=title,
+                                    category=category, color=color)
+    return user
+
+
+def fake_agent():
+    """The stylist agent answered by the rule engine, with quota and concurrency limits off."""
+    admission = AdmissionController("test:llm", max_concurrency=0, user_rate_per_minute=0, redis_factory=lambda: None)
+    return (
+        mock.patch.object(recommendation_services, "llm_admission", admission),
+        mock.patch.object(recommendation_services, "get_outfit_recommendations",
+                          side_effect=lambda payload, **kwargs: generate_outfits(payload)),
+    )
+
+
+class PregenerationTests(TestCase):
+    def setUp(self):
+        self.addCleanup(recommendation_cache.clear)
+        self.user = make_client()
+        self.now = timezone.now()
+
+    def event(self, hours=24, **fields):
+        return UpcomingEvent.objects.create(
+            user=self.user, occasion="office", destination="London",
+            event_datetime=self.now + timedelta(hours=hours), **fields,
+        )
+
+    def test_claims_due_events_soonest_first(self):
+        Status = UpcomingEvent.Status
+        later, soon = self.event(hours=48), self.event(hours=2)
+        self.event(hours=200)  # beyond the horizon
+        self.event(hours=-1)  # over
+        self.event(status=Status.FAILED, attempts=3)  # out of attempts
+        self.event(status=Status.QUEUED, queued_at=self.now)  # still in flight
+        stale = self.event(hours=30, status=Status.QUEUED, queued_at=self.now - timedelta(hours=2))
+        retry = self.event(hours=40, status=Status.FAILED, attempts=1)
+
+        claimed = claim_due_events(self.now, limit=3)
+        self.assertEqual([e.pk for e in claimed], [soon.pk, stale.pk, retry.pk])
+        self.assertEqual(UpcomingEvent.objects.filter(pk__in=[soon.pk, stale.pk, retry.pk], status=Status.QUEUED).count(), 3)
+        self.assertEqual([e.pk for e in claim_due_events(self.now)], [later.pk])
+        self.assertEqual(claim_due_events(self.now), [])
+
+    def test_dispatch_spaces_out_generation(self):
+        events = [self.event(hours=h) for h in (1, 2, 3)]
+        with mock.patch("appointments.tasks.pregenerate_event_task.apply_async") as apply_async, \
+                self.settings(APPOINTMENTS_PREGEN_RATE_PER_MINUTE=6):
+            self.assertEqual(dispatch_due_events(self.now), {"dispatched": 3, "spacing_seconds": 10.0})
+        self.assertEqual(
+            [(c.args[0], c.kwargs["countdown"]) for c in apply_async.call_args_list],
+            [((e.pk, e.revision), n * 10.0) for n, e in enumerate(events)],
+        )
+
+    def test_ready_answer_is_served_without_calling_the_agent(self):
+        event = self.event()
+        claim_due_events(self.now)
+        patches = fake_agent()
+        with patches[0], patches[1] as agent:
+            self.assertEqual(pregenerate_event(event.pk, event.revision), UpcomingEvent.Status.READY)
+            recommendation_cache.clear()  # a different process
+            result = recommend(user_id=self.user.pk, destination="London", occasion="office",
+                               dt_iso=event.event_datetime.isoformat())
+        self.assertEqual(agent.call_count, 1)
+        event.refresh_from_db()
+        self.assertEqual(
+            result["recommendations"],
+            [{"name": o.name, "description": o.description, "product_ids": o.product_ids}
+             for o in event.recommendation.outfits.all()],
+        )
+        self.assertEqual(Recommendation.objects.filter(user=self.user).count(), 1)
+
+    def test_wardrobe_change_discards_a_generation_in_flight(self):
+        event = self.event()
+        claim_due_events(self.now)
+
+        def generate_then_edit(**kwargs):
+            recommendation = recommendation_services.pregenerate(**kwargs)
+            WardrobeItem.objects.create(user=self.user, image_url="https://example.com/x.jpg", title="Red scarf",
+                                        category="accessory", color="red")
+            return recommendation
+
+        patches = fake_agent()
+        with patches[0], patches[1], mock.patch("appointments.services.pregenerate", side_effect=generate_then_edit):
+            self.assertEqual(pregenerate_event(event.pk, event.revision), "skipped")
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.revision, event.recommendation), (UpcomingEvent.Status.PENDING, 1, None))
+
+    def test_failures_count_attempts(self):
+        event = self.event()
+        claim_due_events(self.now)
+        ClientProfile.objects.filter(user=self.user).update(gender="")  # profile incomplete: ValueError
+        self.assertEqual(pregenerate_event(event.pk, event.revision), UpcomingEvent.Status.FAILED)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 1)
+        self.assertTrue(event.last_error)
+
+
+class UpcomingEventApiTests(TestCase):
+    URL = "/client/events/"
+
+    def setUp(self):
+        self.user = make_client()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_create_edit_and_list(self):
+        when = (timezone.now() + timedelta(days=2)).isoformat()
+        response = self.api.post(self.URL, {"occasion": "office", "destination": "London", "datetime": when}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["status"], response.data["recommendations"]), ("pending", None))
+
+        UpcomingEvent.objects.filter(pk=response.data["id"]).update(status=UpcomingEvent.Status.READY)
+        response = self.api.patch(f"{self.URL}{response.data['id']}/", {"occasion": "wedding"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(UpcomingEvent.objects.get().revision, 1)
+
+        past = (timezone.now() - timedelta(hours=1)).isoformat()
+        response = self.api.post(self.URL, {"occasion": "office", "destination": "London", "datetime": past}, format="json")
+        self.assertEqual(response.status_code, 400)
 
-# Create your tests here.
+        other = APIClient()
+        other.force_authenticate(make_client("other@example.com"))
+        self.assertEqual(other.get(self.URL).data, [])
+        self.assertEqual(len(self.api.get(self.URL).data), 1)
@@ -0,0 +1,17 @@
+"""
+appointments/urls.py
+
+Upcoming events whose outfits are pre-generated off-peak.
+"""
+
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from .views import UpcomingEventViewSet
+
+router = DefaultRouter()
+router.register(r"events", UpcomingEventViewSet, basename="upcoming-events")
+
+urlpatterns = [
+    path("", include(router.urls)),
+]
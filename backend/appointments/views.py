@@ -1,3 +1,39 @@
-from django.shortcuts import render
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from common.permissions import IsClient
+
+from .models import UpcomingEvent
+from .serializers import UpcomingEventSerializer
+
+
+class UpcomingEventViewSet(viewsets.ModelViewSet):
+    """
+    The authenticated user's upcoming events. Outfits are generated off-peak
+    ahead of each event; `?include_past=true` also lists events that are over.
+    """
+    serializer_class = UpcomingEventSerializer
+    permission_classes = [IsAuthenticated, IsClient]
+
+    def get_queryset(self):
+        events = UpcomingEvent.objects.filter(user=self.request.user).select_related("recommendation")
+        if self.action == "list" and self.request.query_params.get("include_past") not in ("1", "true"):
+            events = events.filter(event_datetime__gt=timezone.now())
+        return events.prefetch_related("recommendation__outfits")
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        # A changed event needs new outfits; drop any in-flight generation
+        serializer.save(
+            status=UpcomingEvent.Status.PENDING,
+            revision=F("revision") + 1,
+            recommendation=None,
+            attempts=0,
+            last_error="",
+            queued_at=None,
+        )
+        serializer.instance.refresh_from_db()
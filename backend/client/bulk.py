@@ -0,0 +1,128 @@
+"""
+client/bulk.py
+
+Bulk wardrobe writes: import, update and delete many items in one request.
+
+Design:
+- Rows are validated in one pass by a single WardrobeItemSerializer instance
+  (the same field rules as the one-item endpoints); each invalid row is reported
+  by its index and skipped, or, with atomic=True, nothing is written.
+- Valid rows are written with batched bulk_create / bulk_update (one statement
+  per WARDROBE_BULK_BATCH_SIZE rows) in one transaction; deletes are one
+  DELETE by id list.
+- None of these send per-row post_save signals (deletes mute theirs, see
+  client/signals.py). After the transaction, `wardrobe_bulk_changed` is sent
+  once, so caches, embeddings, the compatibility graph and pre-generated
+  outfits are refreshed once per batch instead of once per row.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import WardrobeItem
+from .serializers.wardrobe import WardrobeItemSerializer
+from .signals import bulk_write, wardrobe_bulk_changed
+
+
+RowErrors = List[Dict[str, Any]]  # [{"index": i, "errors": {...}}]
+
+
+def _batch_size() -> int:
+    return max(1, getattr(settings, "WARDROBE_BULK_BATCH_SIZE", 200))
+
+
+def _validate(serializer: WardrobeItemSerializer, rows: Sequence[Any]) -> Tuple[List[Tuple[int, Dict[str, Any]]], RowErrors]:
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    errors: RowErrors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"index": index, "errors": {"non_field_errors": ["Expected an object."]}})
+            continue
+        try:
+            valid.append((index, serializer.run_validation(row)))
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.detail})
+    return valid, errors
+
+
+def _changed(user, items: List[WardrobeItem], deleted: List[Tuple[int, str]] = ()) -> None:
+    if items or deleted:
+        wardrobe_bulk_changed.send(sender=WardrobeItem, user_id=user.pk, items=items, deleted=list(deleted))
+
+
+def import_items(user, rows: Sequence[Any], *, atomic: bool = False) -> Tuple[List[WardrobeItem], RowErrors]:
+    """Create the valid rows as the user's items; returns (created items, row errors)."""
+    valid, errors = _validate(WardrobeItemSerializer(), rows)
+    if not valid or (atomic and errors):
+        return [], errors
+    with transaction.atomic():
+        created = WardrobeItem.objects.bulk_create(
+            [WardrobeItem(user=user, **data) for _, data in valid], batch_size=_batch_size()
+        )
+    _changed(user, created)
+    return created, errors
+
+
+def _item_id(row: Any) -> Optional[int]:
+    try:
+        return int(row.get("id"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def update_items(user, rows: Sequence[Any], *, atomic: bool = False) -> Tuple[List[WardrobeItem], RowErrors]:
+    """
+    Apply partial updates [{"id": ..., <fields>}, ...] to the user's items;
+    returns (updated items, row errors). Unknown or foreign ids are row errors.
+    """
+    existing = WardrobeItem.objects.filter(user=user).in_bulk(
+        [i for i in map(_item_id, rows) if i is not None]
+    )
+    valid, errors = _validate(WardrobeItemSerializer(partial=True), rows)
+    seen = set()
+    changes: List[Tuple[WardrobeItem, Dict[str, Any]]] = []
+    for index, data in valid:
+        item_id = _item_id(rows[index])
+        if item_id is None:
+            errors.append({"index": index, "errors": {"id": ["A valid integer is required."]}})
+        elif item_id not in existing:
+            errors.append({"index": index, "errors": {"id": ["No such wardrobe item."]}})
+        elif item_id in seen:
+            errors.append({"index": index, "errors": {"id": ["Listed more than once."]}})
+        else:
+            seen.add(item_id)
+            changes.append((existing[item_id], data))
+    errors.sort(key=lambda e: e["index"])
+    if not changes or (atomic and errors):
+        return [], errors
+
+    now = timezone.now()
+    fields = {"updated_at"}
+    items: List[WardrobeItem] = []
+    for item, data in changes:
+        for field, value in data.items():
+            setattr(item, field, value)
+        fields.update(data)
+        item.updated_at = now  # bulk_update skips auto_now
+        item.user = user
+        items.append(item)
+    with transaction.atomic():
+        WardrobeItem.objects.bulk_update(items, sorted(fields), batch_size=_batch_size())
+    _changed(user, items)
+    return items, errors
+
+
+def delete_items(user, ids: Sequence[int]) -> Tuple[List[int], List[int]]:
+    """Delete the user's items among `ids`; returns (deleted ids, ids not found)."""
+    queryset = WardrobeItem.objects.filter(user=user, pk__in=ids)
+    deleted = list(queryset.values_list("id", "category"))
+    if deleted:
+        with bulk_write(), transaction.atomic():
+            queryset.delete()
+    found = {item_id for item_id, _ in deleted}
+    _changed(user, [], deleted)
+    return sorted(found), sorted(set(ids) - found)
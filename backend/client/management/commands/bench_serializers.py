@@ -0,0 +1,120 @@
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from client.models import WardrobeItem
+from client.serializers.stylist import STYLIST_PUBLIC_READ_PLAN, StylistPublicSerializer
+from client.serializers.wardrobe import WARDROBE_ITEM_READ_PLAN, WardrobeItemSerializer
+from common.seeding import client_email, seed_dataset
+from recommendations.benchmark import environment
+from stylist.models import StylistProfile
+
+
+def _int_list(value):
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise CommandError(f"Expected comma-separated integers, got {value!r}")
+
+
+def _median_ms(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark the list endpoints' read plans against the DRF serializers they "
+        "replace (wardrobe items, stylist browse), on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=_int_list, default=[20, 100, 1000], help="Rows per list, e.g. 20,100,1000")
+        parser.add_argument("--repeat", type=int, default=30, help="Timed runs per case (median reported)")
+        parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+        parser.add_argument("--output", help="Also write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if not options["rows"] or min(options["rows"]) < 1 or options["repeat"] < 1:
+            raise CommandError("--rows and --repeat must be positive")
+        largest = max(options["rows"])
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            seed_dataset(
+                clients=1, stylists=largest, items_per_client=largest,
+                prefix="bench", seed=options["seed"], build_graph=False,
+            )
+            results = self._run(options["rows"], options["repeat"])
+            env = environment()
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'list':<10}{'rows':>7}{'stage':>11}{'DRF ms':>10}{'plan ms':>10}{'speedup':>9}")
+        for r in results:
+            self.stdout.write(
+                f"{r['list']:<10}{r['rows']:>7}{r['stage']:>11}{r['drf_ms']:>10.2f}{r['plan_ms']:>10.2f}{r['speedup']:>8.1f}x"
+            )
+        if options["output"]:
+            report = {
+                "benchmark": "serializers",
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "environment": env,
+                "config": {key: options[key] for key in ("rows", "repeat", "seed")},
+                "results": results,
+            }
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _run(self, sizes, repeat):
+        wardrobe = WardrobeItem.objects.filter(user__email=client_email("bench", 0)).order_by("-created_at", "-id")
+        stylists = StylistProfile.objects.order_by("-rating", "-rating_count", "-updated_at")
+        lists = [
+            # the DRF path joins the user in too, so the comparison is serializer vs plan, not N+1 vs join
+            ("wardrobe", wardrobe.select_related("user"), WardrobeItemSerializer, wardrobe, WARDROBE_ITEM_READ_PLAN),
+            ("stylists", stylists.select_related("user"), StylistPublicSerializer, stylists, STYLIST_PUBLIC_READ_PLAN),
+        ]
+        results = []
+        for name, model_qs, serializer_class, base_qs, plan in lists:
+            for size in sizes:
+                instances = list(model_qs[:size])
+                rows = list(plan.values(base_qs)[:size])
+                if plan.render(rows) != [dict(r) for r in serializer_class(instances, many=True).data]:
+                    raise CommandError(f"Read plan output differs from {serializer_class.__name__}")
+                cases = {
+                    # rendering only, from already fetched objects / rows
+                    "serialize": (
+                        lambda: serializer_class(instances, many=True).data,
+                        lambda: plan.render(rows),
+                    ),
+                    # query + rendering, as a list request does
+                    "end-to-end": (
+                        lambda: serializer_class(list(model_qs[:size]), many=True).data,
+                        lambda: plan.render(list(plan.values(base_qs)[:size])),
+                    ),
+                }
+                for stage, (drf_call, plan_call) in cases.items():
+                    drf_ms = _median_ms(drf_call, repeat)
+                    plan_ms = _median_ms(plan_call, repeat)
+                    results.append({
+                        "list": name,
+                        "rows": len(rows),
+                        "stage": stage,
+                        "drf_ms": round(drf_ms, 3),
+                        "plan_ms": round(plan_ms, 3),
+                        "speedup": round(drf_ms / plan_ms, 2) if plan_ms else None,
+                    })
+        return results
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wardrobeitem',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='wardrobe_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wardrobeitem',
+            index=models.Index(fields=['user', 'category', '-created_at', '-id'], name='wardrobe_user_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wardrobeitem',
+            index=models.Index(fields=['user', 'color', '-created_at', '-id'], name='wardrobe_user_color_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# PostgreSQL only (TrigramExtension and the functions below skip other
+# databases): a trigger keeps search_vector current on insert (including
+# bulk_create/COPY) and whenever title or description is written, and GIN
+# indexes serve full-text matches and typo-tolerant trigram matches on titles.
+SEARCH_FORWARD = """
+CREATE OR REPLACE FUNCTION client_wardrobeitem_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER client_wardrobeitem_search_vector_trg
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON client_wardrobeitem
+    FOR EACH ROW EXECUTE FUNCTION client_wardrobeitem_search_vector();
+
+UPDATE client_wardrobeitem SET search_vector =
+    setweight(to_tsvector('pg_catalog.english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('pg_catalog.english', coalesce(description, '')), 'B');
+
+CREATE INDEX wardrobe_search_vector_idx ON client_wardrobeitem USING gin (search_vector);
+CREATE INDEX wardrobe_title_trgm_idx ON client_wardrobeitem USING gin (title gin_trgm_ops);
+"""
+
+SEARCH_BACKWARD = """
+DROP INDEX IF EXISTS wardrobe_title_trgm_idx;
+DROP INDEX IF EXISTS wardrobe_search_vector_idx;
+DROP TRIGGER IF EXISTS client_wardrobeitem_search_vector_trg ON client_wardrobeitem;
+DROP FUNCTION IF EXISTS client_wardrobeitem_search_vector();
+"""
+
+
+def _postgres_sql(sql):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_wardrobe_list_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='wardrobeitem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_postgres_sql(SEARCH_FORWARD), _postgres_sql(SEARCH_BACKWARD)),
+    ]
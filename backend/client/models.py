@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -81,7 +82,18 @@ class WardrobeItem(models.Model):
     description = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted title (A) + description (B) tsvector, kept current by a PostgreSQL
+    # trigger and GIN-indexed (migration 0003); always NULL on other databases.
+    search_vector = SearchVectorField(null=True, editable=False)
 
+    class Meta:
+        indexes = [
+            # wardrobe list: WHERE user_id = ? ORDER BY created_at DESC, id DESC (keyset pages)
+            models.Index(fields=["user", "-created_at", "-id"], name="wardrobe_user_created_idx"),
+            # same, filtered by category / color
+            models.Index(fields=["user", "category", "-created_at", "-id"], name="wardrobe_user_category_idx"),
+            models.Index(fields=["user", "color", "-created_at", "-id"], name="wardrobe_user_color_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.category}) - {self.user.username}"
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""
+client/search.py
+
+Ranked wardrobe search (GET /client/wardrobe/?search=...).
+
+Design:
+- PostgreSQL: one query matches either the stored, GIN-indexed search_vector
+  (websearch syntax, English stemming, title weighted above description) or,
+  for typos and partial words, trigram word similarity against the title
+  (`%>`, served by the gin_trgm_ops index). Rank = full-text rank + trigram
+  similarity, so exact word matches come first and near-misses still show up.
+  Both conditions are index scans, so the cost follows the number of matches,
+  not the size of the wardrobe.
+- Other databases (SQLite in tests): every word must appear in the title or
+  description (icontains); title matches rank first. Same response shape.
+- Callers order by the `rank` annotation, newest first on ties.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, QuerySet, Value, When
+
+SEARCH_CONFIG = "english"
+
+
+def search_wardrobe(queryset: QuerySet, text: str) -> QuerySet:
+    """`queryset` narrowed to items matching `text`, annotated with `rank` and ordered by it."""
+    text = " ".join(text.split())
+    if connection.vendor == "postgresql":
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        queryset = queryset.filter(Q(search_vector=query) | Q(title__trigram_word_similar=text)).annotate(
+            rank=SearchRank(F("search_vector"), query) + TrigramWordSimilarity(text, "title")
+        )
+    else:
+        for word in text.split():
+            queryset = queryset.filter(Q(title__icontains=word) | Q(description__icontains=word))
+        queryset = queryset.annotate(
+            rank=Case(When(title__icontains=text, then=Value(1.0)), default=Value(0.5), output_field=FloatField())
+        )
+    return queryset.order_by("-rank", "-created_at", "-id")
@@ -2,6 +2,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from stylist.models import StylistProfile  # adjust import if needed
+from common.read_plans import Field, Nested, ReadPlan, as_str, iso_datetime
 
 User = get_user_model()
 
@@ -26,3 +27,22 @@ class StylistPublicSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = fields
+
+
+# Read side of StylistPublicSerializer for the browse list: the nested user is
+# joined into the same row instead of serialized per stylist.
+STYLIST_PUBLIC_READ_PLAN = ReadPlan(
+    Nested("user", [
+        Field("id", "user__id", as_str),
+        Field("username", "user__username"),
+        Field("email", "user__email"),
+        Field("profile_picture", "user__profile_picture"),
+    ]),
+    Field("bio"),
+    Field("expertise"),
+    Field("years_experience"),
+    Field("rating", convert=float),
+    Field("rating_count"),
+    Field("created_at", convert=iso_datetime),
+    Field("updated_at", convert=iso_datetime),
+)
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from client.models import WardrobeItem
+from common.read_plans import Field, ReadPlan, iso_datetime
 
 User = get_user_model()
 
@@ -16,3 +18,55 @@ class WardrobeItemSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data["user"] = self.context["request"].user
         return super().create(validated_data)
+
+
+# Read side of WardrobeItemSerializer for list pages (same output, see common/read_plans.py)
+WARDROBE_ITEM_READ_PLAN = ReadPlan(
+    Field("id"),
+    Field("user", "user_id"),
+    Field("user_email", "user__email"),
+    Field("image_url"),
+    Field("title"),
+    Field("color"),
+    Field("category"),
+    Field("description"),
+    Field("created_at", convert=iso_datetime),
+    Field("updated_at", convert=iso_datetime),
+)
+
+
+class WardrobeListQuerySerializer(serializers.Serializer):
+    category = serializers.ChoiceField(choices=WardrobeItem.Category.choices, required=False)
+    color = serializers.ChoiceField(choices=WardrobeItem.Color.choices, required=False)
+    search = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
+class SimilarItemsQuerySerializer(serializers.Serializer):
+    k = serializers.IntegerField(required=False, default=5, min_value=1, max_value=50)
+
+
+class SimilarToQuerySerializer(SimilarItemsQuerySerializer):
+    """An item that is not in the wardrobe (yet): 'what do I own that is like this?'"""
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+    category = serializers.ChoiceField(choices=WardrobeItem.Category.choices, required=False)
+    color = serializers.ChoiceField(choices=WardrobeItem.Color.choices, required=False)
+
+
+class DuplicatesQuerySerializer(serializers.Serializer):
+    threshold = serializers.FloatField(required=False, min_value=0.5, max_value=1.0)
+
+
+class BulkWriteQuerySerializer(serializers.Serializer):
+    # atomic=true: any invalid row rejects the whole batch
+    atomic = serializers.BooleanField(required=False, default=False)
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, ids):
+        limit = getattr(settings, "WARDROBE_BULK_MAX_ITEMS", 500)
+        if len(ids) > limit:
+            raise serializers.ValidationError(f"At most {limit} ids per request.")
+        return list(dict.fromkeys(ids))
@@ -0,0 +1,39 @@
+"""
+client/signals.py
+
+Signals sent by the client app.
+
+Design:
+- `wardrobe_bulk_changed` is sent once per bulk wardrobe write (client/bulk.py),
+  after its transaction, with `user_id`, `items` (the created/updated
+  WardrobeItems) and `deleted` ([(id, category)]). Receivers refresh derived
+  data (caches, embeddings, compatibility graph, pre-generated outfits) once
+  per batch.
+- bulk_create/bulk_update never send post_save, but QuerySet.delete() still
+  sends post_delete per row; per-row receivers check `bulk_write_in_progress()`
+  and leave the work to the batch signal.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from django.dispatch import Signal
+
+
+wardrobe_bulk_changed = Signal()
+
+_bulk_write: ContextVar[bool] = ContextVar("wardrobe_bulk_write", default=False)
+
+
+def bulk_write_in_progress() -> bool:
+    return _bulk_write.get()
+
+
+@contextmanager
+def bulk_write() -> Iterator[None]:
+    token = _bulk_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_write.reset(token)
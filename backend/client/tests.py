@@ -1,3 +1,253 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from client.models import WardrobeItem
+from client.serializers.stylist import STYLIST_PUBLIC_READ_PLAN, StylistPublicSerializer
+from client.serializers.wardrobe import WARDROBE_ITEM_READ_PLAN, WardrobeItemSerializer
+from stylist.models import StylistProfile
+
+User = get_user_model()
+
+
+class ReadPlanParityTests(TestCase):
+    """The list endpoints' read plans must render exactly what the serializers do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(email="client@example.com", username="client", password="pw-123456!")
+        WardrobeItem.objects.create(
+            user=cls.client_user, image_url="https://example.com/1.jpg", title="Navy blazer",
+            color="blue", category="outerwear", description="Wool, two buttons",
+        )
+        WardrobeItem.objects.create(
+            user=cls.client_user, image_url="https://example.com/2.jpg", title="Tee — «vintage»",
+            color="white", category="top", description=None,
+        )
+        for n, (bio, expertise, years) in enumerate([("Formal wear", ["formal", "bridal"], 7), (None, None, None)]):
+            stylist = User.objects.create_user(
+                email=f"stylist{n}@example.com", username=f"stylist{n}", password="pw-123456!",
+                role=User.Role.STYLIST, profile_picture="https://example.com/p.jpg" if n == 0 else None,
+            )
+            StylistProfile.objects.filter(user=stylist).update(
+                bio=bio, expertise=expertise, years_experience=years, rating=4.5 - n, rating_count=10 * n,
+            )
+
+    def assertSameOutput(self, expected, actual):
+        self.assertEqual([dict(row) for row in expected], actual)
+        # byte-identical JSON: same keys, order and value types
+        self.assertEqual(JSONRenderer().render(expected), JSONRenderer().render(actual))
+
+    def wardrobe(self):
+        return WardrobeItem.objects.filter(user=self.client_user).order_by("id")
+
+    def stylists(self):
+        return StylistProfile.objects.order_by("user__email")
+
+    def test_wardrobe_plan_matches_serializer(self):
+        self.assertSameOutput(
+            WardrobeItemSerializer(self.wardrobe(), many=True).data,
+            WARDROBE_ITEM_READ_PLAN.render(WARDROBE_ITEM_READ_PLAN.values(self.wardrobe())),
+        )
+
+    def test_stylist_plan_matches_serializer(self):
+        self.assertSameOutput(
+            StylistPublicSerializer(self.stylists(), many=True).data,
+            STYLIST_PUBLIC_READ_PLAN.render(STYLIST_PUBLIC_READ_PLAN.values(self.stylists())),
+        )
+
+    def test_datetimes_follow_current_timezone(self):
+        with timezone.override("Asia/Dhaka"):
+            self.assertSameOutput(
+                WardrobeItemSerializer(self.wardrobe(), many=True).data,
+                WARDROBE_ITEM_READ_PLAN.render(WARDROBE_ITEM_READ_PLAN.values(self.wardrobe())),
+            )
+
+    def test_list_endpoints_match_serializers(self):
+        api = APIClient()
+        api.force_authenticate(self.client_user)
+
+        response = api.get("/client/wardrobe/")
+        self.assertEqual(response.status_code, 200)
+        newest_first = self.wardrobe().order_by("-created_at", "-id")
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),
+            JSONRenderer().render(WardrobeItemSerializer(newest_first, many=True).data),
+        )
+
+        response = api.get("/client/stylists/")
+        self.assertEqual(response.status_code, 200)
+        browse = StylistProfile.objects.order_by("-rating", "-rating_count", "-updated_at")
+        self.assertEqual(
+            JSONRenderer().render(response.data),
+            JSONRenderer().render(StylistPublicSerializer(browse, many=True).data),
+        )
+
+
+class WardrobeCursorPaginationTests(TestCase):
+    """The wardrobe list cursor is a (created_at, id) keyset, however many rows share a timestamp."""
+    ROWS = 1250
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="tied@example.com", username="tied", password="pw-123456!")
+        WardrobeItem.objects.bulk_create(
+            WardrobeItem(user=cls.user, image_url=f"https://example.com/{n}.jpg", title=f"Item {n}",
+                         color="black", category="top")
+            for n in range(cls.ROWS)
+        )
+        # well past DRF's offset_cutoff (1000) of rows sharing one timestamp
+        WardrobeItem.objects.filter(user=cls.user).update(created_at=timezone.now())
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def walk(self, url, link):
+        ids, pages = [], 0
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            url, pages = response.data[link], pages + 1
+            self.assertLess(pages, 20, "pagination did not terminate")
+        return ids
+
+    def test_walks_past_tied_timestamps(self):
+        ids = self.walk("/client/wardrobe/?page_size=100", "next")
+        expected = list(WardrobeItem.objects.filter(user=self.user).order_by("-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_links_walk_back(self):
+        response = self.api.get("/client/wardrobe/?page_size=100")
+        for _ in range(self.ROWS // 100):
+            response = self.api.get(response.data["next"])
+        last_page = [row["id"] for row in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+        earlier = self.walk(response.data["previous"], "previous")
+        expected = list(WardrobeItem.objects.filter(user=self.user).order_by("-id").values_list("id", flat=True))
+        # pages come back in reverse page order, each page itself newest first
+        self.assertEqual(sorted(earlier + last_page, reverse=True), expected)
+        self.assertEqual(len(set(earlier + last_page)), len(expected))
+
+    def test_rejects_malformed_cursor(self):
+        self.assertEqual(self.api.get("/client/wardrobe/?cursor=bm9wZQ==").status_code, 404)
+
+
+class BulkWardrobeTests(TestCase):
+    URL = "/client/wardrobe/bulk/"
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="bulk@example.com", username="bulk", password="pw-123456!")
+        self.other = User.objects.create_user(email="other@example.com", username="other", password="pw-123456!")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def row(self, title, **fields):
+        return {"image_url": "https://example.com/x.jpg", "title": title, "category": "top", "color": "black", **fields}
+
+    def titles(self, user=None):
+        return sorted(WardrobeItem.objects.filter(user=user or self.user).values_list("title", flat=True))
+
+    def test_import_skips_invalid_rows_or_rejects_the_batch(self):
+        rows = [self.row("Tee"), self.row("Bad", category="spaceship"), "not an object", self.row("Shirt")]
+        response = self.api.post(f"{self.URL}?atomic=true", rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1, 2])
+        self.assertEqual(self.titles(), [])
+
+        with mock.patch("client.bulk.wardrobe_bulk_changed") as changed:
+            response = self.api.post(self.URL, rows, format="json")
+        self.assertEqual(changed.send.call_count, 1)  # one refresh for the whole batch
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([i["title"] for i in response.data["created"]], ["Tee", "Shirt"])
+        self.assertIn("category", response.data["errors"][0]["errors"])
+        self.assertEqual(self.titles(), ["Shirt", "Tee"])
+
+    def test_import_csv(self):
+        body = "image_url,title,category,color\nhttps://example.com/a.jpg,Chinos,bottom,beige\n"
+        response = self.api.post(self.URL, body, content_type="text/csv")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"][0]["category"], "bottom")
+
+    @override_settings(WARDROBE_BULK_MAX_ITEMS=2)
+    def test_row_limit(self):
+        response = self.api.post(self.URL, [self.row(f"Tee {n}") for n in range(3)], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.titles(), [])
+
+    def test_update_reports_unknown_foreign_and_repeated_ids(self):
+        mine = WardrobeItem.objects.create(user=self.user, **self.row("Tee"))
+        theirs = WardrobeItem.objects.create(user=self.other, **self.row("Their tee"))
+        before = mine.updated_at
+        rows = [{"id": mine.pk, "color": "white"}, {"id": theirs.pk, "color": "white"},
+                {"id": 10 ** 9, "color": "white"}, {"id": mine.pk, "color": "red"}, {"color": "red"}]
+
+        response = self.api.patch(f"{self.URL}?atomic=true", rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        mine.refresh_from_db()
+        self.assertEqual(mine.color, "black")
+
+        response = self.api.patch(self.URL, rows, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1, 2, 3, 4])
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual((mine.color, theirs.color), ("white", "black"))
+        self.assertGreater(mine.updated_at, before)
+
+    def test_delete_only_touches_own_items(self):
+        mine = [WardrobeItem.objects.create(user=self.user, **self.row(f"Tee {n}")) for n in range(3)]
+        theirs = WardrobeItem.objects.create(user=self.other, **self.row("Their tee"))
+        response = self.api.delete(self.URL, {"ids": [mine[0].pk, mine[1].pk, theirs.pk]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"deleted": [mine[0].pk, mine[1].pk], "not_found": [theirs.pk]})
+        self.assertEqual(self.titles(), ["Tee 2"])
+        self.assertEqual(self.titles(self.other), ["Their tee"])
+
+
+class WardrobeSearchTests(TestCase):
+    """?search= ranks matches (SQLite fallback here: every word must appear, title matches first)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="search@example.com", username="search", password="pw-123456!")
+        other = User.objects.create_user(email="other@example.com", username="other", password="pw-123456!")
+        rows = [
+            (cls.user, "Navy wool blazer", "outerwear", "Two buttons"),
+            (cls.user, "Grey suit jacket", "suit", "Navy wool lining"),
+            (cls.user, "Navy chinos", "bottom", "Cotton"),
+            (cls.user, "Navy wool scarf", "accessory", ""),
+            (other, "Navy wool blazer", "outerwear", ""),
+        ]
+        cls.items = [
+            WardrobeItem.objects.create(user=user, image_url="https://example.com/x.jpg", title=title,
+                                        category=category, color="blue", description=description)
+            for user, title, category, description in rows
+        ]
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def search(self, query):
+        response = self.api.get(f"/client/wardrobe/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_all_words_must_match_and_titles_rank_first(self):
+        data = self.search("search=navy%20%20wool")
+        blazer, jacket, _, scarf, _ = self.items
+        self.assertEqual([row["id"] for row in data["results"]], [scarf.pk, blazer.pk, jacket.pk])
+        self.assertEqual(data["count"], 3)
+
+    def test_filters_and_limit_offset_pages(self):
+        self.assertEqual([row["id"] for row in self.search("search=navy&category=bottom")["results"]], [self.items[2].pk])
+        page = self.search("search=navy&limit=2&offset=2")
+        self.assertEqual(len(page["results"]), 2)
+        self.assertIsNone(page["next"])
+        self.assertEqual(self.search("search=velvet")["results"], [])
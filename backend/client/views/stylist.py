@@ -1,9 +1,10 @@
 # apps/client/views/stylists.py
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from django.db.models import Q
 from stylist.models import StylistProfile
-from client.serializers.stylist import StylistPublicSerializer
+from client.serializers.stylist import STYLIST_PUBLIC_READ_PLAN, StylistPublicSerializer
 from common.permissions import IsClient
 
 class StylistBrowseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -21,3 +22,11 @@ class StylistBrowseViewSet(viewsets.ReadOnlyModelViewSet):
             .filter(user__is_active=True, user__role="stylist")
             .order_by("-rating", "-rating_count", "-updated_at")
         )
+
+    def list(self, request, *args, **kwargs):
+        # Read plan instead of nested serializers: one joined .values() query, plain dicts
+        rows = STYLIST_PUBLIC_READ_PLAN.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(STYLIST_PUBLIC_READ_PLAN.render(page))
+        return Response(STYLIST_PUBLIC_READ_PLAN.render(rows))
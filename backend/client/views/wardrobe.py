@@ -1,19 +1,157 @@
-from rest_framework import viewsets, filters
+from django.conf import settings
+from rest_framework import status, viewsets, filters
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from client.bulk import delete_items, import_items, update_items
 from client.models import WardrobeItem
-from client.serializers.wardrobe import WardrobeItemSerializer
+from client.search import search_wardrobe
+from client.serializers.wardrobe import (
+    BulkDeleteSerializer,
+    BulkWriteQuerySerializer,
+    DuplicatesQuerySerializer,
+    SimilarItemsQuerySerializer,
+    SimilarToQuerySerializer,
+    WARDROBE_ITEM_READ_PLAN,
+    WardrobeItemSerializer,
+    WardrobeListQuerySerializer,
+)
+from common.pagination import NewestFirstCursorPagination, RankedResultsPagination
+from common.parsers import CSVParser, NDJSONParser
 from common.permissions import IsClient
+from recommendations.embeddings import embed, embed_item
+from recommendations.services import wardrobe_index
 
 class WardrobeItemViewSet(viewsets.ModelViewSet):
     """
-    CRUD for the authenticated user's wardrobe items.
+    CRUD for the authenticated user's wardrobe items, plus similar-item
+    lookup and a near-duplicate report over the user's embedding index.
+
+    GET /client/wardrobe/?category=&color=&cursor=&page_size= lists newest
+    first with cursor pagination; each page is one range scan on a
+    (user[, category | color], -created_at, -id) index.
+    With ?search= results are ranked by relevance (client/search.py) and
+    paginated with ?limit=&offset= instead.
     """
     serializer_class = WardrobeItemSerializer
     permission_classes = [IsAuthenticated, IsClient]
+    pagination_class = NewestFirstCursorPagination
 
     def get_queryset(self):
         # Only the current user's items
         return WardrobeItem.objects.filter(user=self.request.user)
 
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            searching = self.action == "list" and self.request.query_params.get("search", "").strip()
+            self._paginator = RankedResultsPagination() if searching else self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        params = WardrobeListQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        lookups = dict(params.validated_data)
+        search = lookups.pop("search", "").strip()
+        queryset = self.get_queryset().filter(**lookups)
+        if search:
+            queryset = search_wardrobe(queryset, search)
+        # Read plan instead of the serializer: .values() rows with user_email joined in
+        page = self.paginate_queryset(WARDROBE_ITEM_READ_PLAN.values(queryset))
+        return self.get_paginated_response(WARDROBE_ITEM_READ_PLAN.render(page))
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """GET /client/wardrobe/{id}/similar/?k=5 — the k items most like this one."""
+        item = self.get_object()
+        params = SimilarItemsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = wardrobe_index.similar(
+            request.user.pk, embed_item(item), k=params.validated_data["k"], exclude_ids=[item.pk]
+        )[0]
+        return Response({"item_id": item.pk, "results": self._scored(matches)})
+
+    @action(detail=False, methods=["get"], url_path="similar", url_name="similar-to")
+    def similar_to(self, request):
+        """GET /client/wardrobe/similar/?title=&category=&color=&k=5 — items like a described one."""
+        params = SimilarToQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        vector = embed(data["title"], data["description"], data.get("category"), data.get("color"))
+        matches = wardrobe_index.similar(request.user.pk, vector, k=data["k"])[0]
+        return Response({"results": self._scored(matches)})
+
+    @action(detail=False, methods=["get"])
+    def duplicates(self, request):
+        """GET /client/wardrobe/duplicates/?threshold=0.92 — groups of near-identical items."""
+        params = DuplicatesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        threshold = params.validated_data.get("threshold") or getattr(settings, "WARDROBE_DUPLICATE_THRESHOLD", 0.92)
+        groups = wardrobe_index.duplicates(request.user.pk, threshold)
+        items = self._items([pid for group in groups for pid in group["item_ids"]])
+        return Response({
+            "threshold": threshold,
+            "groups": [
+                {
+                    "similarity": group["similarity"],
+                    "items": [self.get_serializer(items[pid]).data for pid in group["item_ids"] if pid in items],
+                }
+                for group in groups
+            ],
+        })
+
+    @property
+    def max_bulk_rows(self):
+        # read by the NDJSON/CSV parsers so oversized uploads stop early
+        return getattr(settings, "WARDROBE_BULK_MAX_ITEMS", 500)
+
+    @action(detail=False, methods=["post", "patch", "delete"], url_path="bulk", url_name="bulk",
+            parser_classes=[JSONParser, NDJSONParser, CSVParser])
+    def bulk(self, request):
+        """
+        POST   /client/wardrobe/bulk/ — import items: JSON array, NDJSON or CSV (header row)
+        PATCH  /client/wardrobe/bulk/ — partial updates: [{"id": 1, "color": "navy"}, ...]
+        DELETE /client/wardrobe/bulk/ — {"ids": [1, 2, 3]}
+        Invalid rows are reported by index ({"index", "errors"}) and skipped, or with
+        ?atomic=true reject the whole batch. 207 when some rows failed.
+        """
+        if request.method == "DELETE":
+            params = BulkDeleteSerializer(data=request.data)
+            params.is_valid(raise_exception=True)
+            deleted, not_found = delete_items(request.user, params.validated_data["ids"])
+            return Response({"deleted": deleted, "not_found": not_found})
+
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({"detail": "Expected a list of items."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.max_bulk_rows:
+            return Response(
+                {"detail": f"At most {self.max_bulk_rows} rows per request."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        params = BulkWriteQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        write = import_items if request.method == "POST" else update_items
+        items, errors = write(request.user, rows, atomic=params.validated_data["atomic"])
+        if not errors:
+            code = status.HTTP_201_CREATED if request.method == "POST" else status.HTTP_200_OK
+        else:
+            code = status.HTTP_207_MULTI_STATUS if items else status.HTTP_400_BAD_REQUEST
+        key = "created" if request.method == "POST" else "updated"
+        return Response({key: self.get_serializer(items, many=True).data, "errors": errors}, status=code)
+
+    def _items(self, ids):
+        # One query for every item in the response
+        return self.get_queryset().select_related("user").in_bulk(ids)
+
+    def _scored(self, matches):
+        items = self._items([pid for pid, _ in matches])
+        return [
+            {"score": score, "item": self.get_serializer(items[pid]).data}
+            for pid, score in matches
+            if pid in items
+        ]
@@ -0,0 +1,271 @@
+"""
+common/loadtest.py
+
+Scripted HTTP load harness for a running server (python manage.py loadtest).
+
+Design:
+- Open loop: request i is scheduled at start + i / rate, whatever happened to
+  the previous ones, and its latency is measured from the scheduled time. When
+  the server (or the worker pool) falls behind, the queueing delay shows up in
+  the percentiles instead of silently lowering the offered rate (no coordinated
+  omission). Service time (send to response) is reported separately.
+- Each request picks a route from a weighted mix covering the API surfaces:
+  login, /client/me/, wardrobe list/create/update/delete, stylist browse and
+  recommendations. Routes run as one of the seeded clients
+  (common/seeding.py, `<prefix>-client-<n>`), logged in once up front; updates
+  and deletes only touch items the harness created itself, and fall back to a
+  create while a user has none.
+- Results per route: count, errors (non-2xx or transport), status codes,
+  p50/p95/p99/max latency, plus the achieved rate overall.
+- Recommendations call the model: run the server with STYLIST_LLM_BACKEND=fake
+  (and RECOMMENDATION_USER_RATE_PER_MINUTE=0) to load-test our code rather
+  than the provider's quota.
+"""
+
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from client.models import WardrobeItem
+from recommendations.benchmark import percentiles, synthetic_items
+
+from .seeding import DEFAULT_PASSWORD, client_email
+
+
+# Relative weights of each route in the default mix
+DEFAULT_MIX: Dict[str, int] = {
+    "login": 1,
+    "me": 10,
+    "wardrobe_list": 10,
+    "wardrobe_create": 3,
+    "wardrobe_update": 2,
+    "wardrobe_delete": 2,
+    "stylists": 8,
+    "recommend": 2,
+}
+
+_OCCASIONS = ("office", "date night", "wedding", "brunch", "interview", "concert", "hiking trip")
+_DESTINATIONS = ("Dhaka", "London", "New York", "Tokyo", "Paris", "Dubai", "Sydney")
+
+# (method, path, json body)
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """'me=10,recommend=2' -> weights; routes not named are left out."""
+    mix: Dict[str, int] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown route '{name}' (known: {', '.join(DEFAULT_MIX)})")
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise ValueError(f"Weight of '{name}' must be an integer")
+    if not any(w > 0 for w in mix.values()):
+        raise ValueError("The mix needs at least one route with a positive weight")
+    return mix
+
+
+class _VirtualUser:
+    """A seeded client: credentials, access token and the items the harness created."""
+
+    def __init__(self, email: str, password: str):
+        self.email = email
+        self.password = password
+        self.token: Optional[str] = None
+        self.created: List[int] = []
+        self.lock = threading.Lock()
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+
+class LoadTest:
+    """Drive a weighted route mix against `base_url` at `rate` requests per second."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        users: int,
+        prefix: str = "load",
+        password: str = DEFAULT_PASSWORD,
+        mix: Optional[Dict[str, int]] = None,
+        workers: int = 32,
+        timeout: float = 30.0,
+        seed: int = 0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.users = [_VirtualUser(client_email(prefix, n), password) for n in range(users)]
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.workers = workers
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self._local = threading.local()
+        self._item_counter = itertools.count()
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[Tuple[float, float]]] = {}  # route -> [(latency, service)]
+        self._statuses: Dict[str, Counter] = {}
+        self._errors: Dict[str, Counter] = {}
+
+    # --------- HTTP --------- #
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send(self, user: _VirtualUser, request: Request) -> requests.Response:
+        method, path, body = request
+        return self._session().request(
+            method, self.base_url + path, json=body, headers=user.headers(), timeout=self.timeout
+        )
+
+    def login(self, user: _VirtualUser) -> requests.Response:
+        response = self._send(user, ("POST", "/client/auth/login/", {"email": user.email, "password": user.password}))
+        if response.ok:
+            user.token = response.json()["tokens"]["access"]
+        return response
+
+    # --------- routes --------- #
+
+    def _build(self, route: str, user: _VirtualUser, rng: random.Random) -> Request:
+        if route == "me":
+            return "GET", "/client/me/", None
+        if route == "wardrobe_list":
+            return "GET", "/client/wardrobe/", None
+        if route == "stylists":
+            return "GET", "/client/stylists/", None
+        if route == "recommend":
+            when = datetime.now(timezone.utc) + timedelta(days=rng.randint(1, 14))
+            return "POST", "/client/recommendations/", {
+                "destination": rng.choice(_DESTINATIONS),
+                "occasion": rng.choice(_OCCASIONS),
+                "datetime": when.replace(microsecond=0).isoformat(),
+            }
+
+        with user.lock:
+            target = rng.choice(user.created) if user.created else None
+            if route == "wardrobe_delete" and target is not None:
+                user.created.remove(target)
+        if route == "wardrobe_update" and target is not None:
+            return "PATCH", f"/client/wardrobe/{target}/", {
+                "color": rng.choice(WardrobeItem.Color.values), "description": "Updated by the load test.",
+            }
+        if route == "wardrobe_delete" and target is not None:
+            return "DELETE", f"/client/wardrobe/{target}/", None
+        item = synthetic_items(1, seed=next(self._item_counter))[0]
+        return "POST", "/client/wardrobe/", item
+
+    def _execute(self, route: str, user: _VirtualUser, scheduled: float, rng: random.Random) -> None:
+        status: Optional[int] = None
+        error: Optional[str] = None
+        sent = time.perf_counter()
+        try:
+            if route == "login":
+                response = self.login(user)
+            else:
+                request = self._build(route, user, rng)
+                sent = time.perf_counter()
+                response = self._send(user, request)
+                if response.status_code == 201 and request[0] == "POST" and request[1] == "/client/wardrobe/":
+                    with user.lock:
+                        user.created.append(response.json()["id"])
+            status = response.status_code
+            if not response.ok:
+                error = f"HTTP {status}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        done = time.perf_counter()
+        with self._lock:
+            self._samples.setdefault(route, []).append(((done - scheduled) * 1000.0, (done - sent) * 1000.0))
+            if status is not None:
+                self._statuses.setdefault(route, Counter())[str(status)] += 1
+            if error:
+                self._errors.setdefault(route, Counter())[error] += 1
+
+    # --------- run --------- #
+
+    def prepare(self) -> Tuple[int, Counter]:
+        """Log every virtual user in; returns how many succeeded and the failures by kind."""
+        def attempt(user: _VirtualUser) -> Optional[str]:
+            try:
+                response = self.login(user)
+            except requests.RequestException as e:
+                return type(e).__name__
+            return None if response.ok else f"HTTP {response.status_code}"
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(self.users)))) as pool:
+            failures = Counter(kind for kind in pool.map(attempt, self.users) if kind)
+        return sum(1 for user in self.users if user.token), failures
+
+    def run(self, *, rate: float, duration: float) -> Dict[str, Any]:
+        """Offer `rate` req/s for `duration` seconds, wait for stragglers, and summarize."""
+        routes = [name for name, weight in self.mix.items() if weight > 0]
+        weights = [self.mix[name] for name in routes]
+        users = [user for user in self.users if user.token] or self.users
+        total = max(1, int(rate * duration))
+        late = 0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="loadtest") as pool:
+            for i in range(total):
+                scheduled = started + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -0.05:
+                    late += 1  # the dispatcher itself fell behind the schedule
+                route = self.rng.choices(routes, weights)[0]
+                user = self.rng.choice(users)
+                pool.submit(self._execute, route, user, scheduled, random.Random(self.rng.random()))
+        wall = time.perf_counter() - started
+        return self._summary(rate=rate, duration=duration, requests=total, wall=wall, late=late)
+
+    def _summary(self, *, rate: float, duration: float, requests: int, wall: float, late: int) -> Dict[str, Any]:
+        routes: Dict[str, Any] = {}
+        for route in sorted(self._samples):
+            latencies = [latency for latency, _ in self._samples[route]]
+            service = [s for _, s in self._samples[route]]
+            errors = self._errors.get(route, Counter())
+            routes[route] = {
+                "count": len(latencies),
+                "errors": sum(errors.values()),
+                "error_kinds": dict(errors),
+                "status": dict(self._statuses.get(route, Counter())),
+                "latency_ms": {**percentiles(latencies), "max": round(max(latencies), 3)},
+                "service_ms": percentiles(service),
+            }
+        all_latencies = [latency for samples in self._samples.values() for latency, _ in samples]
+        return {
+            "target_rps": rate,
+            "duration_s": duration,
+            "requests": requests,
+            "achieved_rps": round(requests / wall, 2) if wall else 0.0,
+            "wall_seconds": round(wall, 3),
+            "late_dispatches": late,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "latency_ms": {**percentiles(all_latencies), "max": round(max(all_latencies), 3) if all_latencies else 0.0},
+            "routes": routes,
+        }
+
+
+def format_table(summary: Dict[str, Any]) -> List[str]:
+    lines = [f"{'route':<16}{'count':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    total = {"count": summary["requests"], "errors": summary["errors"], "latency_ms": summary["latency_ms"]}
+    for route, data in [*summary["routes"].items(), ("all", total)]:
+        latency = data["latency_ms"]
+        lines.append(
+            f"{route:<16}{data['count']:>7}{data['errors']:>6}"
+            f"{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}"
+        )
+    return lines
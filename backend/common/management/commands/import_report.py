@@ -0,0 +1,68 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# "import time:   self [us] |  cumulative | imported package"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start import time in a fresh interpreter (python -X importtime) "
+        "and report which apps/packages dominate it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            default=settings.ROOT_URLCONF,
+            help="Module imported after django.setup() (default: ROOT_URLCONF)",
+        )
+        parser.add_argument("--top", type=int, default=15, help="Rows per table")
+
+    def handle(self, *args, **options):
+        code = f"import django; django.setup(); import {options['target']}"
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Import failed:\n{proc.stderr[-2000:]}")
+
+        by_package = defaultdict(int)  # self time per top-level package
+        first_party = defaultdict(int)  # cumulative time of top-level project modules
+        local_apps = {
+            a.split(".")[0] for a in settings.INSTALLED_APPS if not a.startswith(("django.", "rest_framework"))
+        } | {"agents", "core"}
+        total = 0
+        for line in proc.stderr.splitlines():
+            m = _LINE_RE.match(line)
+            if not m:
+                continue
+            self_us, cumulative_us, module = int(m[1]), int(m[2]), m[3]
+            package = module.split(".")[0]
+            by_package[package] += self_us
+            total += self_us
+            if package in local_apps:
+                first_party[module] = max(first_party[module], cumulative_us)
+
+        if not total:
+            raise CommandError("No -X importtime output captured.")
+
+        self.stdout.write(f"Cold start ({options['target']}): {total / 1000:.0f} ms of imports\n")
+        self._table("Self time by top-level package", by_package, total, options["top"])
+        self._table("Cumulative time of installed-app modules (includes their dependencies)", first_party, total, options["top"])
+
+    def _table(self, title, rows, total, top):
+        self.stdout.write(title)
+        self.stdout.write(f"  {'ms':>8} {'%':>6}  module")
+        for name, us in sorted(rows.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+            self.stdout.write(f"  {us / 1000:>8.1f} {100 * us / total:>5.1f}%  {name}")
+        self.stdout.write("")
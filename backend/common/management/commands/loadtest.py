@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.loadtest import DEFAULT_MIX, LoadTest, format_table, parse_mix
+from common.seeding import DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        "Open-loop HTTP load test of a running server with accounts from seed_data: "
+        "login, /client/me/, wardrobe CRUD, stylist browse and recommendations at a "
+        "target request rate, with latency percentiles per route."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000", help="Server under test")
+        parser.add_argument("--rate", type=float, default=20.0, help="Requests per second offered (default: 20)")
+        parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load (default: 60)")
+        parser.add_argument("--users", type=int, default=50, help="Seeded clients to log in as (default: 50)")
+        parser.add_argument("--prefix", default="load", help="Account prefix used with seed_data")
+        parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password of the seeded accounts")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+            help="Route weights, e.g. 'me=10,wardrobe_list=5,recommend=1'",
+        )
+        parser.add_argument("--workers", type=int, default=32, help="Concurrent connections (default: 32)")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed of the route/user sequence")
+        parser.add_argument("--output", help="Also write the summary as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options["rate"] <= 0 or options["duration"] <= 0:
+            raise CommandError("--rate and --duration must be positive")
+        if options["users"] < 1 or options["workers"] < 1:
+            raise CommandError("--users and --workers must be >= 1")
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        test = LoadTest(
+            options["base_url"],
+            users=options["users"],
+            prefix=options["prefix"],
+            password=options["password"],
+            mix=mix,
+            workers=options["workers"],
+            timeout=options["timeout"],
+            seed=options["seed"],
+        )
+        logged_in, failures = test.prepare()
+        if not logged_in:
+            raise CommandError(
+                f"No account could log in at {options['base_url']} ({dict(failures)}); run "
+                f"`python manage.py seed_data --prefix {options['prefix']}` against the server's database first."
+            )
+        self.stdout.write(f"{logged_in}/{options['users']} users logged in; "
+                          f"offering {options['rate']:g} req/s for {options['duration']:g}s")
+
+        summary = test.run(rate=options["rate"], duration=options["duration"])
+        for line in format_table(summary):
+            self.stdout.write(line)
+        self.stdout.write(
+            f"achieved {summary['achieved_rps']} req/s, {summary['errors']} errors, "
+            f"{summary['late_dispatches']} late dispatches"
+        )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"config": {k: options[k] for k in ("base_url", "rate", "duration", "users", "workers", "mix")},
+                           "summary": summary}, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.seeding import DEFAULT_PASSWORD, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create synthetic clients (with profiles and wardrobes) and stylists for "
+        "load testing. Skips per-row signals; re-running only adds missing accounts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=100, help="Client accounts (default: 100)")
+        parser.add_argument("--stylists", type=int, default=20, help="Stylist accounts (default: 20)")
+        parser.add_argument("--items", type=int, default=50, help="Wardrobe items per new client (default: 50)")
+        parser.add_argument("--prefix", default="load", help="Account prefix: <prefix>-client-<n>@example.com")
+        parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password of every seeded account")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same data)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per insert / COPY chunk")
+        parser.add_argument(
+            "--method", choices=["auto", "copy", "bulk"], default="auto",
+            help="Wardrobe insert method; auto uses COPY on PostgreSQL",
+        )
+        parser.add_argument("--skip-graph", action="store_true", help="Don't build the compatibility graphs")
+
+    def handle(self, *args, **options):
+        for name in ("clients", "stylists", "items"):
+            if options[name] < 0:
+                raise CommandError(f"--{name} must be >= 0")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be >= 1")
+
+        use_copy = {"auto": None, "copy": True, "bulk": False}[options["method"]]
+        started = time.perf_counter()
+        counts = seed_dataset(
+            clients=options["clients"],
+            stylists=options["stylists"],
+            items_per_client=options["items"],
+            prefix=options["prefix"],
+            password=options["password"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            use_copy=use_copy,
+            build_graph=not options["skip_graph"],
+            progress=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['clients']} clients, {counts['stylists']} stylists, "
+            f"{counts['wardrobe_items']} wardrobe items in {elapsed:.1f}s "
+            f"(log in as {options['prefix']}-client-<n>@example.com)."
+        ))
@@ -0,0 +1,135 @@
+# Standard library imports
+from base64 import b64decode, b64encode
+from urllib import parse
+
+# Django imports
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Third-party imports
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+# =========================
+# Cursor pagination
+# =========================
+class NewestFirstCursorPagination(CursorPagination):
+    """
+    Keyset pagination, newest first: each page is one index range scan on
+    (…, created_at, id) instead of an OFFSET that grows with the page number,
+    and rows inserted meanwhile never shift or duplicate entries between pages.
+
+    Stock CursorPagination keys the cursor on the first ordering field only and
+    falls back to an offset (capped at `offset_cutoff`) for equal values, so
+    more than a thousand rows sharing a timestamp could never be paged past.
+    Here the cursor holds the full (created_at, id) position and the next page
+    is `created_at < t OR (created_at = t AND id < i)`.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(queryset.model, ordering, position))
+
+        # One extra row tells whether anything follows in this direction
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+
+        first = self._get_position_from_instance(self.page[0], self.ordering) if self.page else position
+        last = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else position
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.next_position, self.previous_position = last, first
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _after(self, model, ordering, position) -> Q:
+        """Rows strictly after `position` in `ordering`: (a, b) > (x, y) spelled out for the index."""
+        values = []
+        for order, value in zip(ordering, position):
+            name = order.lstrip("-")
+            try:
+                values.append(model._meta.get_field(name).to_python(value))
+            except (ValidationError, LookupError):
+                raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        for i, order in reversed(list(enumerate(ordering))):
+            name = order.lstrip("-")
+            step = Q(**{f"{name}__{'lt' if order.startswith('-') else 'gt'}": values[i]})
+            condition = step if i == len(ordering) - 1 else step | (Q(**{name: values[i]}) & condition)
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode("ascii")).decode("ascii"), keep_blank_values=True)
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        position = tokens.get("p")
+        if position is None or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=tuple(position))
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": list(cursor.position)}
+        if cursor.reverse:
+            tokens["r"] = "1"
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        names = [order.lstrip("-") for order in ordering]
+        if isinstance(instance, dict):
+            return tuple(str(instance[name]) for name in names)
+        return tuple(str(getattr(instance, name)) for name in names)
+
+
+def _reverse(ordering):
+    return tuple(order[1:] if order.startswith("-") else f"-{order}" for order in ordering)
+
+
+# =========================
+# Ranked results
+# =========================
+class RankedResultsPagination(LimitOffsetPagination):
+    """
+    Pages of relevance-ranked results (search). A float rank makes a poor
+    cursor, and matches are few compared to the table, so plain limit/offset
+    over the index-selected matches is cheap.
+    """
+    default_limit = 20
+    max_limit = 100
@@ -0,0 +1,73 @@
+"""
+Streaming parsers for bulk uploads: NDJSON (one JSON object per line) and CSV
+(header row, one item per line). Both return a list of dicts, like a JSON
+array body, so views validate every format the same way.
+
+A view may cap the number of rows with a `max_bulk_rows` attribute; parsing
+stops with a 400 as soon as the cap is exceeded instead of reading the rest.
+"""
+
+# Standard library imports
+import codecs
+import csv
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+# Django imports
+from django.conf import settings
+
+# Third-party imports
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def _row_limit(parser_context: Optional[Dict[str, Any]]) -> Optional[int]:
+    view = (parser_context or {}).get("view")
+    return getattr(view, "max_bulk_rows", None)
+
+
+def _text_lines(stream, parser_context: Optional[Dict[str, Any]]) -> Iterable[str]:
+    encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+    return codecs.getreader(encoding)(stream)
+
+
+def _append(rows: List[Dict[str, Any]], row: Dict[str, Any], limit: Optional[int]) -> None:
+    rows.append(row)
+    if limit is not None and len(rows) > limit:
+        raise ParseError(f"At most {limit} rows per request.")
+
+
+class NDJSONParser(BaseParser):
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = _row_limit(parser_context)
+        rows: List[Dict[str, Any]] = []
+        try:
+            for number, line in enumerate(_text_lines(stream, parser_context), start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    raise ParseError(f"Line {number}: invalid JSON ({e}).")
+                _append(rows, row, limit)
+        except UnicodeDecodeError as e:
+            raise ParseError(f"Invalid encoding: {e}")
+        return rows
+
+
+class CSVParser(BaseParser):
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = _row_limit(parser_context)
+        rows: List[Dict[str, Any]] = []
+        try:
+            for record in csv.DictReader(_text_lines(stream, parser_context)):
+                # extra cells land under None; empty cells are left out like missing keys
+                _append(rows, {key.strip(): value for key, value in record.items() if key and value not in (None, "")}, limit)
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ParseError(f"Invalid CSV: {e}")
+        return rows
@@ -0,0 +1,38 @@
+# Standard library imports
+import threading
+
+# Django imports
+from django.conf import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# =========================
+# Shared Redis connection
+# =========================
+def get_redis_client():
+    """
+    Return a process-wide Redis client for settings.REDIS_URL, or None when
+    REDIS_URL is empty (features that use it then run per-process only).
+
+    The client connects lazily; callers should treat redis.RedisError from any
+    command as "Redis unavailable" and degrade instead of failing the request.
+    """
+    global _client
+    url = getattr(settings, "REDIS_URL", "")
+    if not url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                timeout = getattr(settings, "REDIS_SOCKET_TIMEOUT", 0.5)
+                _client = redis.Redis.from_url(
+                    url,
+                    socket_timeout=timeout,
+                    socket_connect_timeout=timeout,
+                    health_check_interval=30,
+                )
+    return _client
@@ -0,0 +1,229 @@
+"""
+common/seeding.py
+
+Production-scale synthetic data: clients, stylists and wardrobes in bulk
+(python manage.py seed_data).
+
+Design:
+- Rows are written with bulk inserts, so the per-row post_save handlers
+  (profile creation and its print, wardrobe indexing) never run; profiles are
+  inserted alongside their users instead, and the derived per-user data the
+  wardrobe signals maintain is built once per client afterwards (compatibility
+  graph; embeddings fill in lazily on first use).
+- On PostgreSQL (psycopg2) wardrobe items are streamed with COPY in chunks;
+  elsewhere they go through bulk_create with the same chunking, so memory stays
+  bounded by the chunk size rather than the wardrobe count.
+- Accounts are named `<prefix>-client-<n>@example.com` /
+  `<prefix>-stylist-<n>@example.com` and share one password hash (hashing is the
+  slowest part of creating a user). Re-running with the same prefix only adds the
+  accounts that are missing, so the load harness (common/loadtest.py) can always
+  log in as `<prefix>-client-0..N-1`.
+- Values come from seeded random generators: the same arguments produce the
+  same profiles and wardrobes.
+"""
+
+import csv
+import io
+import random
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from client.models import ClientProfile, WardrobeItem
+from recommendations.benchmark import BODY_SHAPES, FACE_SHAPES, GENDERS, SKIN_TONES, synthetic_items
+from stylist.models import StylistProfile
+
+
+DEFAULT_PASSWORD = "LoadTest#2024"
+EMAIL_DOMAIN = "example.com"
+
+_FIRST_NAMES = ("Ava", "Noah", "Mia", "Liam", "Zara", "Omar", "Lena", "Kai", "Nora", "Ravi", "Sofia", "Yuki")
+_LAST_NAMES = ("Khan", "Smith", "Garcia", "Chen", "Ahmed", "Rossi", "Novak", "Silva", "Haddad", "Kim")
+_EXPERTISE = ("streetwear", "formal", "vintage", "minimalist", "bridal", "business", "athleisure", "bohemian")
+
+
+def client_email(prefix: str, n: int) -> str:
+    return f"{prefix}-client-{n}@{EMAIL_DOMAIN}"
+
+
+def stylist_email(prefix: str, n: int) -> str:
+    return f"{prefix}-stylist-{n}@{EMAIL_DOMAIN}"
+
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --------- 1. Accounts and profiles --------- #
+
+def _create_users(
+    prefix: str,
+    count: int,
+    role: str,
+    password_hash: str,
+    rng: random.Random,
+    batch_size: int,
+) -> List[User]:
+    """Insert the `<prefix>-<role>-<n>` users that don't exist yet; returns the new ones."""
+    email_for = client_email if role == User.Role.CLIENT else stylist_email
+    # one prefix scan rather than an IN list of every email
+    existing = set(
+        User.objects.filter(email__startswith=f"{prefix}-{role}-").values_list("email", flat=True)
+    )
+    users = [
+        User(
+            email=email,
+            username=email.split("@")[0],
+            password=password_hash,
+            role=role,
+            first_name=rng.choice(_FIRST_NAMES),
+            last_name=rng.choice(_LAST_NAMES),
+            email_verified=True,
+        )
+        for email in (email_for(prefix, n) for n in range(count)) if email not in existing
+    ]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    return users
+
+
+def _client_profile(user: User, rng: random.Random) -> ClientProfile:
+    return ClientProfile(
+        user=user,
+        gender=rng.choice(GENDERS),
+        skin_tone=rng.choice(SKIN_TONES),
+        body_shape=rng.choice(BODY_SHAPES),
+        face_shape=rng.choice(FACE_SHAPES),
+    )
+
+
+def _stylist_profile(user: User, rng: random.Random) -> StylistProfile:
+    expertise = rng.sample(_EXPERTISE, rng.randint(1, 3))
+    return StylistProfile(
+        user=user,
+        bio=f"{rng.randint(2, 20)} years styling {', '.join(expertise)} looks.",
+        expertise=expertise,
+        years_experience=rng.randint(1, 25),
+        rating=round(rng.uniform(3.0, 5.0), 2),
+        rating_count=rng.randint(0, 500),
+    )
+
+
+# --------- 2. Wardrobes --------- #
+
+def _wardrobe_rows(clients: Sequence[User], per_client: int, seed: int) -> Iterator[Dict[str, Any]]:
+    for position, user in enumerate(clients):
+        for item in synthetic_items(per_client, seed=seed + position):
+            yield {"user_id": user.pk, **item}
+
+
+def _copy_available() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, "copy_expert")
+
+
+def _copy_items(rows: List[Dict[str, Any]]) -> None:
+    """COPY one chunk of wardrobe rows (psycopg2)."""
+    # One increasing timestamp per row, in insertion order, like the per-row
+    # auto_now_add of the bulk_create path (not one value for the whole chunk)
+    start = timezone.now()
+    columns = ("user_id", "image_url", "title", "color", "category", "description", "created_at", "updated_at")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for n, row in enumerate(rows):
+        stamp = (start + timedelta(microseconds=n)).isoformat()
+        writer.writerow([
+            row["user_id"], row["image_url"], row["title"], row["color"], row["category"],
+            r"\N" if row["description"] is None else row["description"], stamp, stamp,
+        ])
+    buffer.seek(0)
+    table = connection.ops.quote_name(WardrobeItem._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+
+
+def _insert_items(rows: List[Dict[str, Any]]) -> None:
+    WardrobeItem.objects.bulk_create([WardrobeItem(**row) for row in rows], batch_size=len(rows))
+
+
+def insert_wardrobes(
+    clients: Sequence[User],
+    per_client: int,
+    *,
+    seed: int = 0,
+    chunk_size: int = 5000,
+    use_copy: Optional[bool] = None,
+) -> int:
+    """Insert `per_client` synthetic items for each client; returns the row count."""
+    if use_copy is None:
+        use_copy = _copy_available()
+    write: Callable[[List[Dict[str, Any]]], None] = _copy_items if use_copy else _insert_items
+    total = 0
+    for chunk in _chunks(_wardrobe_rows(clients, per_client, seed), chunk_size):
+        with transaction.atomic():
+            write(chunk)
+        total += len(chunk)
+    return total
+
+
+# --------- 3. Entry point --------- #
+
+def seed_dataset(
+    *,
+    clients: int,
+    stylists: int,
+    items_per_client: int,
+    prefix: str = "load",
+    password: str = DEFAULT_PASSWORD,
+    seed: int = 0,
+    batch_size: int = 1000,
+    use_copy: Optional[bool] = None,
+    build_graph: bool = True,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, int]:
+    """
+    Create the missing `<prefix>` clients (each with a profile and
+    `items_per_client` wardrobe items) and stylists. Returns row counts.
+    """
+    report = progress or (lambda message: None)
+    rng = random.Random(seed)
+    password_hash = make_password(password)
+
+    with transaction.atomic():
+        new_clients = _create_users(prefix, clients, User.Role.CLIENT, password_hash, rng, batch_size)
+        ClientProfile.objects.bulk_create([_client_profile(u, rng) for u in new_clients], batch_size=batch_size)
+        new_stylists = _create_users(prefix, stylists, User.Role.STYLIST, password_hash, rng, batch_size)
+        StylistProfile.objects.bulk_create([_stylist_profile(u, rng) for u in new_stylists], batch_size=batch_size)
+    report(f"{len(new_clients)} clients and {len(new_stylists)} stylists created")
+
+    items = insert_wardrobes(new_clients, items_per_client, seed=seed, chunk_size=max(batch_size, 1), use_copy=use_copy)
+    report(f"{items} wardrobe items inserted")
+
+    edges = 0
+    if build_graph and items:
+        from recommendations.services import compatibility_graph
+
+        for user in new_clients:
+            edges += compatibility_graph.rebuild_user(user.pk)
+        report(f"{edges} compatibility edges built")
+
+    return {
+        "clients": len(new_clients),
+        "stylists": len(new_stylists),
+        "wardrobe_items": items,
+        "compatibility_edges": edges,
+    }
@@ -1,3 +1,82 @@
-from django.test import TestCase
+import io
+import random
+import time
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from accounts.models import User
+from client.models import ClientProfile, WardrobeItem
+from recommendations.models import ItemCompatibility
+from stylist.models import StylistProfile
+
+from .loadtest import LoadTest, format_table, parse_mix
+from .seeding import DEFAULT_PASSWORD, client_email
+
+
+# =========================
+# Synthetic data seeding
+# =========================
+class SeedDataTests(TestCase):
+    def seed(self):
+        out = io.StringIO()
+        call_command("seed_data", clients=3, stylists=2, items=20, prefix="t", stdout=out)
+        return out.getvalue()
+
+    def test_seeding_is_idempotent_and_builds_the_graph(self):
+        self.assertIn("Seeded 3 clients, 2 stylists, 60 wardrobe items", self.seed())
+        clients = User.objects.filter(email__startswith="t-client-")
+        self.assertEqual(sorted(clients.values_list("email", flat=True)), [client_email("t", n) for n in range(3)])
+        self.assertEqual(ClientProfile.objects.filter(user__in=clients).exclude(gender="").count(), 3)
+        self.assertEqual(StylistProfile.objects.filter(user__email__startswith="t-stylist-").count(), 2)
+        for user in clients:
+            self.assertEqual(WardrobeItem.objects.filter(user=user).count(), 20)
+            self.assertTrue(ItemCompatibility.objects.filter(user=user).exists())
+        self.assertTrue(clients[0].check_password(DEFAULT_PASSWORD))
+
+        edges = ItemCompatibility.objects.count()
+        self.assertIn("Seeded 0 clients, 0 stylists, 0 wardrobe items", self.seed())
+        self.assertEqual((User.objects.count(), WardrobeItem.objects.count(), ItemCompatibility.objects.count()),
+                         (5, 60, edges))
+
+
+# =========================
+# Load-test harness
+# =========================
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+
+class LoadTestReportTests(SimpleTestCase):
+    def test_routes_are_counted_and_summarized(self):
+        harness = LoadTest("http://testserver", users=1)
+        user = harness.users[0]
+        outcomes = [FakeResponse(200), FakeResponse(503), requests.ConnectionError()]
+        with mock.patch.object(harness, "_send", side_effect=outcomes):
+            for _ in outcomes:
+                harness._execute("me", user, time.perf_counter(), random.Random(0))
+        harness._samples["stylists"] = [(float(ms), ms / 2) for ms in range(1, 101)]
+        harness._statuses["stylists"] = Counter({"200": 100})
+
+        summary = harness._summary(rate=10, duration=10, requests=103, wall=10.0, late=0)
+        me, stylists = summary["routes"]["me"], summary["routes"]["stylists"]
+        self.assertEqual((me["count"], me["errors"], me["status"]), (3, 2, {"200": 1, "503": 1}))
+        self.assertEqual(me["error_kinds"], {"HTTP 503": 1, "ConnectionError": 1})
+        self.assertEqual(stylists["latency_ms"], {"p50": 50.5, "p95": 95.05, "p99": 99.01, "max": 100.0})
+        self.assertEqual(stylists["service_ms"], {"p50": 25.25, "p95": 47.525, "p99": 49.505})
+        self.assertEqual((summary["errors"], summary["achieved_rps"], summary["latency_ms"]["max"]), (2, 10.3, 100.0))
+
+        lines = format_table(summary)
+        self.assertEqual([line.split()[0] for line in lines], ["route", "me", "stylists", "all"])
+        self.assertEqual(lines[-1].split()[1:3], ["103", "2"])
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("me=10, recommend"), {"me": 10, "recommend": 1})
+        for spec in ("teleport=1", "me=lots", "me=0"):
+            with self.assertRaises(ValueError):
+                parse_mix(spec)
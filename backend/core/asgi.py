@@ -13,5 +13,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings.dev'))
 
-
 application = get_asgi_application()
+
+# ASGI servers (uvicorn) import this module in every worker process,
+# so this is the post-fork point to build the stylist backend.
+if os.environ.get('STYLIST_WARMUP_ON_STARTUP', 'False') == 'True':
+    from agents.style_agent import warm_up
+
+    warm_up()
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+import agents.metrics  # noqa: F401  (registers the pipeline metrics)
+from common.metrics import gauge_lines, render
+from recommendations.services import (
+    llm_resilience,
+    recommendation_cache,
+    recommendation_flight,
+    refinement_sessions,
+    wardrobe_index,
+)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (text format 0.0.4), per process.
+    Requires `Authorization: Bearer <METRICS_TOKEN>`; without a token
+    configured, only staff sessions (Django admin login) may read it.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not constant_time_compare(supplied, token):
+            return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    elif not request.user.is_staff:
+        return HttpResponse("Forbidden\n", status=403, content_type="text/plain")
+
+    lines = []
+    for key, value in recommendation_cache.stats().items():
+        lines += gauge_lines(f"stylegenie_recommendation_cache_{key}", f"Recommendation cache {key}.", value)
+    for key, value in recommendation_flight.stats().items():
+        lines += gauge_lines(f"stylegenie_recommendation_singleflight_{key}", f"Request coalescing {key}.", value)
+    for key, value in refinement_sessions.stats().items():
+        lines += gauge_lines(f"stylegenie_refinement_sessions_{key}", f"Refinement sessions {key}.", value)
+    for key, value in wardrobe_index.stats().items():
+        lines += gauge_lines(f"stylegenie_wardrobe_index_{key}", f"Wardrobe vector index {key}.", value)
+    breaker = llm_resilience.breaker.stats()
+    lines += gauge_lines(
+        "stylegenie_llm_circuit_open", "1 while the stylist LLM circuit breaker is open.", int(breaker["state"] == "open")
+    )
+
+    body = render() + "\n".join(lines) + "\n"
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,7 @@
 # B A S E    S E T T I N G S
 # core/settings/base.py
 from datetime import timedelta
+from celery.schedules import crontab
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -21,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # 3rd party apps
     'rest_framework',
@@ -34,6 +36,7 @@ INSTALLED_APPS = [
     'client',
     'stylist',
     'recommendations',
+    'appointments',
 ]
 
 MIDDLEWARE = [
@@ -112,6 +115,95 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_RESULT_EXPIRES = int(os.environ.get('CELERY_RESULT_EXPIRES', 3600))  # seconds a job result stays pollable
+
+# Pre-generation of outfits for upcoming events (appointments app), off-peak via celery beat
+APPOINTMENTS_PREGEN_HOURS = os.environ.get('APPOINTMENTS_PREGEN_HOURS', '1-5')  # crontab hours (CELERY_TIMEZONE) the job runs in
+APPOINTMENTS_PREGEN_EVERY_MINUTES = int(os.environ.get('APPOINTMENTS_PREGEN_EVERY_MINUTES', 10))
+APPOINTMENTS_PREGEN_BATCH = int(os.environ.get('APPOINTMENTS_PREGEN_BATCH', 30))  # events claimed per run
+APPOINTMENTS_PREGEN_RATE_PER_MINUTE = float(os.environ.get('APPOINTMENTS_PREGEN_RATE_PER_MINUTE', 6))  # generations started per minute
+APPOINTMENTS_PREGEN_HORIZON_HOURS = int(os.environ.get('APPOINTMENTS_PREGEN_HORIZON_HOURS', 72))  # how far ahead events are generated
+APPOINTMENTS_PREGEN_MAX_ATTEMPTS = int(os.environ.get('APPOINTMENTS_PREGEN_MAX_ATTEMPTS', 3))
+APPOINTMENTS_MAX_UPCOMING = int(os.environ.get('APPOINTMENTS_MAX_UPCOMING', 20))  # future events per user
+
+CELERY_BEAT_SCHEDULE = {
+    'pregenerate-upcoming-events': {
+        'task': 'appointments.pregenerate_due_events',
+        'schedule': crontab(minute=f'*/{APPOINTMENTS_PREGEN_EVERY_MINUTES}', hour=APPOINTMENTS_PREGEN_HOURS),
+    },
+}
+
+# Shared Redis for cross-process coordination (locks, limits); "" keeps it per-process
+REDIS_URL = os.environ.get('REDIS_URL', CELERY_BROKER_URL)
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 0.5))  # seconds
+
+
+# A G E N T   S E T T I N G S
+STYLIST_LLM_BACKEND = os.environ.get('STYLIST_LLM_BACKEND', 'gemini')  # "gemini", "openai" or "fake" (offline stand-in)
+STYLIST_GEMINI_MODEL = os.environ.get('STYLIST_GEMINI_MODEL', 'gemini-2.5-flash')
+STYLIST_OPENAI_MODEL = os.environ.get('STYLIST_OPENAI_MODEL', 'gpt-4o-mini')
+STYLIST_PAYLOAD_ENCODER = os.environ.get('STYLIST_PAYLOAD_ENCODER', 'json')  # "json" (pretty JSON) or "compact" (tabular)
+STYLIST_LLM_TIMEOUT = float(os.environ.get('STYLIST_LLM_TIMEOUT', 25))  # seconds per provider request
+
+# Fake backend knobs (benchmarks / soak tests)
+STYLIST_FAKE_LATENCY_MS = float(os.environ.get('STYLIST_FAKE_LATENCY_MS', 0))
+STYLIST_FAKE_JITTER_MS = float(os.environ.get('STYLIST_FAKE_JITTER_MS', 0))
+STYLIST_FAKE_ERROR_RATE = float(os.environ.get('STYLIST_FAKE_ERROR_RATE', 0))
+STYLIST_FAKE_SEED = int(os.environ.get('STYLIST_FAKE_SEED', 0))
+
+
+# R E C O M M E N D A T I O N S   S E T T I N G S
+RECOMMENDATION_ENGINE = os.environ.get('RECOMMENDATION_ENGINE', 'llm')  # "llm" or "rules" (offline rule engine)
+RECOMMENDATION_RULES_FALLBACK = os.environ.get('RECOMMENDATION_RULES_FALLBACK', 'True') == 'True'  # use rules when the LLM fails
+RECOMMENDATION_PROMPT_TOKEN_BUDGET = int(os.environ.get('RECOMMENDATION_PROMPT_TOKEN_BUDGET', 1200))  # wardrobe tokens per prompt
+RECOMMENDATION_GAZETTEER_PATH = os.environ.get('RECOMMENDATION_GAZETTEER_PATH', '')  # "" = bundled recommendations/data/gazetteer.npy
+RECOMMENDATION_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 900))  # seconds
+RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', 512))  # 0 disables the cache
+RECOMMENDATION_BATCH_MAX_SLOTS = int(os.environ.get('RECOMMENDATION_BATCH_MAX_SLOTS', 14))
+RECOMMENDATION_BATCH_CONCURRENCY = int(os.environ.get('RECOMMENDATION_BATCH_CONCURRENCY', 4))  # parallel LLM calls per batch
+RECOMMENDATION_SINGLEFLIGHT_TIMEOUT = float(os.environ.get('RECOMMENDATION_SINGLEFLIGHT_TIMEOUT', 75))  # max wait on an identical in-flight call; above queue timeout + LLM deadline
+
+# Conversational refinement checkpoints (shared through REDIS_URL)
+RECOMMENDATION_REFINE_TTL = int(os.environ.get('RECOMMENDATION_REFINE_TTL', 1800))  # seconds since the last turn
+RECOMMENDATION_REFINE_MAX_AGE = int(os.environ.get('RECOMMENDATION_REFINE_MAX_AGE', 14400))  # seconds since the recommendation
+RECOMMENDATION_REFINE_MAX_TURNS = int(os.environ.get('RECOMMENDATION_REFINE_MAX_TURNS', 5))  # earlier change requests kept
+RECOMMENDATION_REFINE_MAX_SESSIONS = int(os.environ.get('RECOMMENDATION_REFINE_MAX_SESSIONS', 1000))  # per process without Redis
+RECOMMENDATION_REFINE_TOKEN_BUDGET = int(os.environ.get('RECOMMENDATION_REFINE_TOKEN_BUDGET', 400))  # alternate items per checkpoint
+
+# Per-user compatibility graph (top partners per item and category, in the DB)
+RECOMMENDATION_COMPAT_TOP_K = int(os.environ.get('RECOMMENDATION_COMPAT_TOP_K', 8))  # edges kept per item and category; rebuild after changing
+RECOMMENDATION_COMPAT_PARTNERS = int(os.environ.get('RECOMMENDATION_COMPAT_PARTNERS', 3))  # partners read per category head when pruning; 0 disables
+
+# Wardrobe embedding index (similar items, duplicate report)
+WARDROBE_INDEX_MAX_USERS = int(os.environ.get('WARDROBE_INDEX_MAX_USERS', 256))  # user matrices cached per process; 0 disables
+WARDROBE_INDEX_TTL = int(os.environ.get('WARDROBE_INDEX_TTL', 300))  # seconds
+WARDROBE_DUPLICATE_THRESHOLD = float(os.environ.get('WARDROBE_DUPLICATE_THRESHOLD', 0.92))  # default cosine for the duplicate report
+RECOMMENDATION_DEDUPE_THRESHOLD = float(os.environ.get('RECOMMENDATION_DEDUPE_THRESHOLD', 0.95))  # marked on save, left out of prompts; 0 disables, run mark_near_duplicates after changing
+
+# Bulk wardrobe import/update/delete
+WARDROBE_BULK_MAX_ITEMS = int(os.environ.get('WARDROBE_BULK_MAX_ITEMS', 500))  # rows per request
+WARDROBE_BULK_BATCH_SIZE = int(os.environ.get('WARDROBE_BULK_BATCH_SIZE', 200))  # rows per INSERT/UPDATE statement
+
+# Admission control for LLM calls (shared through REDIS_URL)
+RECOMMENDATION_LLM_MAX_CONCURRENCY = int(os.environ.get('RECOMMENDATION_LLM_MAX_CONCURRENCY', 8))  # all workers; 0 = unlimited
+RECOMMENDATION_LLM_QUEUE_SIZE = int(os.environ.get('RECOMMENDATION_LLM_QUEUE_SIZE', 16))  # calls allowed to wait for a slot
+RECOMMENDATION_LLM_QUEUE_TIMEOUT = float(os.environ.get('RECOMMENDATION_LLM_QUEUE_TIMEOUT', 10))  # seconds a call may wait
+RECOMMENDATION_LLM_LEASE_SECONDS = float(os.environ.get('RECOMMENDATION_LLM_LEASE_SECONDS', 120))  # slot of a crashed worker frees after this
+RECOMMENDATION_USER_RATE_PER_MINUTE = float(os.environ.get('RECOMMENDATION_USER_RATE_PER_MINUTE', 6))  # LLM calls per user; 0 = no quota
+RECOMMENDATION_USER_BURST = int(os.environ.get('RECOMMENDATION_USER_BURST', 5))  # a recommend + batch + stream + refinements session
+
+# Resilience of LLM calls: retries with jittered backoff, hedging, circuit breaker
+RECOMMENDATION_LLM_DEADLINE = float(os.environ.get('RECOMMENDATION_LLM_DEADLINE', 60))  # seconds for all attempts together
+RECOMMENDATION_LLM_MAX_RETRIES = int(os.environ.get('RECOMMENDATION_LLM_MAX_RETRIES', 1))  # transient failures only
+RECOMMENDATION_LLM_BACKOFF_BASE = float(os.environ.get('RECOMMENDATION_LLM_BACKOFF_BASE', 0.5))
+RECOMMENDATION_LLM_BACKOFF_MAX = float(os.environ.get('RECOMMENDATION_LLM_BACKOFF_MAX', 4))
+RECOMMENDATION_LLM_HEDGE = os.environ.get('RECOMMENDATION_LLM_HEDGE', 'False') == 'True'  # duplicate slow calls after p95
+RECOMMENDATION_LLM_HEDGE_AFTER = float(os.environ.get('RECOMMENDATION_LLM_HEDGE_AFTER', 8))  # seconds, until p95 is known
+RECOMMENDATION_BREAKER_FAILURES = int(os.environ.get('RECOMMENDATION_BREAKER_FAILURES', 5))  # consecutive failed calls to open
+RECOMMENDATION_BREAKER_RESET = float(os.environ.get('RECOMMENDATION_BREAKER_RESET', 30))  # seconds open before a probe
+
+# Bearer token required by /metrics/ ("" = staff sessions only)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
 
 # C O R S   &   C S R F   S E T T I N G S
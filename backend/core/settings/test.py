@@ -11,3 +11,6 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# No shared Redis in tests: coordination stays in-process
+REDIS_URL = os.environ.get('TEST_REDIS_URL', '')
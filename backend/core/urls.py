@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from .health import health_check
+from .metrics import metrics_view
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -10,11 +11,13 @@ from drf_spectacular.views import (
 urlpatterns = [
     path('admin/', admin.site.urls), 
     path('health/', health_check, name='health-check'),
+    path('metrics/', metrics_view, name='metrics'),
     
     path('client/', include('client.urls')),     
     path('stylist/', include('stylist.urls')),   
     
     path('client/', include('recommendations.urls')),   
+    path('client/', include('appointments.urls')),
     
     # OpenAPI schema
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -0,0 +1,16 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn core.wsgi:application` run from backend/.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# Above RECOMMENDATION_LLM_DEADLINE so slow LLM calls end in a fallback, not a killed worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 90))
+
+
+def post_worker_init(worker):
+    # Build the stylist LLM backend once per worker, after fork, so the first
+    # recommendation request doesn't pay for it.
+    from agents.style_agent import warm_up
+
+    warm_up()
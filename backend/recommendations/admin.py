@@ -1,3 +1,15 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Outfit, Recommendation
+
+
+class OutfitInline(admin.TabularInline):
+    model = Outfit
+    extra = 0
+
+
+@admin.register(Recommendation)
+class RecommendationAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "occasion", "destination", "source", "model", "created_at")
+    list_filter = ("source",)
+    inlines = [OutfitInline]
@@ -0,0 +1,367 @@
+"""
+recommendations/admission.py
+
+Admission control in front of the stylist LLM.
+
+Design:
+- Per-user token bucket (`user_rate_per_minute`, `user_burst`): each LLM
+  request spends one token; an empty bucket rejects with the seconds until the
+  next token. A call then rejected as busy gets its token back. The slots of
+  one batch request share a single token (`batch()`). Cache hits and
+  coalesced followers never reach it.
+- Global concurrency semaphore (`max_concurrency` calls across all workers):
+  holders are lease-stamped so a crashed worker frees its slot after
+  `lease_seconds`.
+- Bounded FIFO wait queue: when all slots are busy a call waits up to
+  `wait_timeout` seconds, but only if fewer than `queue_size` calls are
+  already waiting; otherwise it is rejected at once.
+- State lives in Redis (Lua scripts, so every check is one atomic round trip)
+  and is shared by web and Celery workers. Without Redis the same limits
+  apply per process.
+- `try_slot()` takes a slot only if one is free right now (no queueing); the
+  resilience layer uses it for hedges and for retries that would overlap an
+  abandoned attempt, so every running provider call holds a slot.
+- Rejections raise AdmissionRejected(reason, retry_after); views turn it into
+  429 + Retry-After.
+"""
+
+import logging
+import math
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional, Tuple
+
+from agents.metrics import STAGE_SECONDS
+from common.metrics import Counter
+from common.redis_client import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+ADMISSIONS = Counter(
+    "stylegenie_llm_admissions_total",
+    "Admission decisions for stylist LLM calls (admitted, rejected_quota, rejected_busy).",
+    ["outcome"],
+)
+
+
+class AdmissionRejected(Exception):
+    """The LLM call was not admitted; retry after `retry_after` seconds."""
+
+    QUOTA = "quota"
+    BUSY = "busy"
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        if reason == self.QUOTA:
+            message = "You're generating recommendations too quickly. Please try again shortly."
+        else:
+            message = "The stylist is busy right now. Please try again shortly."
+        super().__init__(message)
+
+
+# KEYS[1] bucket hash; ARGV: tokens per second, burst -> {allowed, retry_after}
+_TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed, retry = 0, 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+# KEYS[1] bucket hash; ARGV: burst -> give back one token taken by _TOKEN_BUCKET_LUA
+_REFUND_LUA = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+  redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1)))
+end
+return 1
+"""
+
+# KEYS[1] holders zset, KEYS[2] waiters zset (scores are expiry times)
+# ARGV: token, limit, lease seconds, queue size, wait timeout
+# -> 1 acquired, 0 queued (poll again), -1 queue full
+_SEMAPHORE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local free = tonumber(ARGV[2]) - redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZRANK', KEYS[2], ARGV[1])
+local queued = rank ~= false
+if not queued then
+  rank = redis.call('ZCARD', KEYS[2])
+end
+if rank < free then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+  redis.call('ZREM', KEYS[2], ARGV[1])
+  return 1
+end
+if queued then
+  return 0
+end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[4]) then
+  return -1
+end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[5]), ARGV[1])
+return 0
+"""
+
+
+class _LocalState:
+    """Per-process stand-in for the Redis state."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+
+class AdmissionController:
+    """Token bucket per user + global semaphore with a bounded wait queue."""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        max_concurrency: int = 8,
+        queue_size: int = 16,
+        wait_timeout: float = 10.0,
+        lease_seconds: float = 120.0,
+        user_rate_per_minute: float = 6.0,
+        user_burst: int = 3,
+        poll_interval: float = 0.05,
+        redis_factory: Callable[[], Any] = get_redis_client,
+    ):
+        self.namespace = namespace
+        self.max_concurrency = max_concurrency  # 0 = unlimited
+        self.queue_size = queue_size
+        self.wait_timeout = wait_timeout
+        self.lease_seconds = lease_seconds
+        self.user_rate = user_rate_per_minute / 60.0  # 0 = no per-user quota
+        self.user_burst = max(1, user_burst)
+        self.poll_interval = poll_interval
+        self._redis_factory = redis_factory
+        self._local = _LocalState()
+
+    @contextmanager
+    def admit(self, user_id) -> Iterator[None]:
+        """Spend one of the user's tokens, then hold a global slot for the block."""
+        self.check_user_quota(user_id)
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(self.slot())
+            except AdmissionRejected:
+                self.refund_token(user_id)  # busy: the call never ran
+                raise
+            yield
+
+    def batch(self, user_id) -> Callable[[], ContextManager[None]]:
+        """
+        admit() for the calls of one batch request: the first call admitted
+        spends the user's token, the others only hold slots.
+        """
+        lock = threading.Lock()
+        charged = False
+
+        @contextmanager
+        def admit() -> Iterator[None]:
+            nonlocal charged
+            with lock:
+                spend = not charged
+                if spend:
+                    self.check_user_quota(user_id)
+                    charged = True
+            with ExitStack() as stack:
+                try:
+                    stack.enter_context(self.slot())
+                except AdmissionRejected:
+                    if spend:
+                        with lock:
+                            charged = False
+                        self.refund_token(user_id)
+                    raise
+                yield
+
+        return admit
+
+    # --------- per-user token bucket --------- #
+
+    def check_user_quota(self, user_id) -> None:
+        if self.user_rate <= 0:
+            return
+        allowed, retry_after = self._take_token(str(user_id))
+        if not allowed:
+            ADMISSIONS.inc(outcome="rejected_quota")
+            raise AdmissionRejected(AdmissionRejected.QUOTA, retry_after)
+
+    def refund_token(self, user_id) -> None:
+        """Give back the token of a call that was admitted by quota but never ran."""
+        if self.user_rate <= 0:
+            return
+        from redis.exceptions import RedisError
+
+        user_key = str(user_id)
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                client.eval(_REFUND_LUA, 1, f"{self.namespace}:bucket:{user_key}", self.user_burst)
+                return
+            except RedisError:
+                logger.warning("Redis unavailable for LLM quota; using per-process bucket", exc_info=True)
+        with self._local.cond:
+            if user_key in self._local.buckets:
+                tokens, ts = self._local.buckets[user_key]
+                self._local.buckets[user_key] = (min(self.user_burst, tokens + 1), ts)
+
+    def _take_token(self, user_key: str) -> Tuple[bool, float]:
+        from redis.exceptions import RedisError
+
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                allowed, retry = client.eval(
+                    _TOKEN_BUCKET_LUA, 1, f"{self.namespace}:bucket:{user_key}", self.user_rate, self.user_burst
+                )
+                return bool(int(allowed)), float(retry)
+            except RedisError:
+                logger.warning("Redis unavailable for LLM quota; using per-process bucket", exc_info=True)
+
+        with self._local.cond:
+            now = time.monotonic()
+            tokens, ts = self._local.buckets.get(user_key, (float(self.user_burst), now))
+            tokens = min(self.user_burst, tokens + (now - ts) * self.user_rate)
+            if tokens >= 1:
+                self._local.buckets[user_key] = (tokens - 1, now)
+                return True, 0.0
+            self._local.buckets[user_key] = (tokens, now)
+            return False, (1 - tokens) / self.user_rate
+
+    # --------- global semaphore + wait queue --------- #
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        if self.max_concurrency <= 0:
+            yield
+            return
+        with STAGE_SECONDS.time(stage="admission_wait"):
+            release = self._acquire()
+        ADMISSIONS.inc(outcome="admitted")
+        try:
+            yield
+        finally:
+            release()
+
+    def try_slot(self) -> Optional[Callable[[], None]]:
+        """Take a free slot without waiting: its release callable, or None if all are busy."""
+        if self.max_concurrency <= 0:
+            return lambda: None
+        from redis.exceptions import RedisError
+
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                return self._try_redis(client)
+            except RedisError:
+                logger.warning("Redis unavailable for LLM concurrency limit; using per-process limit", exc_info=True)
+        state = self._local
+        with state.cond:
+            if state.active >= self.max_concurrency or state.waiting:
+                return None
+            state.active += 1
+        return self._release_local
+
+    def _reject_busy(self):
+        ADMISSIONS.inc(outcome="rejected_busy")
+        return AdmissionRejected(AdmissionRejected.BUSY, self.wait_timeout)
+
+    def _acquire(self) -> Callable[[], None]:
+        from redis.exceptions import RedisError
+
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                return self._acquire_redis(client)
+            except RedisError:
+                logger.warning("Redis unavailable for LLM concurrency limit; using per-process limit", exc_info=True)
+        return self._acquire_local()
+
+    def _acquire_redis(self, client) -> Callable[[], None]:
+        holders = f"{self.namespace}:holders"
+        waiters = f"{self.namespace}:waiters"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        args = (token, self.max_concurrency, self.lease_seconds, self.queue_size, self.wait_timeout)
+        while True:
+            state = int(client.eval(_SEMAPHORE_LUA, 2, holders, waiters, *args))
+            if state == 1:
+                break
+            if state == -1:
+                raise self._reject_busy()
+            if time.monotonic() >= deadline:
+                client.zrem(waiters, token)
+                raise self._reject_busy()
+            time.sleep(self.poll_interval)
+        return self._release_redis(client, holders, token)
+
+    def _try_redis(self, client) -> Optional[Callable[[], None]]:
+        holders = f"{self.namespace}:holders"
+        token = uuid.uuid4().hex
+        # queue size 0: acquired if a slot is free and nobody is waiting for it
+        args = (token, self.max_concurrency, self.lease_seconds, 0, 0)
+        if int(client.eval(_SEMAPHORE_LUA, 2, holders, f"{self.namespace}:waiters", *args)) != 1:
+            return None
+        return self._release_redis(client, holders, token)
+
+    @staticmethod
+    def _release_redis(client, holders: str, token: str) -> Callable[[], None]:
+        from redis.exceptions import RedisError
+
+        def release() -> None:
+            try:
+                client.zrem(holders, token)
+            except RedisError:
+                pass  # the lease expires on its own
+
+        return release
+
+    def _acquire_local(self) -> Callable[[], None]:
+        state = self._local
+        deadline = time.monotonic() + self.wait_timeout
+        with state.cond:
+            if state.active >= self.max_concurrency:
+                if state.waiting >= self.queue_size:
+                    raise self._reject_busy()
+                state.waiting += 1
+                try:
+                    while state.active >= self.max_concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject_busy()
+                        state.cond.wait(remaining)
+                finally:
+                    state.waiting -= 1
+            state.active += 1
+        return self._release_local
+
+    def _release_local(self) -> None:
+        with self._local.cond:
+            self._local.active -= 1
+            self._local.cond.notify()
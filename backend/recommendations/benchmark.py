@@ -0,0 +1,234 @@
+"""
+recommendations/benchmark.py
+
+Reproducible benchmarks of the recommendation hot path (python manage.py bench_recommend).
+
+Design:
+- Runs against a throwaway test database, with synthetic clients whose
+  wardrobes are generated from a seed (same seed, same wardrobe, same ids
+  order), written with bulk inserts plus the derived data the save signals
+  would have produced (compatibility graph).
+- The agent is the fake backend (agents/backends.py) with a configurable
+  latency, so the numbers are our own code plus a known, constant model cost.
+- A case is one target (`service`: recommend(), `view`: POST /client/recommendations/
+  through the full Django/DRF stack) x wardrobe size x concurrency level.
+  Each case warms up, then issues `requests` timed calls from `concurrency`
+  threads. Every call uses a distinct occasion so it misses the result cache,
+  unless cache hits are what is being measured.
+- Per call: wall time and SQL queries (execute_wrapper on the calling thread's
+  connection). Per case: p50/p95/p99, throughput, and the peak Python heap of
+  one call, measured in a separate untimed pass under tracemalloc so tracing
+  never slows the timed one.
+- Results are plain JSON (sorted keys) with the environment (git commit,
+  versions, DB vendor) so runs on two commits can be diffed.
+"""
+
+import itertools
+import os
+import platform
+import random
+import secrets
+import subprocess
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import django
+from django.conf import settings
+from django.db import connection, connections
+
+from accounts.models import User
+from client.models import ClientProfile, WardrobeItem
+
+
+# --------- 1. Synthetic data --------- #
+
+_NOUNS = {
+    "top": ("shirt", "tee", "blouse", "polo", "sweater", "tank top", "henley"),
+    "bottom": ("chinos", "jeans", "trousers", "skirt", "shorts", "joggers"),
+    "outerwear": ("blazer", "jacket", "coat", "cardigan", "parka", "trench"),
+    "footwear": ("loafers", "sneakers", "boots", "heels", "sandals", "oxfords"),
+    "accessory": ("watch", "scarf", "belt", "tie", "bag", "sunglasses"),
+    "dress": ("midi dress", "maxi dress", "sheath dress", "wrap dress"),
+    "suit": ("two-piece suit", "three-piece suit", "linen suit"),
+    "other": ("umbrella", "gym kit"),
+}
+_FABRICS = ("cotton", "linen", "wool", "silk", "denim", "leather", "cashmere", "polyester")
+_FITS = ("slim", "regular", "relaxed", "oversized", "tailored")
+# Rough category mix of a real wardrobe
+_CATEGORY_WEIGHTS = {
+    "top": 30, "bottom": 20, "outerwear": 10, "footwear": 12,
+    "accessory": 14, "dress": 6, "suit": 4, "other": 4,
+}
+
+SKIN_TONES = tuple(ClientProfile.SkinTone.values)
+BODY_SHAPES = tuple(ClientProfile.BodyShape.values)
+FACE_SHAPES = tuple(ClientProfile.FaceShape.values)
+GENDERS = ("male", "female", "non_binary")
+
+
+def synthetic_items(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`size` plausible wardrobe items (title, color, category, description), deterministic per seed."""
+    rng = random.Random(seed)
+    categories = list(_CATEGORY_WEIGHTS)
+    weights = list(_CATEGORY_WEIGHTS.values())
+    colors = WardrobeItem.Color.values
+    items = []
+    for n in range(size):
+        category = rng.choices(categories, weights)[0]
+        color = rng.choice(colors)
+        noun = rng.choice(_NOUNS[category])
+        fabric = rng.choice(_FABRICS)
+        items.append({
+            "title": f"{rng.choice(_FITS).capitalize()} {color} {fabric} {noun}",
+            "color": color,
+            "category": category,
+            "description": f"{fabric.capitalize()} {noun}, {rng.choice(_FITS)} fit." if rng.random() < 0.4 else None,
+            "image_url": f"https://example.com/wardrobe/{seed}/{n}.jpg",
+        })
+    return items
+
+
+def create_client(email: str, *, seed: int = 0, password: Optional[str] = None) -> User:
+    """A client with a complete (seeded) style profile and no wardrobe."""
+    rng = random.Random(seed)
+    user = User.objects.create_user(
+        email=email, username=email.split("@")[0], password=password or secrets.token_urlsafe(16),
+    )
+    profile, _ = ClientProfile.objects.get_or_create(user=user)
+    profile.gender = rng.choice(GENDERS)
+    profile.skin_tone = rng.choice(SKIN_TONES)
+    profile.body_shape = rng.choice(BODY_SHAPES)
+    profile.face_shape = rng.choice(FACE_SHAPES)
+    profile.save()
+    return user
+
+
+def seed_wardrobe(user: User, size: int, *, seed: int = 0, batch_size: int = 1000) -> int:
+    """
+    Bulk-insert a synthetic wardrobe. Bulk inserts skip the save signals, so the
+    derived per-user data is refreshed here: cached answers/vectors are dropped
+    (embeddings fill in lazily) and the compatibility graph is rebuilt.
+    """
+    from .services import compatibility_graph, recommendation_cache, wardrobe_index
+
+    WardrobeItem.objects.bulk_create(
+        [WardrobeItem(user=user, **item) for item in synthetic_items(size, seed)],
+        batch_size=batch_size,
+    )
+    recommendation_cache.invalidate_user(user.pk)
+    wardrobe_index.invalidate_user(user.pk)
+    compatibility_graph.rebuild_user(user.pk)
+    return size
+
+
+# --------- 2. Measuring --------- #
+
+def percentiles(values: Sequence[float], points: Sequence[int] = (50, 95, 99)) -> Dict[str, float]:
+    if not values:
+        return {f"p{p}": 0.0 for p in points}
+    return {f"p{p}": round(float(np.percentile(values, p)), 3) for p in points}
+
+
+def run_case(call: Callable[[int], None], *, requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Run call(0..requests-1) from `concurrency` threads. Returns latency
+    percentiles (ms), throughput (req/s), SQL queries per call and errors.
+    """
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker() -> None:
+        executed = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            executed[0] += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(count_queries):
+                while True:
+                    index = next(counter)
+                    if index >= requests:
+                        return
+                    executed[0] = 0
+                    started = time.perf_counter()
+                    try:
+                        call(index)
+                    except Exception as e:  # reported, never fatal to the run
+                        with lock:
+                            errors.append(f"{type(e).__name__}: {e}"[:200])
+                        continue
+                    elapsed = (time.perf_counter() - started) * 1000.0
+                    with lock:
+                        latencies.append(elapsed)
+                        queries.append(executed[0])
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f"bench-{n}") for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "latency_ms": {
+            **percentiles(latencies),
+            "mean": round(float(np.mean(latencies)), 3) if latencies else 0.0,
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "sql_queries": {
+            "mean": round(float(np.mean(queries)), 2) if queries else 0.0,
+            "max": max(queries) if queries else 0,
+        },
+        "wall_seconds": round(wall, 3),
+    }
+
+
+def peak_memory(call: Callable[[int], None], indexes: Sequence[int]) -> int:
+    """Largest Python heap growth (bytes) of one call, traced with tracemalloc."""
+    tracemalloc.start()
+    peak = 0
+    try:
+        for index in indexes:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call(index)
+            _, top = tracemalloc.get_traced_memory()
+            peak = max(peak, top - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def environment() -> Dict[str, Any]:
+    """What a result depends on besides the code: versions, DB, commit."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "numpy": np.__version__,
+        "db_vendor": connection.vendor,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
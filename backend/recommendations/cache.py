@@ -0,0 +1,127 @@
+"""
+recommendations/cache.py
+
+In-process LRU + TTL cache for AI recommendations.
+
+Design:
+- Keys are a stable digest of the StylistRequestPayload (content-addressed),
+  with the datetime collapsed to a date + time-of-day bucket so near-identical
+  requests share an entry.
+- Entries remember the owning user so wardrobe/profile changes can drop them
+  (see recommendations/signals.py).
+- Hit/miss/eviction counters are exposed via `stats()` for sizing.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from agents.stylist_types import StylistRequestPayload
+
+from .gazetteer import part_of_day
+
+
+def time_of_day_bucket(dt: Optional[datetime]) -> Optional[str]:
+    """Collapse a datetime to 'YYYY-MM-DD:<part of day>'."""
+    if dt is None:
+        return None
+    return f"{dt.date().isoformat()}:{part_of_day(dt.hour)}"
+
+
+def payload_digest(payload: StylistRequestPayload) -> str:
+    """
+    Stable sha256 of the payload. Drawer products are sorted by id so the
+    same wardrobe in a different order maps to the same key; the exact local
+    time is left out like the exact datetime (time_of_day stays in).
+    """
+    data = payload.model_dump(mode="json", by_alias=True)
+    data["datetime"] = time_of_day_bucket(payload.event_datetime)
+    data.pop("local_time", None)
+    data["drawer_products"] = sorted(data["drawer_products"], key=lambda p: p["id"])
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RecommendationCache:
+    """Thread-safe LRU cache with a per-entry TTL and a max entry count."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, user_key, value)
+        self._by_user: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], *, user_id: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        user_key = str(user_id)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, user_key, value)
+            self._by_user.setdefault(user_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: Any) -> int:
+        """Drop every entry owned by this user. Returns how many were removed."""
+        with self._lock:
+            keys = self._by_user.pop(str(user_id), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: str) -> None:
+        # caller holds the lock
+        _, user_key, _ = self._entries.pop(key)
+        keys = self._by_user.get(user_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_key]
@@ -0,0 +1,283 @@
+"""
+recommendations/compatibility.py
+
+Persisted per-user outfit compatibility graph.
+
+Design:
+- Nodes are the user's wardrobe items; a directed edge item -> other says how
+  well `other` pairs with `item` (COLOR_HARMONY of their colors, see
+  rule_engine.py). Only categories that share an outfit template are linked
+  (top-bottom, suit-footwear, ...), and each item keeps only its `top_k` best
+  partners per linked category, ranked (newer items win ties, as in the rule
+  engine), so the graph is O(n * top_k) rows rather than O(n^2).
+- Maintained incrementally from WardrobeItem signals, never rebuilt. A save
+  reads (id, category, color) of the categories involved and ranks the item's
+  own lists. Other lists are re-ranked only where the item's rank or score in
+  them changes (it enters, leaves or moves), compared against its stored
+  incoming edges. A list's ranking depends only on its owner's color, so entry
+  is checked once per color. A delete cascades the item's edges and
+  refills the lists left short or with a rank gap (one aggregate query). Other
+  lists are never read. Recomputed lists are diffed against their stored rows,
+  so a save costs one delete and one upsert of only the rows that changed.
+- Reads are range scans on the (item, rank) index: `partner_scores` returns
+  the best k partners per category of a few anchor items, O(k) rows each.
+  Pruning uses it to favour items that complete outfits with its top picks.
+- `rebuild_user` (python manage.py build_compatibility_graph) fills the graph
+  for wardrobes created before it existed, or after changing top_k.
+"""
+
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from client.models import WardrobeItem
+
+from .models import ItemCompatibility
+from .rule_engine import COLOR_HARMONY, COLOR_INDEX, OUTFIT_TEMPLATES
+
+
+def _linked_categories() -> Dict[str, FrozenSet[str]]:
+    links: Dict[str, Set[str]] = {}
+    for _, categories, _ in OUTFIT_TEMPLATES:
+        for a, b in combinations(categories, 2):
+            links.setdefault(a, set()).add(b)
+            links.setdefault(b, set()).add(a)
+    return {category: frozenset(others) for category, others in links.items()}
+
+
+# Categories that appear together in at least one outfit template
+LINKED_CATEGORIES: Dict[str, FrozenSet[str]] = _linked_categories()
+
+Edge = Tuple[int, float]  # (other item id, score)
+ListKey = Tuple[int, str]  # (item id, category of its partners)
+
+
+class _Wardrobe:
+    """A user's items as per-category arrays of ids and color indexes."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]]):
+        self.color: Dict[int, int] = {}
+        self.category: Dict[int, str] = {}
+        grouped: Dict[str, List[Tuple[int, int]]] = {}
+        for item_id, category, color in rows:
+            color_index = COLOR_INDEX.get((color or "other").lower(), COLOR_INDEX["other"])
+            category = (category or "other").lower()
+            self.color[item_id] = color_index
+            self.category[item_id] = category
+            grouped.setdefault(category, []).append((item_id, color_index))
+        self.by_category: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            category: (
+                np.array([i for i, _ in members], dtype=np.int64),
+                np.array([c for _, c in members], dtype=np.intp),
+            )
+            for category, members in grouped.items()
+        }
+        self._ranked: Dict[Tuple[int, str], List[Edge]] = {}
+
+    @classmethod
+    def load(cls, user_id, categories: Optional[Iterable[str]] = None) -> "_Wardrobe":
+        """The user's items, or only those of `categories`."""
+        rows = WardrobeItem.objects.filter(user_id=user_id)
+        if categories is not None:
+            rows = rows.filter(category__in=list(categories))
+        return cls(rows.values_list("id", "category", "color"))
+
+    def ids(self, category: str) -> List[int]:
+        members = self.by_category.get(category)
+        return members[0].tolist() if members is not None else []
+
+    def partners(self, item_id: int, category: str, top_k: int) -> List[Edge]:
+        """Best `top_k` items of `category` for `item_id`, best first."""
+        color = self.color[item_id]
+        # the ranking only depends on the item's color: share it across items
+        key = (color, category)
+        if key not in self._ranked:
+            members = self.by_category.get(category)
+            if members is None:
+                self._ranked[key] = []
+            else:
+                ids, colors = members
+                scores = COLOR_HARMONY[color, colors]
+                order = np.lexsort((-ids, -scores))[: top_k + 1]
+                self._ranked[key] = [(int(ids[i]), round(float(scores[i]), 4)) for i in order]
+        return [edge for edge in self._ranked[key] if edge[0] != item_id][:top_k]
+
+
+class CompatibilityGraph:
+    """Top-k compatible partners per item and linked category, stored in ItemCompatibility."""
+
+    def __init__(self, top_k: int = 8):
+        self.top_k = max(1, top_k)
+
+    # --------- maintenance --------- #
+
+    def refresh(
+        self,
+        user_id,
+        saved: Iterable[Tuple[int, str]] = (),
+        removed_categories: Iterable[str] = (),
+    ) -> Tuple[int, int]:
+        """
+        Bring the graph up to date after items were saved ((id, category)
+        pairs) and/or items of `removed_categories` were deleted, touching only
+        the lists those items are, were or should be in.
+        Returns (edges deleted, edges written).
+        """
+        saved = list(saved)
+        removed_categories = set(removed_categories)
+        saved_ids = {item_id for item_id, _ in saved}
+        # Where the saved items stand in other lists now (previous category/color)
+        stored: Dict[ListKey, Dict[int, Tuple[int, float]]] = {}
+        if saved_ids:
+            rows = ItemCompatibility.objects.filter(other_id__in=saved_ids)
+            for item_id, other, category, rank, score in rows.values_list("item_id", "other_id", "other_category", "rank", "score"):
+                stored.setdefault((item_id, category), {})[other] = (rank, score)
+        touched = {category for _, category in saved} | {category for _, category in stored} | removed_categories
+        wardrobe = _Wardrobe.load(user_id, touched | {linked for c in touched for linked in LINKED_CATEGORIES.get(c, ())})
+        saved_ids &= set(wardrobe.color)
+
+        # 1) The saved items' own lists
+        keys: Set[ListKey] = {
+            (item_id, linked)
+            for item_id in saved_ids
+            for linked in LINKED_CATEGORIES.get(wardrobe.category[item_id], ())
+        }
+        # 2) Lists a saved item is in, was in or enters. Only the saved items
+        #    changed, so a list whose saved members keep their rank and score is
+        #    unchanged and never read. A list's ranking depends only on its
+        #    owner's color: entry is checked once per color, not per list.
+        candidates = set(stored)
+        for category in {wardrobe.category[item_id] for item_id in saved_ids}:
+            for linked in LINKED_CATEGORIES.get(category, ()):
+                entering: Dict[int, bool] = {}
+                for item_id in wardrobe.ids(linked):
+                    color = wardrobe.color[item_id]
+                    if color not in entering:
+                        entering[color] = any(
+                            other in saved_ids for other, _ in wardrobe.partners(item_id, category, self.top_k)
+                        )
+                    if entering[color]:
+                        candidates.add((item_id, category))
+        for item_id, category in candidates:
+            if item_id not in wardrobe.color:
+                continue
+            expected = {
+                other: (rank, score)
+                for rank, (other, score) in enumerate(wardrobe.partners(item_id, category, self.top_k))
+                if other in saved_ids
+            }
+            if expected != stored.get((item_id, category), {}):
+                keys.add((item_id, category))
+        # 3) Lists a deleted item left a hole in: shorter than they should be, or with a rank gap
+        if removed_categories:
+            keys |= self._incomplete_lists(user_id, wardrobe, removed_categories)
+        return self._sync(user_id, wardrobe, keys, full_sources=saved_ids)
+
+    def _incomplete_lists(self, user_id, wardrobe: _Wardrobe, categories: Set[str]) -> Set[ListKey]:
+        stored = {
+            (row["item_id"], row["other_category"]): (row["edges"], row["last"])
+            for row in ItemCompatibility.objects.filter(user_id=user_id, other_category__in=categories)
+            .values("item_id", "other_category")
+            .annotate(edges=Count("id"), last=Max("rank"))
+        }
+        keys: Set[ListKey] = set()
+        for category in categories:
+            expected = min(self.top_k, len(wardrobe.ids(category)))
+            for linked in LINKED_CATEGORIES.get(category, ()):
+                for item_id in wardrobe.ids(linked):
+                    edges, last = stored.get((item_id, category), (0, -1))
+                    if edges < expected or last != edges - 1:
+                        keys.add((item_id, category))
+        return keys
+
+    def rebuild_user(self, user_id) -> int:
+        """Recompute every edge of the user's graph; returns the number of edges."""
+        wardrobe = _Wardrobe.load(user_id)
+        rows = [
+            ItemCompatibility(user_id=user_id, item_id=item_id, other_id=other, other_category=linked, rank=rank, score=score)
+            for category, (ids, _) in wardrobe.by_category.items()
+            for item_id in ids.tolist()
+            for linked in LINKED_CATEGORIES.get(category, ())
+            for rank, (other, score) in enumerate(wardrobe.partners(item_id, linked, self.top_k))
+        ]
+        with transaction.atomic():
+            ItemCompatibility.objects.filter(user_id=user_id).delete()
+            ItemCompatibility.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def _sync(
+        self,
+        user_id,
+        wardrobe: _Wardrobe,
+        keys: Set[ListKey],
+        full_sources: Set[int] = frozenset(),
+    ) -> Tuple[int, int]:
+        """
+        Rewrite the lists in `keys` by diffing against stored rows; every stored
+        edge of `full_sources` not in a recomputed list is dropped.
+        """
+        # only lists that exist for the item's current category (a saved item may have moved)
+        keys = {
+            (item_id, category) for item_id, category in keys
+            if category in LINKED_CATEGORIES.get(wardrobe.category.get(item_id), ())
+        }
+        wanted: Dict[Tuple[int, int], Tuple[str, int, float]] = {}
+        for item_id, category in keys:
+            for rank, (other, score) in enumerate(wardrobe.partners(item_id, category, self.top_k)):
+                wanted[(item_id, other)] = (category, rank, score)
+
+        sources = {item_id for item_id, _ in keys}
+        categories = {category for _, category in keys}
+        scope = Q(item_id__in=sources, other_category__in=categories)
+        if full_sources:
+            scope |= Q(item_id__in=full_sources)
+        stale: List[int] = []
+        current: Dict[Tuple[int, int], Tuple[str, int, float]] = {}
+        rows = ItemCompatibility.objects.filter(scope).values_list("id", "item_id", "other_id", "other_category", "rank", "score")
+        for pk, item_id, other, category, rank, score in rows:
+            if (item_id, other) in wanted:
+                current[(item_id, other)] = (category, rank, score)
+            elif (item_id, category) in keys or item_id in full_sources:
+                stale.append(pk)
+
+        changed = [
+            ItemCompatibility(user_id=user_id, item_id=item_id, other_id=other, other_category=category, rank=rank, score=score)
+            for (item_id, other), (category, rank, score) in wanted.items()
+            if current.get((item_id, other)) != (category, rank, score)
+        ]
+        if stale or changed:
+            with transaction.atomic():
+                if stale:
+                    ItemCompatibility.objects.filter(pk__in=stale).delete()
+                if changed:
+                    ItemCompatibility.objects.bulk_create(
+                        changed,
+                        update_conflicts=True,
+                        unique_fields=["item", "other"],
+                        update_fields=["other_category", "rank", "score"],
+                    )
+        return len(stale), len(changed)
+
+    # --------- reads --------- #
+
+    def partners(self, item_id: int, category: Optional[str] = None, k: int = 3) -> List[Edge]:
+        """Best k partners of one item, per category (all linked categories when None)."""
+        rows = ItemCompatibility.objects.filter(item_id=item_id, rank__lt=k)
+        if category:
+            rows = rows.filter(other_category=category)
+        return list(rows.order_by("-score", "rank").values_list("other_id", "score"))
+
+    def partner_scores(self, item_ids: Iterable[int], k: int = 3) -> Dict[int, float]:
+        """{partner id: best edge score} over the top-k partners per category of `item_ids`."""
+        item_ids = [i for i in item_ids if i is not None]
+        if not item_ids or k <= 0:
+            return {}
+        best: Dict[int, float] = {}
+        rows = ItemCompatibility.objects.filter(item_id__in=item_ids, rank__lt=min(k, self.top_k))
+        for other, score in rows.values_list("other_id", "score"):
+            if score > best.get(other, -1.0):
+                best[other] = score
+        return best
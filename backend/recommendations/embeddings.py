@@ -0,0 +1,368 @@
+"""
+recommendations/embeddings.py
+
+Per-user vector index over wardrobe items: similar-item lookup and
+near-duplicate detection.
+
+Design:
+- Embeddings are computed locally, nothing to download or call: signed
+  feature hashing of word unigrams and character trigrams of the title (counted
+  twice) and description into TEXT_DIM buckets, L2-normalized, followed by
+  weighted one-hot category and color blocks. The whole vector is normalized,
+  so cosine similarity is a plain dot product.
+- Each item's vector is stored as float32 bytes in ItemEmbedding, upserted when
+  the item is saved and deleted with it (see recommendations/signals.py).
+  Rows without a current vector (older items, EMBEDDING_VERSION bumps) are
+  filled in the first time the user's index is loaded.
+- Per process, a user's vectors are stacked into one (n, DIM) matrix with the
+  sorted item ids, kept in an LRU with a TTL. Saves and deletes patch the cached
+  matrix in place (one row) instead of reloading it.
+- Queries are batched matrix products: `similar` scores a whole batch of query
+  vectors at once; `duplicates` computes M @ M.T in row blocks and groups pairs
+  above a threshold with union-find. Duplicate groups are memoized per matrix.
+- Recommendations leave out near-duplicates without scanning anything: each
+  ItemEmbedding stores `duplicate_of`, the newest item within
+  RECOMMENDATION_DEDUPE_THRESHOLD, and the wardrobe query skips marked rows.
+  `mark_duplicates` maintains the marks on the write path (signals): a save or
+  delete rescores only the items it can affect, one row product each, against
+  vectors read from the database, never another process's cached matrix
+  (which may still hold an item deleted elsewhere). A mark whose newer item is
+  gone hides nothing: the wardrobe query only skips marks that still resolve.
+"""
+
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from client.models import WardrobeItem
+
+from .models import ItemEmbedding
+
+
+EMBEDDING_VERSION = 1
+TEXT_DIM = 256
+CATEGORIES: Tuple[str, ...] = tuple(WardrobeItem.Category.values)
+COLORS: Tuple[str, ...] = tuple(WardrobeItem.Color.values)
+CATEGORY_INDEX = {c: TEXT_DIM + i for i, c in enumerate(CATEGORIES)}
+COLOR_INDEX = {c: TEXT_DIM + len(CATEGORIES) + i for i, c in enumerate(COLORS)}
+DIM = TEXT_DIM + len(CATEGORIES) + len(COLORS)
+
+# Block weights before the final normalization
+W_TEXT, W_CATEGORY, W_COLOR = 1.0, 0.6, 0.4
+TITLE_WEIGHT, DESCRIPTION_WEIGHT = 2.0, 1.0
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+# --------- 1. Embedding --------- #
+
+def _add_text_features(counts: Counter, text: Optional[str], weight: float) -> None:
+    for word in _WORD_RE.findall((text or "").lower()):
+        counts["w:" + word] += weight
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts["c:" + padded[i:i + 3]] += weight
+
+
+def embed(title: str, description: Optional[str], category: Optional[str], color: Optional[str]) -> np.ndarray:
+    """Unit-length float32 vector of one wardrobe item."""
+    counts: Counter = Counter()
+    _add_text_features(counts, title, TITLE_WEIGHT)
+    _add_text_features(counts, description, DESCRIPTION_WEIGHT)
+
+    vector = np.zeros(DIM, dtype=np.float32)
+    for feature, count in counts.items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % TEXT_DIM] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector[:TEXT_DIM])
+    if norm:
+        vector[:TEXT_DIM] *= W_TEXT / norm
+    if category in CATEGORY_INDEX:
+        vector[CATEGORY_INDEX[category]] = W_CATEGORY
+    if color in COLOR_INDEX:
+        vector[COLOR_INDEX[color]] = W_COLOR
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed_item(item: WardrobeItem) -> np.ndarray:
+    return embed(item.title, item.description, item.category, item.color)
+
+
+def store_embedding(item: WardrobeItem) -> np.ndarray:
+    """Upsert the item's vector (one query) and return it."""
+    return store_embeddings([item])[0]
+
+
+def store_embeddings(items: Sequence[WardrobeItem]) -> List[np.ndarray]:
+    """Upsert the vectors of many items with one statement; returns them in order."""
+    vectors = [embed_item(item) for item in items]
+    ItemEmbedding.objects.bulk_create(
+        [
+            ItemEmbedding(item_id=item.pk, user_id=item.user_id, version=EMBEDDING_VERSION, vector=vector.tobytes())
+            for item, vector in zip(items, vectors)
+        ],
+        update_conflicts=True,
+        unique_fields=["item"],
+        update_fields=["user", "version", "vector", "updated_at"],
+    )
+    return vectors
+
+
+# --------- 2. Per-user index --------- #
+
+class _UserVectors:
+    """Sorted item ids + their (n, DIM) matrix; duplicate groups memoized per threshold."""
+    __slots__ = ("ids", "matrix", "expires_at", "duplicates")
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray, expires_at: float):
+        self.ids = ids
+        self.matrix = matrix
+        self.expires_at = expires_at
+        self.duplicates: Dict[float, List[Dict[str, Any]]] = {}
+
+
+def load_user_vectors(user_id: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (ids, matrix) of all the user's items from one query; vectors that are
+    missing or from an older EMBEDDING_VERSION are computed and stored.
+    """
+    rows = (
+        WardrobeItem.objects.filter(user_id=user_id)
+        .order_by("id")
+        .values_list("id", "title", "description", "category", "color", "embedding__version", "embedding__vector")
+    )
+    ids: List[int] = []
+    vectors: List[np.ndarray] = []
+    stale: List[ItemEmbedding] = []
+    for item_id, title, description, category, color, version, raw in rows:
+        if version == EMBEDDING_VERSION and raw is not None and len(raw) == DIM * 4:
+            vector = np.frombuffer(bytes(raw), dtype=np.float32)
+        else:
+            vector = embed(title, description, category, color)
+            stale.append(ItemEmbedding(item_id=item_id, user_id=user_id, version=EMBEDDING_VERSION, vector=vector.tobytes()))
+        ids.append(item_id)
+        vectors.append(vector)
+    if stale:
+        ItemEmbedding.objects.bulk_create(
+            stale,
+            update_conflicts=True,
+            unique_fields=["item"],
+            update_fields=["version", "vector", "updated_at"],
+        )
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, DIM), dtype=np.float32)
+    return np.asarray(ids, dtype=np.int64), matrix
+
+
+class WardrobeIndex:
+    """Thread-safe LRU of per-user vector matrices with a TTL."""
+
+    def __init__(self, max_users: int = 256, ttl_seconds: int = 300, block_size: int = 512):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, _UserVectors]" = OrderedDict()
+        self.hits = 0
+        self.loads = 0
+        self.patches = 0
+
+    def vectors(self, user_id: Any) -> _UserVectors:
+        key = str(user_id)
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._users.move_to_end(key)
+                self.hits += 1
+                return entry
+        ids, matrix = load_user_vectors(user_id)
+        entry = _UserVectors(ids, matrix, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self.loads += 1
+            if self.max_users > 0:
+                self._users[key] = entry
+                self._users.move_to_end(key)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return entry
+
+    # --------- incremental updates (signals) --------- #
+
+    def upsert(self, user_id: Any, item_id: int, vector: np.ndarray) -> None:
+        """Replace or insert one row of a cached matrix; uncached users load lazily."""
+        with self._lock:
+            entry = self._users.get(str(user_id))
+            if entry is None:
+                return
+            i = int(np.searchsorted(entry.ids, item_id))
+            if i < len(entry.ids) and entry.ids[i] == item_id:
+                matrix = entry.matrix.copy()  # readers may hold the old one
+                matrix[i] = vector
+                entry.matrix = matrix
+            else:
+                entry.ids = np.insert(entry.ids, i, item_id)
+                entry.matrix = np.insert(entry.matrix, i, vector, axis=0)
+            entry.duplicates = {}
+            self.patches += 1
+
+    def remove(self, user_id: Any, item_id: int) -> None:
+        with self._lock:
+            entry = self._users.get(str(user_id))
+            if entry is None:
+                return
+            i = int(np.searchsorted(entry.ids, item_id))
+            if i < len(entry.ids) and entry.ids[i] == item_id:
+                entry.ids = np.delete(entry.ids, i)
+                entry.matrix = np.delete(entry.matrix, i, axis=0)
+                entry.duplicates = {}
+                self.patches += 1
+
+    def invalidate_user(self, user_id: Any) -> None:
+        with self._lock:
+            self._users.pop(str(user_id), None)
+
+    # --------- queries --------- #
+
+    def similar(
+        self,
+        user_id: Any,
+        queries: np.ndarray,
+        *,
+        k: int = 5,
+        exclude_ids: Sequence[Optional[int]] = (),
+        min_score: float = 0.0,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k (item_id, cosine) per query vector, best first, for a (m, DIM)
+        batch scored with one matrix product. exclude_ids[j] is left out of
+        query j's results (e.g. the item itself).
+        """
+        entry = self.vectors(user_id)
+        ids, matrix = entry.ids, entry.matrix
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        if not len(ids):
+            return [[] for _ in range(len(queries))]
+        scores = queries @ matrix.T  # (m, n)
+        for j, exclude in enumerate(exclude_ids):
+            if exclude is not None:
+                scores[j, ids == exclude] = -np.inf
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for j in range(len(queries)):
+            ranked = sorted(top[j], key=lambda col: -scores[j, col])
+            results.append([(int(ids[c]), round(float(scores[j, c]), 4)) for c in ranked if scores[j, c] >= min_score])
+        return results
+
+    def duplicates(self, user_id: Any, threshold: float = 0.92) -> List[Dict[str, Any]]:
+        """
+        Groups of near-duplicate items: [{"item_ids": [...], "similarity": max pair score}],
+        largest groups first. Items are linked when their cosine >= threshold.
+        """
+        entry = self.vectors(user_id)
+        threshold = round(threshold, 4)
+        cached = entry.duplicates.get(threshold)
+        if cached is not None:
+            return cached
+
+        ids, matrix = entry.ids, entry.matrix
+        parent = list(range(len(ids)))
+        best: Dict[int, float] = {}
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        pairs: List[Tuple[int, int, float]] = []
+        for start in range(0, len(ids), self.block_size):
+            block = matrix[start:start + self.block_size] @ matrix.T  # (b, n)
+            rows, cols = np.nonzero(block >= threshold)
+            for r, c in zip(rows.tolist(), cols.tolist()):
+                i = start + r
+                if i < c:
+                    pairs.append((i, c, float(block[r, c])))
+        for i, j, score in pairs:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[root_j] = root_i
+        for i, j, score in pairs:
+            root = find(i)
+            best[root] = max(best.get(root, 0.0), score)
+
+        members: Dict[int, List[int]] = {}
+        for i in range(len(ids)):
+            root = find(i)
+            if root in best:
+                members.setdefault(root, []).append(int(ids[i]))
+        groups = sorted(
+            ({"item_ids": sorted(m), "similarity": round(best[root], 4)} for root, m in members.items()),
+            key=lambda g: (-len(g["item_ids"]), -g["similarity"]),
+        )
+        entry.duplicates[threshold] = groups
+        return groups
+
+    # --------- near-duplicate marks (recommendation prompts) --------- #
+
+    def mark_duplicates(self, user_id: Any, threshold: float, changed_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Store on each ItemEmbedding the newest item within `threshold` cosine
+        (`duplicate_of`, None when there is none). Only the items whose mark
+        `changed_ids` (just saved or deleted) can affect are rescored: those
+        items, the ones similar to them and the ones marked with them; every
+        item when None. Returns the number of rows updated.
+        Marks are permanent, so they are computed from a fresh read of the
+        user's vectors, not from the cached (up to ttl_seconds old) matrix.
+        """
+        ids, matrix = load_user_vectors(user_id)
+        if changed_ids is None:
+            rows = np.arange(len(ids))
+        else:
+            changed = sorted(set(changed_ids))
+            present = np.flatnonzero(np.isin(ids, changed))
+            affected = set(present.tolist())
+            for start in range(0, len(present), self.block_size):
+                block = matrix[present[start:start + self.block_size]] @ matrix.T
+                affected.update(np.flatnonzero((block >= threshold).any(axis=0)).tolist())
+            marked = ItemEmbedding.objects.filter(user_id=user_id, duplicate_of__in=changed).values_list("item_id", flat=True)
+            affected.update(np.flatnonzero(np.isin(ids, list(marked))).tolist())
+            rows = np.asarray(sorted(affected), dtype=np.intp)
+
+        marks: Dict[int, Optional[int]] = {}
+        for start in range(0, len(rows), self.block_size):
+            chunk = rows[start:start + self.block_size]
+            newer = ((matrix[chunk] @ matrix.T) >= threshold) & (ids[None, :] > ids[chunk][:, None])
+            # ids are sorted: the last match of a row is its newest duplicate
+            last = newer.shape[1] - 1 - np.argmax(newer[:, ::-1], axis=1)
+            for r, row in enumerate(chunk.tolist()):
+                marks[int(ids[row])] = int(ids[last[r]]) if newer[r].any() else None
+        if not marks:
+            return 0
+        current = dict(ItemEmbedding.objects.filter(item_id__in=list(marks)).values_list("item_id", "duplicate_of"))
+        updates = [
+            ItemEmbedding(item_id=item_id, duplicate_of=mark)
+            for item_id, mark in marks.items()
+            if item_id in current and current[item_id] != mark
+        ]
+        ItemEmbedding.objects.bulk_update(updates, ["duplicate_of"], batch_size=500)
+        return len(updates)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "loads": self.loads,
+                "patches": self.patches,
+            }
+
@@ -0,0 +1,237 @@
+"""
+recommendations/gazetteer.py
+
+Offline destination resolver: local time, season and climate for a city.
+
+Design:
+- Source data is recommendations/data/cities.csv (timezone, coordinates and
+  monthly mean temperature normals per city, plus aliases). `build_table`
+  turns it into one fixed-width NumPy structured array, one row per name or
+  alias, sorted by normalized name, saved as data/gazetteer.npy
+  (`python manage.py build_gazetteer`).
+- At runtime the .npy file is memory-mapped once per process; a lookup is a
+  binary search over the key column (np.searchsorted), memoized per
+  destination string, so resolving costs microseconds and no network.
+- `resolve(destination, dt)` converts dt to the city's local time and derives
+  time of day, season (by hemisphere; "tropical" near the equator) and the
+  climate normal for that day, interpolated between monthly means, as a
+  temperature band. Unknown cities resolve to None and the model infers as before.
+"""
+
+import csv
+import logging
+import re
+import threading
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+
+from .pruning import season_for
+
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+SOURCE_PATH = DATA_DIR / "cities.csv"
+TABLE_PATH = DATA_DIR / "gazetteer.npy"
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+# One row per lookup key (city name or alias); temperatures in tenths of °C
+TABLE_DTYPE = np.dtype([
+    ("key", "S40"),
+    ("name", "S40"),
+    ("country", "S2"),
+    ("timezone", "S40"),
+    ("lat", "f4"),
+    ("lon", "f4"),
+    ("temp_dc", "i2", (12,)),
+])
+
+# Below this absolute latitude the four seasons say little; the temperature band does
+TROPICAL_LATITUDE = 15.0
+
+# (upper bound °C, band), checked in order
+TEMPERATURE_BANDS = ((0, "freezing"), (10, "cold"), (18, "cool"), (24, "mild"), (29, "warm"))
+HOT = "hot"
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def part_of_day(hour: int) -> str:
+    """morning (5-12), afternoon (12-17), evening (17-21) or night."""
+    if 5 <= hour < 12:
+        return "morning"
+    if 12 <= hour < 17:
+        return "afternoon"
+    if 17 <= hour < 21:
+        return "evening"
+    return "night"
+
+
+def temperature_band(celsius: float) -> str:
+    for upper, band in TEMPERATURE_BANDS:
+        if celsius < upper:
+            return band
+    return HOT
+
+
+def normalize(name: str) -> str:
+    """'São Paulo ' -> 'sao paulo': accents folded, punctuation collapsed."""
+    ascii_name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM_RE.sub(" ", ascii_name.lower()).strip()
+
+
+# --------- Building the table --------- #
+
+def build_table(source: Path = SOURCE_PATH) -> np.ndarray:
+    """
+    Parse the CSV into a key-sorted structured array. Raises ValueError on an
+    unknown timezone, a bad row, or two cities claiming the same name.
+    """
+    rows: Dict[bytes, tuple] = {}
+    with open(source, newline="", encoding="utf-8") as fh:
+        lines = (line for line in fh if not line.startswith("#"))
+        for record in csv.DictReader(lines):
+            name = record["name"].strip()
+            try:
+                ZoneInfo(record["timezone"])
+                temps = [round(float(record[m]) * 10) for m in MONTHS]
+                lat, lon = float(record["lat"]), float(record["lon"])
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Bad gazetteer row for {name!r}: {e}")
+            row = (
+                name.encode("utf-8"),
+                record["country"].strip().encode("ascii"),
+                record["timezone"].strip().encode("ascii"),
+                lat,
+                lon,
+                temps,
+            )
+            aliases = [a for a in (record.get("aliases") or "").split(";") if a.strip()]
+            for key in {normalize(name), *map(normalize, aliases)}:
+                encoded = key.encode("ascii")
+                if encoded in rows and rows[encoded][0] != row[0]:
+                    raise ValueError(f"{key!r} names both {rows[encoded][0]!r} and {name!r}")
+                rows[encoded] = row
+
+    table = np.zeros(len(rows), dtype=TABLE_DTYPE)
+    for i, key in enumerate(sorted(rows)):
+        table[i] = (key, *rows[key])
+    return table
+
+
+def write_table(table: np.ndarray, path: Path = TABLE_PATH) -> None:
+    np.save(path, table, allow_pickle=False)
+
+
+# --------- Lookups --------- #
+
+class LocalConditions(NamedTuple):
+    """A destination + datetime resolved offline."""
+    city: str
+    country: str
+    timezone: str
+    local_time: datetime
+    time_of_day: str
+    season: Optional[str]
+    avg_temp_c: float
+    temperature_band: str
+
+    def payload_fields(self) -> Dict[str, Any]:
+        """Structured fields for StylistRequestPayload."""
+        return {
+            "local_time": self.local_time.isoformat(timespec="minutes"),
+            "time_of_day": self.time_of_day,
+            "season": self.season,
+            "temperature_band": self.temperature_band,
+            "avg_temp_c": self.avg_temp_c,
+        }
+
+
+_table: Optional[np.ndarray] = None
+_table_lock = threading.Lock()
+_table_missing = False
+
+
+def get_table() -> Optional[np.ndarray]:
+    """The memory-mapped table (None, logged once, if the file is missing)."""
+    global _table, _table_missing
+    if _table is None and not _table_missing:
+        with _table_lock:
+            if _table is None and not _table_missing:
+                path = Path(getattr(settings, "RECOMMENDATION_GAZETTEER_PATH", "") or TABLE_PATH)
+                try:
+                    _table = np.load(path, mmap_mode="r", allow_pickle=False)
+                except OSError:
+                    _table_missing = True
+                    logger.warning("Gazetteer %s not found; destinations won't be resolved offline", path)
+    return _table
+
+
+def _find(table: np.ndarray, key: str) -> Optional[int]:
+    encoded = key.encode("ascii", "ignore")[:40]
+    i = int(np.searchsorted(table["key"], encoded))
+    if i < len(table) and table["key"][i] == encoded:
+        return i
+    return None
+
+
+@lru_cache(maxsize=2048)
+def find_city(destination: str) -> Optional[int]:
+    """Row of `destination` ('Paris', 'paris, france', 'NYC'), or None."""
+    table = get_table()
+    if table is None or not destination:
+        return None
+    # whole string first, then its comma-separated parts ("Paris, France")
+    candidates = [destination, *destination.split(",")]
+    for candidate in candidates:
+        key = normalize(candidate)
+        if key:
+            row = _find(table, key)
+            if row is not None:
+                return row
+    return None
+
+
+def _normal_temperature(temps_dc: np.ndarray, local: datetime) -> float:
+    """Daily climate normal: linear between monthly means, centred mid-month."""
+    position = local.month - 1 + (local.day - 0.5) / 30.5 - 0.5
+    low = int(np.floor(position)) % 12
+    high = (low + 1) % 12
+    weight = position - np.floor(position)
+    return float(temps_dc[low] * (1 - weight) + temps_dc[high] * weight) / 10.0
+
+
+def resolve(destination: Optional[str], dt: Optional[datetime]) -> Optional[LocalConditions]:
+    """Local time, season and temperature band at `destination` on `dt`, or None."""
+    if dt is None or not destination:
+        return None
+    row = find_city(destination)
+    if row is None:
+        return None
+    record = get_table()[row]
+
+    tz = ZoneInfo(record["timezone"].decode("ascii"))
+    # Naive datetimes are taken as already local to the destination
+    local = dt.astimezone(tz) if dt.tzinfo is not None else dt.replace(tzinfo=tz)
+    lat = float(record["lat"])
+    season = "tropical" if abs(lat) < TROPICAL_LATITUDE else season_for(local, southern_hemisphere=lat < 0)
+    avg_temp = round(_normal_temperature(record["temp_dc"], local), 1)
+    return LocalConditions(
+        city=record["name"].decode("utf-8"),
+        country=record["country"].decode("ascii"),
+        timezone=tz.key,
+        local_time=local,
+        time_of_day=part_of_day(local.hour),
+        season=season,
+        avg_temp_c=avg_temp,
+        temperature_band=temperature_band(avg_temp),
+    )
+
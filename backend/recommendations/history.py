@@ -0,0 +1,132 @@
+"""
+recommendations/history.py
+
+Persisted recommendation history.
+
+Design:
+- Every freshly generated answer (agent, rule engine or fallback) is stored as
+  one Recommendation row plus its Outfit rows. Cache replays and coalesced
+  followers are not stored again: the same answer is already in history.
+- Writes are batched: one Recommendation insert (a bulk insert for a whole
+  batch response) and one Outfit bulk insert, in a single transaction.
+  A failed write is logged and never fails the response.
+- Refinements are stored like any other answer, with the change request and
+  the refined recommendation's id under `context["refinement"]`.
+- Answers pre-generated for an upcoming event (appointments app) are read back
+  by request digest (`pregenerated_answer`), so any process can serve them.
+- Outfits keep raw WardrobeItem ids. Deleted items are flagged at read time
+  with one id lookup per page (see `missing_item_ids`), not by rewriting rows.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from django.db import DatabaseError, transaction
+
+from agents.stylist_types import StylistRequestPayload
+from client.models import WardrobeItem
+
+from .models import Outfit, Recommendation
+
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryEntry(NamedTuple):
+    """A generated answer waiting to be written."""
+    user_id: Any
+    payload: StylistRequestPayload
+    result: Dict[str, Any]  # {"recommendations": [{name, description, product_ids}, ...]}
+    source: str  # Recommendation.Source
+    model: str = ""
+    request_digest: str = ""
+    refinement: Optional[Dict[str, Any]] = None  # {"message", "parent_id"} for refined answers
+
+
+def _recommendation_row(entry: HistoryEntry) -> Recommendation:
+    payload = entry.payload
+    event_datetime: Optional[datetime] = payload.event_datetime
+    context = {
+        "user_info": payload.user_info.model_dump(mode="json"),
+        "drawer_product_ids": [p.id for p in payload.drawer_products],
+    }
+    if entry.refinement:
+        context["refinement"] = entry.refinement
+    return Recommendation(
+        user_id=entry.user_id,
+        destination=(payload.location or "")[:100],
+        occasion=(payload.occasion or "")[:50],
+        event_datetime=event_datetime,
+        source=entry.source,
+        model=entry.model or "",
+        request_digest=entry.request_digest,
+        context=context,
+    )
+
+
+def save_history(entries: List[HistoryEntry]) -> List[Recommendation]:
+    """Store answers with one Recommendation and one Outfit (bulk) insert."""
+    if not entries:
+        return []
+    try:
+        with transaction.atomic():
+            recommendations = [_recommendation_row(e) for e in entries]
+            if len(recommendations) == 1:
+                recommendations[0].save(force_insert=True)
+            else:
+                recommendations = Recommendation.objects.bulk_create(recommendations)
+            Outfit.objects.bulk_create([
+                Outfit(
+                    recommendation=recommendation,
+                    position=position,
+                    name=outfit["name"][:255],
+                    description=outfit.get("description") or "",
+                    product_ids=list(outfit.get("product_ids") or []),
+                )
+                for recommendation, entry in zip(recommendations, entries)
+                for position, outfit in enumerate(entry.result.get("recommendations") or [], start=1)
+            ])
+        return recommendations
+    except DatabaseError:
+        logger.exception("Could not store recommendation history")
+        return []
+
+
+def missing_item_ids(user, recommendations: Iterable[Recommendation]) -> Set[int]:
+    """
+    Ids referenced by the outfits of `recommendations` (outfits prefetched)
+    that no longer exist in the user's wardrobe. One indexed query.
+    """
+    referenced: Set[int] = set()
+    for recommendation in recommendations:
+        for outfit in recommendation.outfits.all():
+            referenced.update(outfit.product_ids)
+    if not referenced:
+        return set()
+    existing = set(
+        WardrobeItem.objects.filter(user=user, id__in=referenced).values_list("id", flat=True)
+    )
+    return referenced - existing
+
+
+def pregenerated_answer(user_id: Any, request_digest: str) -> Optional[Dict[str, Any]]:
+    """
+    The stored answer to `request_digest` that was pre-generated for one of the
+    user's upcoming events (appointments.UpcomingEvent), as a result dict, or None.
+    The digest covers profile and wardrobe, so a changed wardrobe never matches.
+    """
+    recommendation = (
+        Recommendation.objects.filter(
+            user_id=user_id, request_digest=request_digest, upcoming_events__isnull=False
+        )
+        .order_by("-created_at")
+        .prefetch_related("outfits")
+        .first()
+    )
+    if recommendation is None:
+        return None
+    return {"recommendations": [
+        {"name": o.name, "description": o.description, "product_ids": list(o.product_ids)}
+        for o in recommendation.outfits.all()
+    ]}
@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from agents import style_agent
+from recommendations.benchmark import create_client, environment, peak_memory, run_case, seed_wardrobe
+
+
+def _int_list(value):
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise CommandError(f"Expected comma-separated integers, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark recommend() and POST /client/recommendations/ with the fake LLM backend "
+        "across wardrobe sizes and concurrency levels, on a throwaway test database. "
+        "Writes JSON results that can be diffed between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=_int_list, default=[5, 50, 500, 2000, 10000], help="Wardrobe sizes, e.g. 5,500,10000")
+        parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16], help="Concurrent callers, e.g. 1,4,16")
+        parser.add_argument("--targets", default="service,view", help="service (recommend()), view (RecommendView) or both")
+        parser.add_argument("--requests", type=int, default=50, help="Timed calls per case")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed calls per case")
+        parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake LLM latency per call")
+        parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra uniform random fake LLM latency")
+        parser.add_argument("--cache-hits", action="store_true", help="Repeat one request so calls hit the result cache")
+        parser.add_argument("--memory-samples", type=int, default=3, help="Calls traced for peak memory per case (0 skips)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--destination", default="Dhaka")
+        parser.add_argument("--occasion", default="wedding")
+        parser.add_argument("--datetime", dest="dt_iso", default="2024-12-01T18:30:00+00:00")
+        parser.add_argument("--output", default=None, help="JSON file (default bench-recommend-<commit>.json)")
+
+    def handle(self, *args, **options):
+        targets = [t.strip() for t in options["targets"].split(",") if t.strip()]
+        unknown = set(targets) - {"service", "view"}
+        if unknown:
+            raise CommandError(f"Unknown target(s): {', '.join(sorted(unknown))}")
+
+        config = {
+            key: options[key]
+            for key in ("sizes", "concurrency", "requests", "warmup", "latency_ms", "jitter_ms",
+                        "cache_hits", "seed", "destination", "occasion", "dt_iso")
+        }
+        config["targets"] = targets
+
+        setup_test_environment()
+        sqlite_file = self._file_backed_sqlite()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(override_settings(
+                    STYLIST_LLM_BACKEND="fake",
+                    STYLIST_FAKE_LATENCY_MS=options["latency_ms"],
+                    STYLIST_FAKE_JITTER_MS=options["jitter_ms"],
+                    STYLIST_FAKE_ERROR_RATE=0,
+                    STYLIST_FAKE_SEED=options["seed"],
+                    RECOMMENDATION_ENGINE="llm",
+                ))
+                stack.callback(self._reset_backend)
+                self._reset_backend()
+                stack.enter_context(self._without_user_quota())
+                results = self._run(targets, options)
+            env = environment()
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            if sqlite_file and os.path.exists(sqlite_file):
+                os.remove(sqlite_file)
+
+        report = {
+            "benchmark": "recommend",
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "environment": env,
+            "config": config,
+            "results": results,
+        }
+        output = options["output"] or f"bench-recommend-{env['commit'] or 'local'}.json"
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+    # --------- internals --------- #
+
+    @staticmethod
+    def _file_backed_sqlite():
+        """
+        SQLite test databases live in shared-cache memory, where concurrent
+        writers fail with "table is locked" instead of waiting; use a temp file.
+        """
+        settings_dict = connections["default"].settings_dict
+        if settings_dict["ENGINE"] != "django.db.backends.sqlite3":
+            return None
+        fd, path = tempfile.mkstemp(prefix="bench-recommend-", suffix=".sqlite3")
+        os.close(fd)
+        settings_dict.setdefault("TEST", {})["NAME"] = path
+        return path
+
+    @staticmethod
+    def _reset_backend():
+        # Rebuilt from the (overridden) settings on next use
+        style_agent._backend = None
+
+    @staticmethod
+    @contextmanager
+    def _without_user_quota():
+        """One synthetic client sends every request: lift its per-user quota, keep the global limit."""
+        from recommendations.services import llm_admission
+
+        saved = llm_admission.user_rate
+        llm_admission.user_rate = 0
+        try:
+            yield
+        finally:
+            llm_admission.user_rate = saved
+
+    def _run(self, targets, options):
+        from recommendations.services import recommend, recommendation_cache
+
+        results = []
+        self.stdout.write(
+            f"{'target':<8} {'items':>6} {'conc':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'req/s':>8} {'sql':>6} {'peak KiB':>9} {'err':>4}"
+        )
+        for size_index, size in enumerate(options["sizes"]):
+            user = create_client(f"bench-{size_index}-{size}@example.com", seed=options["seed"] + size_index)
+            seed_wardrobe(user, size, seed=options["seed"] + size_index)
+            body = {"destination": options["destination"], "datetime": options["dt_iso"]}
+
+            def occasion(case, index):
+                if options["cache_hits"]:
+                    return f"{options['occasion']} #{case}"
+                return f"{options['occasion']} #{case}-{index}"
+
+            def service_call(case):
+                def call(index):
+                    recommend(
+                        user_id=user.pk,
+                        destination=body["destination"],
+                        occasion=occasion(case, index),
+                        dt_iso=body["datetime"],
+                    )
+                return call
+
+            def view_call(case):
+                local = threading.local()  # one API client per calling thread
+
+                def call(index):
+                    client = getattr(local, "client", None)
+                    if client is None:
+                        client = local.client = APIClient()
+                        client.force_authenticate(user)
+                    response = client.post("/client/recommendations/", {**body, "occasion": occasion(case, index)}, format="json")
+                    if response.status_code != 200:
+                        raise RuntimeError(f"HTTP {response.status_code}: {getattr(response, 'data', '')}")
+                return call
+
+            for target in targets:
+                for concurrency in options["concurrency"]:
+                    case = f"{target}-{size}-{concurrency}"
+                    call = (service_call if target == "service" else view_call)(case)
+                    recommendation_cache.clear()
+                    for index in range(options["warmup"]):
+                        call(-1 - index)
+                    result = run_case(call, requests=options["requests"], concurrency=concurrency)
+                    samples = range(options["requests"], options["requests"] + options["memory_samples"])
+                    result["peak_memory_bytes"] = peak_memory(call, samples) if options["memory_samples"] > 0 else None
+                    result.update(target=target, wardrobe_size=size)
+                    results.append(result)
+                    self._print(result)
+        return results
+
+    def _print(self, r):
+        latency = r["latency_ms"]
+        peak = f"{r['peak_memory_bytes'] / 1024:.0f}" if r["peak_memory_bytes"] is not None else "-"
+        self.stdout.write(
+            f"{r['target']:<8} {r['wardrobe_size']:>6} {r['concurrency']:>5} {latency['p50']:>9.1f} "
+            f"{latency['p95']:>9.1f} {latency['p99']:>9.1f} {r['throughput_rps']:>8.1f} "
+            f"{r['sql_queries']['mean']:>6.1f} {peak:>9} {r['errors']:>4}"
+        )
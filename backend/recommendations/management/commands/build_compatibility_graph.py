@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from client.models import WardrobeItem
+from recommendations.services import compatibility_graph
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user outfit compatibility graph (existing wardrobes, or after changing RECOMMENDATION_COMPAT_TOP_K)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email of a single user to rebuild (default: every user with wardrobe items)")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']!r}")
+            user_ids = [user.pk]
+        else:
+            user_ids = WardrobeItem.objects.values_list("user_id", flat=True).distinct().order_by()
+
+        users = edges = 0
+        for user_id in user_ids:
+            edges += compatibility_graph.rebuild_user(user_id)
+            users += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {users} user graph(s): {edges} edges (top {compatibility_graph.top_k} per item and category)"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations.gazetteer import SOURCE_PATH, TABLE_PATH, build_table, write_table
+
+
+class Command(BaseCommand):
+    help = "Rebuild the memory-mapped gazetteer (recommendations/data/gazetteer.npy) from cities.csv."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=str(SOURCE_PATH), help="CSV with cities, timezones and climate normals")
+        parser.add_argument("--output", default=str(TABLE_PATH), help="Where to write the .npy table")
+
+    def handle(self, *args, **options):
+        try:
+            table = build_table(options["source"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        write_table(table, options["output"])
+        cities = len(set(table["name"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']}: {cities} cities, {len(table)} names, {table.nbytes} bytes"
+        ))
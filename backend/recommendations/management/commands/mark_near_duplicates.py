@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from client.models import WardrobeItem
+from recommendations.services import wardrobe_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the near-duplicate marks prompts are filtered by (existing wardrobes, or after changing RECOMMENDATION_DEDUPE_THRESHOLD)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email of a single user to mark (default: every user with wardrobe items)")
+
+    def handle(self, *args, **options):
+        threshold = getattr(settings, "RECOMMENDATION_DEDUPE_THRESHOLD", 0.95)
+        if threshold <= 0:
+            raise CommandError("RECOMMENDATION_DEDUPE_THRESHOLD is 0: deduplication is disabled")
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']!r}")
+            user_ids = [user.pk]
+        else:
+            user_ids = WardrobeItem.objects.values_list("user_id", flat=True).distinct().order_by()
+
+        users = updated = 0
+        for user_id in user_ids:
+            updated += wardrobe_index.mark_duplicates(user_id, threshold)
+            users += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {users} wardrobe(s): {updated} item(s) changed (threshold {threshold})"
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from agents.encoders import ENCODERS, estimate_tokens
+from recommendations.services import build_payload
+
+
+class Command(BaseCommand):
+    help = "Compare estimated input tokens of each payload encoder for a client's real payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Client whose profile + wardrobe are encoded")
+        parser.add_argument("--destination", default="Dhaka")
+        parser.add_argument("--occasion", default="business meeting")
+        parser.add_argument("--datetime", dest="dt_iso", default="2024-12-01T18:30:00+00:00")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['email']}")
+        try:
+            _, payload = build_payload(
+                user_id=user.pk,
+                destination=options["destination"],
+                occasion=options["occasion"],
+                dt_iso=options["dt_iso"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{len(payload.drawer_products)} drawer products")
+        self.stdout.write(f"{'encoder':<10} {'chars':>8} {'tokens':>8}")
+        for name, encoder in ENCODERS.items():
+            text = encoder.encode(payload)
+            self.stdout.write(f"{name:<10} {len(text):>8} {estimate_tokens(text):>8}")
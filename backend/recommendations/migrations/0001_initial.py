@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100)),
+                ('occasion', models.CharField(max_length=50)),
+                ('event_datetime', models.DateTimeField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('llm', 'Stylist agent'), ('rules', 'Rule engine'), ('fallback', 'Rule engine (agent unavailable)')], max_length=20)),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('request_digest', models.CharField(blank=True, max_length=64)),
+                ('context', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Outfit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('product_ids', models.JSONField(default=list)),
+                ('recommendation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outfits', to='recommendations.recommendation')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['user', '-created_at'], name='rec_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='outfit',
+            constraint=models.UniqueConstraint(fields=('recommendation', 'position'), name='outfit_unique_position'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0004_recommendation_rec_user_digest_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemembedding',
+            name='duplicate_of',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,95 @@
 from django.db import models
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+User = get_user_model()
+
+
+class Recommendation(models.Model):
+    """One generated answer (up to 5 outfits) plus the request it answered."""
+
+    class Source(models.TextChoices):
+        LLM = "llm", "Stylist agent"
+        RULES = "rules", "Rule engine"
+        FALLBACK = "fallback", "Rule engine (agent unavailable)"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recommendations")
+    destination = models.CharField(max_length=100)
+    occasion = models.CharField(max_length=50)
+    event_datetime = models.DateTimeField(null=True, blank=True)
+    source = models.CharField(max_length=20, choices=Source.choices)
+    model = models.CharField(max_length=100, blank=True)  # LLM model name, empty for the rule engine
+    request_digest = models.CharField(max_length=64, blank=True)  # cache key of the payload
+    context = models.JSONField(default=dict)  # user_info + ids of the drawer products sent
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # history endpoint: WHERE user_id = ? ORDER BY created_at DESC
+            models.Index(fields=["user", "-created_at"], name="rec_user_created_idx"),
+            models.Index(fields=["user", "request_digest"], name="rec_user_digest_idx"),
+        ]
+
+    def __str__(self):
+        return f"Recommendation<{self.user_id} {self.occasion} @ {self.destination}>"
+
+
+class RecommendationJob(models.Model):
+    """Owner of a queued recommendation job; its status is only shown to them."""
+    id = models.CharField(max_length=64, primary_key=True)  # Celery task id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "created_at"], name="rec_job_user_created_idx")]
+
+
+class Outfit(models.Model):
+    recommendation = models.ForeignKey(Recommendation, on_delete=models.CASCADE, related_name="outfits")
+    position = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    product_ids = models.JSONField(default=list)  # WardrobeItem ids; items may be deleted later
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["recommendation", "position"], name="outfit_unique_position"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} (#{self.position})"
+
+
+class ItemEmbedding(models.Model):
+    """Vector of one WardrobeItem for similarity search (see recommendations/embeddings.py)."""
+    item = models.OneToOneField(
+        "client.WardrobeItem", on_delete=models.CASCADE, primary_key=True, related_name="embedding"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")  # one indexed query per user
+    version = models.PositiveSmallIntegerField()  # embeddings.EMBEDDING_VERSION it was computed with
+    vector = models.BinaryField()  # float32 x embeddings.DIM
+    # Newest item of the wardrobe within RECOMMENDATION_DEDUPE_THRESHOLD; left out of prompts when set
+    duplicate_of = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ItemCompatibility(models.Model):
+    """
+    Edge of the per-user compatibility graph: `other` is among the best
+    partners of `item` in `other_category` (see recommendations/compatibility.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    item = models.ForeignKey("client.WardrobeItem", on_delete=models.CASCADE, related_name="compatible_items")
+    other = models.ForeignKey("client.WardrobeItem", on_delete=models.CASCADE, related_name="+")
+    other_category = models.CharField(max_length=20)
+    rank = models.PositiveSmallIntegerField()  # 0 = best partner in other_category
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["item", "other"], name="compat_unique_edge"),
+        ]
+        indexes = [
+            models.Index(fields=["item", "rank"], name="compat_item_rank_idx"),
+        ]
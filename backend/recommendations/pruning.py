@@ -0,0 +1,171 @@
+"""
+recommendations/pruning.py
+
+Pick which wardrobe items go into the prompt.
+
+Design:
+- Every item is scored against the occasion (category fit), the season of the
+  event datetime, and the user's color preferences.
+- Items are then picked best-first with a per-category diminishing return, so
+  relevant categories get more room but every category stays represented.
+- Selection stops at a token budget instead of a fixed item count.
+- Optionally (`partners`, backed by the compatibility graph), items that pair
+  well with the best item of each category move up before the rest is picked,
+  so the prompt holds outfits that can actually be completed.
+"""
+
+import heapq
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .rule_engine import occasion_formality
+
+
+# Category fit by occasion formality (see rule_engine.occasion_formality)
+_FORMAL_CATEGORY_FIT = {
+    "suit": 1.0, "dress": 0.9, "footwear": 0.8, "outerwear": 0.7,
+    "top": 0.7, "bottom": 0.7, "accessory": 0.6, "other": 0.2,
+}
+_CASUAL_CATEGORY_FIT = {
+    "top": 1.0, "bottom": 1.0, "footwear": 0.8, "accessory": 0.6,
+    "dress": 0.6, "outerwear": 0.5, "suit": 0.1, "other": 0.4,
+}
+
+# Season adjustments: (category bonus, colors that read well that season)
+_SEASON_RULES = {
+    "winter": ({"outerwear": 0.4, "dress": -0.1}, {"black", "gray", "brown", "blue", "red", "purple"}),
+    "spring": ({"outerwear": 0.1}, {"pink", "green", "yellow", "white", "beige", "blue"}),
+    "summer": ({"outerwear": -0.3, "dress": 0.1}, {"white", "beige", "yellow", "pink", "blue"}),
+    "autumn": ({"outerwear": 0.2}, {"brown", "beige", "red", "green", "black", "gray"}),
+}
+
+W_OCCASION, W_SEASON_COLOR, W_PREFERENCE = 1.0, 0.15, 0.3
+# Score lost by a category for every item already selected from it
+CATEGORY_REPEAT_PENALTY = 0.08
+# Bonus per unit of compatibility with one of the category heads
+W_COMPATIBILITY = 0.25
+
+
+def season_for(dt: Optional[datetime], southern_hemisphere: bool = False) -> Optional[str]:
+    """Meteorological season of a datetime (northern hemisphere unless told otherwise)."""
+    if dt is None:
+        return None
+    month = dt.month
+    if southern_hemisphere:
+        month = (month + 5) % 12 + 1
+    if month in (12, 1, 2):
+        return "winter"
+    if month in (3, 4, 5):
+        return "spring"
+    if month in (6, 7, 8):
+        return "summer"
+    return "autumn"
+
+
+def score_item(
+    item: Dict[str, Any],
+    *,
+    formality: float,
+    season: Optional[str],
+    color_preferences: Sequence[str],
+) -> float:
+    category = (item.get("category") or "other").lower()
+    color = (item.get("color") or "other").lower()
+
+    # blend formal/casual category fit by how formal the occasion is
+    fit = (
+        formality * _FORMAL_CATEGORY_FIT.get(category, 0.3)
+        + (1.0 - formality) * _CASUAL_CATEGORY_FIT.get(category, 0.3)
+    )
+    score = W_OCCASION * fit
+
+    if season in _SEASON_RULES:
+        category_bonus, season_colors = _SEASON_RULES[season]
+        score += category_bonus.get(category, 0.0)
+        if color in season_colors:
+            score += W_SEASON_COLOR
+
+    if color in {c.lower() for c in color_preferences}:
+        score += W_PREFERENCE
+    return score
+
+
+def select_candidates(
+    items: List[Dict[str, Any]],
+    *,
+    occasion: Optional[str],
+    dt: Optional[datetime],
+    token_cost: Callable[[Dict[str, Any]], int],
+    color_preferences: Sequence[str] = (),
+    token_budget: int = 1200,
+    season: Optional[str] = None,
+    partners: Optional[Callable[[List[int]], Dict[int, float]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Return a category-balanced, relevance-ranked subset of `items` whose
+    estimated prompt size fits in `token_budget`. Always keeps at least one item.
+    `token_cost` prices one item (the active encoder's estimate_item_tokens);
+    `season` overrides the one derived from `dt`. `partners` maps item ids
+    to {compatible item id: score} (CompatibilityGraph.partner_scores).
+    """
+    if not items:
+        return []
+
+    formality = occasion_formality(occasion)
+    season = season or season_for(dt)
+
+    by_category: Dict[str, List[tuple]] = {}
+    for item in items:
+        score = score_item(item, formality=formality, season=season, color_preferences=color_preferences)
+        # newer items (higher id) win ties
+        by_category.setdefault((item.get("category") or "other").lower(), []).append((score, item.get("id") or 0, item))
+    for ranked in by_category.values():
+        ranked.sort(key=lambda t: (t[0], t[1]), reverse=True)
+
+    selected: List[Dict[str, Any]] = []
+    spent = 0
+
+    def take(item: Dict[str, Any]) -> bool:
+        nonlocal spent
+        cost = token_cost(item)
+        if selected and spent + cost > token_budget:
+            return False
+        selected.append(item)
+        spent += cost
+        return True
+
+    # 1) Best item of every category first, so outfits can still be completed
+    heads = sorted(by_category, key=lambda c: by_category[c][0][:2], reverse=True)
+    for category in heads:
+        if not take(by_category[category][0][2]):
+            return selected
+
+    # 1.5) Items that go well with those picks move up within their category
+    if partners is not None:
+        bonus = partners([item.get("id") for item in selected])
+        if bonus:
+            for ranked in by_category.values():
+                rest = [(score + W_COMPATIBILITY * bonus.get(item_id, 0.0), item_id, item) for score, item_id, item in ranked[1:]]
+                rest.sort(key=lambda t: (t[0], t[1]), reverse=True)
+                ranked[1:] = rest
+
+    # 2) Then the best remaining item overall; every item already taken from a
+    #    category lowers that category's next score (diminishing returns)
+    taken: Dict[str, int] = {category: 1 for category in by_category}
+    heap = []
+    for category, ranked in by_category.items():
+        if len(ranked) > 1:
+            score, item_id, _ = ranked[1]
+            heap.append((-(score - CATEGORY_REPEAT_PENALTY), -item_id, category))
+    heapq.heapify(heap)
+
+    while heap:
+        _, _, category = heapq.heappop(heap)
+        ranked = by_category[category]
+        if not take(ranked[taken[category]][2]):
+            break
+        taken[category] += 1
+        if taken[category] < len(ranked):
+            score, item_id, _ = ranked[taken[category]]
+            heapq.heappush(heap, (-(score - CATEGORY_REPEAT_PENALTY * taken[category]), -item_id, category))
+    return selected
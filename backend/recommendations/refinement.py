@@ -0,0 +1,228 @@
+"""
+recommendations/refinement.py
+
+Per-user checkpoints for conversational refinement ("swap the shoes in outfit 2").
+
+Design:
+- One checkpoint per user: the latest recommendation they can refine. A new
+  recommendation replaces it; a wardrobe/profile change drops it
+  (see recommendations/signals.py).
+- A checkpoint never holds the whole wardrobe: only the request context
+  (user_info, location, occasion, datetime), the items used by the current
+  outfits, a few alternates picked by the pruner within a small token budget,
+  the current structured result and the last `max_turns` change requests.
+  A refinement prompt is built from that alone, so its size stays flat no
+  matter how large the wardrobe is or how many turns came before.
+- Limits: `idle_ttl` since the last turn, `max_age` since the checkpoint
+  started, `max_turns` kept, and at most `max_sessions` checkpoints per
+  process (LRU eviction) when Redis is not available.
+- Checkpoints live in Redis (one JSON key per user, expiring with the TTL) so
+  every worker sees them; without Redis they are per process.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from agents.stylist_types import StylistRequestPayload
+from common.redis_client import get_redis_client
+
+from .pruning import select_candidates
+
+
+logger = logging.getLogger(__name__)
+
+
+def new_checkpoint(
+    payload: StylistRequestPayload,
+    result: Dict[str, Any],
+    *,
+    token_cost: Callable[[Dict[str, Any]], int],
+    recommendation_id: Optional[int] = None,
+    alternates_budget: int = 400,
+) -> Dict[str, Any]:
+    """
+    Checkpoint for `result`, generated from `payload`: the items its outfits
+    use plus the best unused items within `alternates_budget` tokens, each
+    priced by `token_cost`.
+    """
+    used = {pid for outfit in result.get("recommendations") or [] for pid in outfit["product_ids"]}
+    products = [p.model_dump(mode="json") for p in payload.drawer_products]
+    items = [p for p in products if p["id"] in used]
+    unused = [p for p in products if p["id"] not in used]
+    if unused and alternates_budget > 0:
+        items += select_candidates(
+            unused,
+            occasion=payload.occasion,
+            dt=payload.event_datetime,
+            color_preferences=payload.user_info.color_preferences,
+            token_budget=alternates_budget,
+            token_cost=token_cost,
+        )
+    now = time.time()
+    return {
+        "recommendation_id": recommendation_id,
+        "context": payload.model_dump(mode="json", by_alias=True, exclude={"drawer_products"}),
+        "items": items,
+        "result": result,
+        "turns": [],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def checkpoint_payload(checkpoint: Dict[str, Any]) -> StylistRequestPayload:
+    """The (small) payload a refinement prompt is built from."""
+    return StylistRequestPayload.model_validate({**checkpoint["context"], "drawer_products": checkpoint["items"]})
+
+
+class RefinementStore:
+    """Latest refinable recommendation per user, with turn, age and count limits."""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        max_sessions: int = 1000,
+        idle_ttl: float = 1800,
+        max_age: float = 4 * 3600,
+        max_turns: int = 5,
+        redis_factory: Callable[[], Any] = get_redis_client,
+    ):
+        self.namespace = namespace
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_age = max_age
+        self.max_turns = max(1, max_turns)
+        self._redis_factory = redis_factory
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()  # user key -> (expires_at, json)
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        raw = self._load(str(user_id))
+        if raw is None:
+            return None
+        checkpoint = json.loads(raw)
+        if time.time() - checkpoint["created_at"] >= self.max_age:
+            self._count_expired()
+            self.drop(user_id)
+            return None
+        return checkpoint
+
+    def save(self, user_id: Any, checkpoint: Dict[str, Any]) -> None:
+        """Store `checkpoint`, keeping only the last `max_turns` change requests."""
+        now = time.time()
+        checkpoint["turns"] = checkpoint["turns"][-self.max_turns:]
+        checkpoint["updated_at"] = now
+        ttl = min(self.idle_ttl, checkpoint["created_at"] + self.max_age - now)
+        if ttl <= 0 or self.max_sessions <= 0:
+            self.drop(user_id)
+            return
+        self._store(str(user_id), json.dumps(checkpoint, separators=(",", ":"), default=str), ttl)
+
+    def record_turn(
+        self,
+        user_id: Any,
+        checkpoint: Dict[str, Any],
+        message: str,
+        result: Dict[str, Any],
+        recommendation_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        checkpoint["turns"].append(message)
+        checkpoint["result"] = result
+        if recommendation_id is not None:
+            checkpoint["recommendation_id"] = recommendation_id
+        self.save(user_id, checkpoint)
+        return checkpoint
+
+    def drop(self, user_id: Any) -> None:
+        from redis.exceptions import RedisError
+
+        user_key = str(user_id)
+        with self._lock:
+            self._local.pop(user_key, None)
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                client.delete(self._key(user_key))
+            except RedisError:
+                logger.warning("Redis unavailable; could not drop refinement checkpoint", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "local_sessions": len(self._local),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "max_age": self.max_age,
+                "max_turns": self.max_turns,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+    # --------- internals --------- #
+
+    def _key(self, user_key: str) -> str:
+        return f"{self.namespace}:checkpoint:{user_key}"
+
+    def _count_expired(self) -> None:
+        with self._lock:
+            self.expired += 1
+
+    def _load(self, user_key: str) -> Optional[str]:
+        from redis.exceptions import RedisError
+
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                raw = client.get(self._key(user_key))
+                return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+            except RedisError:
+                logger.warning("Redis unavailable for refinement checkpoints; using per-process store", exc_info=True)
+
+        with self._lock:
+            entry = self._local.get(user_key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at <= time.monotonic():
+                del self._local[user_key]
+                self.expired += 1
+                return None
+            self._local.move_to_end(user_key)
+            return raw
+
+    def _store(self, user_key: str, raw: str, ttl: float) -> None:
+        from redis.exceptions import RedisError
+
+        client = self._redis_factory()
+        if client is not None:
+            try:
+                client.set(self._key(user_key), raw, ex=max(1, math.ceil(ttl)))
+                return
+            except RedisError:
+                logger.warning("Redis unavailable for refinement checkpoints; using per-process store", exc_info=True)
+
+        with self._lock:
+            self._local.pop(user_key, None)
+            self._local[user_key] = (time.monotonic() + ttl, raw)
+            while len(self._local) > self.max_sessions:
+                self._local.popitem(last=False)
+                self.evictions += 1
+
+
+def known_ids_only(result: Dict[str, Any], items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop product ids the model was not offered; drop outfits left empty."""
+    allowed = {item["id"] for item in items}
+    outfits = []
+    for outfit in result.get("recommendations") or []:
+        product_ids = [pid for pid in outfit["product_ids"] if pid in allowed]
+        if product_ids:
+            outfits.append({**outfit, "product_ids": product_ids})
+    return {"recommendations": outfits}
@@ -0,0 +1,352 @@
+"""
+recommendations/resilience.py
+
+Timeouts, retries, hedging and a circuit breaker around the stylist LLM call.
+
+Design:
+- Every attempt runs on a worker thread with its own deadline, so a stalled
+  provider can't hang the request; the whole call also has an overall deadline.
+  (The provider clients get the same timeout, so abandoned attempts end too.)
+- Transient failures (timeouts, connection errors, 408/429/5xx) are retried
+  with capped exponential backoff and full jitter; anything else fails fast.
+- Optional hedging: if an attempt is still running after the observed p95
+  latency, a second identical request is sent and the first answer wins.
+- Admission accounting covers every provider call: the call's admission slot
+  is held until its last attempt thread ends, including attempts abandoned
+  after a timeout. An attempt started while another is still running (hedge,
+  retry after a timeout) needs an extra slot (`extra_slot`) or is not started.
+  Nothing is submitted once the overall deadline has passed.
+- A circuit breaker counts failed calls; after `failure_threshold` in a row it
+  opens and calls fail immediately with CircuitOpenError (services fall back to
+  the rule engine) until `reset_timeout` passes and one probe call succeeds.
+- Breaker state is per process and exported on /metrics/.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+from agents.backends import FakeBackendError
+from common.metrics import Counter
+
+
+logger = logging.getLogger(__name__)
+
+RESILIENCE_EVENTS = Counter(
+    "stylegenie_llm_resilience_events_total",
+    "Stylist LLM resilience events (timeout, retry, hedge, hedge_won, no_slot, short_circuit, breaker_opened).",
+    ["event"],
+)
+
+# HTTP statuses worth retrying
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_TRANSIENT_NAMES = ("Timeout", "Connection", "Unavailable", "RateLimit", "ServerError", "ResourceExhausted")
+
+
+class AttemptTimeout(TimeoutError):
+    """One attempt ran past its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider is considered unhealthy; the call was not attempted."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__("The stylist is temporarily unavailable. Please try again shortly.")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether retrying `exc` has a chance of succeeding."""
+    if isinstance(exc, (TimeoutError, ConnectionError, FakeBackendError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS
+    return any(word in type(exc).__name__ for word in _TRANSIENT_NAMES)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.times_opened = 0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self._state = self.HALF_OPEN
+            # half open: one probe at a time; a lost probe expires after reset_timeout
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout)
+            self._probe_started = now
+
+    def cancel_probe(self) -> None:
+        """The admitted call never reached the provider; let another caller probe."""
+        with self._lock:
+            self._probe_started = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    RESILIENCE_EVENTS.inc(event="breaker_opened")
+                    logger.warning("Circuit %s opened after %d failures", self.name, self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            retry_after = 0.0
+            if state == self.OPEN:
+                retry_after = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+                if retry_after == 0:
+                    state = self.HALF_OPEN  # next call probes
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_after": round(retry_after, 1),
+                "times_opened": self.times_opened,
+            }
+
+
+# Non-blocking slot acquisition: a release callable, or None when no slot is free
+SlotFactory = Callable[[], Optional[Callable[[], None]]]
+
+
+class _NoSlot(Exception):
+    """Another attempt is still running and no extra admission slot is free."""
+
+
+class _Attempts:
+    """
+    Attempt threads of one call. `release` (the call's admission slot) runs once
+    the call is over and its last attempt has ended, whichever comes last.
+    """
+
+    def __init__(self, release: Callable[[], None], extra_slot: Optional[SlotFactory]):
+        self._release = release
+        self._extra_slot = extra_slot
+        self._lock = threading.Lock()
+        self._running = 0
+        self._closed = False
+
+    def submit(self, executor: ThreadPoolExecutor, fn: Callable[[], Any]) -> Future:
+        with self._lock:
+            concurrent = self._running > 0
+        release_extra = None
+        if concurrent and self._extra_slot is not None:
+            release_extra = self._extra_slot()
+            if release_extra is None:
+                RESILIENCE_EVENTS.inc(event="no_slot")
+                raise _NoSlot()
+        with self._lock:
+            self._running += 1
+        future = executor.submit(fn)
+        future.add_done_callback(lambda _: self._finished(release_extra))
+        return future
+
+    def _finished(self, release_extra: Optional[Callable[[], None]]) -> None:
+        if release_extra is not None:
+            release_extra()
+        with self._lock:
+            self._running -= 1
+            last = self._closed and self._running == 0
+        if last:
+            self._release()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            last = self._running == 0
+        if last:
+            self._release()
+
+
+class ResilientCaller:
+    """Runs a function with per-attempt deadlines, retries, hedging and a breaker."""
+
+    # Successful latencies kept to estimate p95 for hedging
+    LATENCY_WINDOW = 200
+    MIN_SAMPLES_FOR_P95 = 20
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        *,
+        attempt_timeout: float = 25.0,
+        deadline: float = 60.0,
+        max_retries: int = 1,
+        backoff_base: float = 0.5,
+        backoff_max: float = 4.0,
+        hedge: bool = False,
+        hedge_after: float = 8.0,
+        max_threads: int = 32,
+    ):
+        self.breaker = breaker
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.max_threads = max_threads
+        self._latencies: deque = deque(maxlen=self.LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        *,
+        admit: Optional[ContextManager] = None,
+        extra_slot: Optional[SlotFactory] = None,
+    ) -> Any:
+        """
+        Return fn()'s result. `admit` (e.g. AdmissionController.admit(user)) is
+        entered after the breaker check, so an open breaker spends no quota, and
+        exited once no attempt of this call is running any more. `extra_slot`
+        (e.g. AdmissionController.try_slot) admits attempts that would run
+        alongside another one.
+        Raises CircuitOpenError, the last attempt's error, or AttemptTimeout.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            RESILIENCE_EVENTS.inc(event="short_circuit")
+            raise
+
+        admission = ExitStack()
+        try:
+            admission.enter_context(admit or nullcontext())
+        except Exception:
+            self.breaker.cancel_probe()
+            raise
+        attempts = _Attempts(admission.close, extra_slot if admit is not None else None)
+        try:
+            result = self._call_with_retries(fn, attempts)
+        except Exception as e:
+            if is_transient(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()  # provider answered; the request itself was bad
+            raise
+        finally:
+            attempts.close()
+        self.breaker.record_success()
+        return result
+
+    def hedge_delay(self) -> float:
+        """Observed p95 of successful attempts, or `hedge_after` until there is enough data."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.MIN_SAMPLES_FOR_P95:
+            return self.hedge_after
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    # --------- internals --------- #
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="llm-attempt")
+        return self._pool
+
+    def _call_with_retries(self, fn: Callable[[], Any], attempts: _Attempts) -> Any:
+        overall = time.monotonic() + self.deadline
+        attempt = 0
+        error: Optional[Exception] = None
+        while True:
+            remaining = overall - time.monotonic()
+            if remaining <= 0:
+                RESILIENCE_EVENTS.inc(event="timeout")
+                raise error or AttemptTimeout(f"Stylist call exceeded its {self.deadline:.1f}s deadline")
+            try:
+                return self._attempt(fn, min(self.attempt_timeout, remaining), attempts)
+            except _NoSlot:
+                raise error  # a retry would run alongside the abandoned attempt
+            except Exception as e:
+                error = e
+                if attempt >= self.max_retries or not is_transient(e):
+                    raise
+                # full jitter: uniform(0, min(cap, base * 2^attempt))
+                sleep = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if time.monotonic() + sleep >= overall:
+                    raise
+                attempt += 1
+                RESILIENCE_EVENTS.inc(event="retry")
+                logger.info("Retrying stylist call (attempt %d) after %s", attempt + 1, type(e).__name__)
+                time.sleep(sleep)
+
+    def _attempt(self, fn: Callable[[], Any], timeout: float, attempts: _Attempts) -> Any:
+        start = time.monotonic()
+        deadline = start + max(0.0, timeout)
+        hedge_at = start + self.hedge_delay() if self.hedge else None
+        primary = attempts.submit(self._executor(), fn)
+        pending = {primary}
+        error: Optional[BaseException] = None
+
+        while pending:
+            now = time.monotonic()
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                with self._lock:
+                    self._latencies.append(time.monotonic() - start)
+                if future is not primary:
+                    RESILIENCE_EVENTS.inc(event="hedge_won")
+                for other in pending:
+                    other.cancel()  # a running thread finishes on its own (provider timeout)
+                return future.result()
+
+            now = time.monotonic()
+            if pending and now >= deadline:
+                RESILIENCE_EVENTS.inc(event="timeout")
+                raise AttemptTimeout(f"Stylist call exceeded {timeout:.1f}s")
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if pending:  # primary still running: race a second request, if admitted
+                    try:
+                        pending.add(attempts.submit(self._executor(), fn))
+                        RESILIENCE_EVENTS.inc(event="hedge")
+                    except _NoSlot:
+                        pass
+
+        raise error
@@ -0,0 +1,247 @@
+"""
+recommendations/rule_engine.py
+
+Deterministic, offline outfit generator.
+
+Design:
+- Works only from WardrobeItem.Category / WardrobeItem.Color plus the user_info
+  already on the StylistRequestPayload; no network, no randomness.
+- Precomputed tables: COLOR_HARMONY (color x color score) and OUTFIT_TEMPLATES
+  (which category combinations make a complete outfit, and how formal they are).
+- Candidate outfits are the cartesian product of the best items per template
+  slot; all candidates of a template are scored at once with NumPy.
+- Returns the same AIRecommendations shape as the LLM agent.
+
+Used as a selectable engine ("rules"), as the automatic fallback when the
+stylist agent fails, and as a latency baseline.
+"""
+
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agents.stylist_types import AIRecommendations, DrawerProduct, StylistRequestPayload
+from client.models import WardrobeItem
+
+
+# --------- 1. Precomputed tables --------- #
+
+COLORS: Tuple[str, ...] = tuple(WardrobeItem.Color.values)
+COLOR_INDEX: Dict[str, int] = {c: i for i, c in enumerate(COLORS)}
+NEUTRALS = {"black", "white", "gray", "beige", "brown"}
+
+# Pairs that are not covered by the neutral rules below
+_PAIR_SCORES = {
+    ("blue", "yellow"): 0.6,
+    ("blue", "pink"): 0.65,
+    ("blue", "red"): 0.5,
+    ("blue", "green"): 0.55,
+    ("blue", "purple"): 0.5,
+    ("green", "pink"): 0.45,
+    ("green", "yellow"): 0.5,
+    ("green", "purple"): 0.35,
+    ("green", "red"): 0.2,
+    ("pink", "purple"): 0.5,
+    ("pink", "red"): 0.3,
+    ("pink", "yellow"): 0.4,
+    ("purple", "red"): 0.3,
+    ("purple", "yellow"): 0.55,
+    ("red", "yellow"): 0.35,
+}
+
+
+def _build_color_harmony() -> np.ndarray:
+    n = len(COLORS)
+    table = np.full((n, n), 0.5, dtype=np.float32)
+    for i, a in enumerate(COLORS):
+        for j, b in enumerate(COLORS):
+            if a in NEUTRALS and b in NEUTRALS:
+                score = 0.75 if a == b else 0.9
+            elif a in NEUTRALS or b in NEUTRALS:
+                score = 0.8
+            elif a == b:
+                score = 0.4 if a != "other" else 0.5
+            else:
+                score = _PAIR_SCORES.get((a, b), _PAIR_SCORES.get((b, a), 0.5))
+            table[i, j] = score
+    return table
+
+
+COLOR_HARMONY: np.ndarray = _build_color_harmony()
+
+# (label, categories that complete the outfit, formality 0..1)
+OUTFIT_TEMPLATES: Tuple[Tuple[str, Tuple[str, ...], float], ...] = (
+    ("Tailored Suit", ("suit", "top", "footwear"), 1.0),
+    ("Sharp Suit", ("suit", "footwear"), 0.95),
+    ("Layered Dress", ("dress", "outerwear", "footwear"), 0.8),
+    ("Dress Look", ("dress", "footwear"), 0.7),
+    ("Layered Set", ("top", "bottom", "outerwear", "footwear"), 0.6),
+    ("Accessorized Set", ("top", "bottom", "footwear", "accessory"), 0.5),
+    ("Everyday Set", ("top", "bottom", "footwear"), 0.35),
+    ("Easy Pairing", ("top", "bottom"), 0.2),
+)
+
+_FORMAL_WORDS = ("wedding", "business", "meeting", "interview", "gala", "formal", "office",
+                 "conference", "ceremony", "dinner", "presentation")
+_CASUAL_WORDS = ("beach", "casual", "brunch", "picnic", "gym", "travel", "weekend", "park",
+                 "shopping", "hangout", "festival")
+
+_SKIN_TONE_TIPS = {
+    "white": "soft contrasts flatter a fair complexion",
+    "wheat": "warm, earthy shades complement a medium skin tone",
+    "tan": "rich tones bring out a tan complexion",
+    "olive": "jewel tones and neutrals work well with olive skin",
+    "brown": "bright and deep shades pop against brown skin",
+    "dark": "bold colors and crisp whites stand out on dark skin",
+}
+
+_BODY_SHAPE_TIPS = {
+    "rectangle": "layering adds shape to a rectangle frame",
+    "hourglass": "balanced pieces keep an hourglass figure in proportion",
+    "pear": "a structured top balances a pear shape",
+    "apple": "clean vertical lines flatter an apple shape",
+    "inverted_triangle": "a grounded bottom half balances broad shoulders",
+}
+
+# Weights of the score components
+W_HARMONY, W_PREFERENCE, W_FORMALITY = 0.55, 0.15, 0.30
+# Best items kept per template slot before taking the cartesian product
+MAX_ITEMS_PER_SLOT = 8
+
+
+# --------- 2. Scoring --------- #
+
+def occasion_formality(occasion: Optional[str]) -> float:
+    """How formal an occasion reads, 0 (casual) .. 1 (formal), from keywords."""
+    text = (occasion or "").lower()
+    if any(w in text for w in _FORMAL_WORDS):
+        return 0.9
+    if any(w in text for w in _CASUAL_WORDS):
+        return 0.25
+    return 0.5
+
+
+def _preference_vector(color_preferences: Sequence[str]) -> np.ndarray:
+    prefs = np.zeros(len(COLORS), dtype=np.float32)
+    for color in color_preferences or []:
+        idx = COLOR_INDEX.get(str(color).lower())
+        if idx is not None:
+            prefs[idx] = 1.0
+    return prefs
+
+
+def _score_template(
+    slots: List[np.ndarray],
+    item_colors: np.ndarray,
+    prefs: np.ndarray,
+    formality_fit: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score every combination of one item per slot.
+    Returns (combos [K, S] of item indexes, scores [K]).
+    """
+    grids = np.meshgrid(*slots, indexing="ij")
+    combos = np.stack([g.ravel() for g in grids], axis=1)
+    colors = item_colors[combos]  # [K, S]
+
+    pairs = list(combinations(range(combos.shape[1]), 2))
+    harmony = np.zeros(len(combos), dtype=np.float32)
+    for a, b in pairs:
+        harmony += COLOR_HARMONY[colors[:, a], colors[:, b]]
+    harmony /= max(len(pairs), 1)
+
+    preference = prefs[colors].mean(axis=1)
+    scores = W_HARMONY * harmony + W_PREFERENCE * preference + W_FORMALITY * formality_fit
+    return combos, scores
+
+
+# --------- 3. Public entry point --------- #
+
+def _title(product: DrawerProduct) -> str:
+    extra = product.model_extra or {}
+    return product.name or extra.get("title") or f"item {product.id}"
+
+
+def _describe(label: str, items: List[DrawerProduct], payload: StylistRequestPayload) -> str:
+    titles = ", ".join(_title(p) for p in items)
+    colors = sorted({(p.color or "other").lower() for p in items})
+    article = "An" if label[0].lower() in "aeiou" else "A"
+    parts = [f"{article} {label.lower()} built from your {titles}."]
+    if len(colors) == 1:
+        parts.append(f"The tonal {colors[0]} palette keeps it cohesive.")
+    else:
+        parts.append(f"{', '.join(colors[:-1]).capitalize()} and {colors[-1]} sit well together.")
+    if payload.occasion:
+        where = f" in {payload.location}" if payload.location else ""
+        parts.append(f"It suits {payload.occasion}{where}.")
+    info = payload.user_info
+    tips = [t for t in (_SKIN_TONE_TIPS.get(info.skin_tone or ""), _BODY_SHAPE_TIPS.get(info.body_shape or "")) if t]
+    if tips:
+        parts.append(f"Also, {' and '.join(tips)}.")
+    return " ".join(parts)
+
+
+def generate_outfits(payload: StylistRequestPayload, count: int = 5) -> AIRecommendations:
+    """
+    Build up to `count` complete outfits from payload.drawer_products.
+    Outfits share at most one item with each other and no template is used more
+    than twice, where the wardrobe allows it.
+    """
+    products = list(payload.drawer_products)
+    if not products:
+        return AIRecommendations(recommendations=[])
+
+    item_colors = np.array(
+        [COLOR_INDEX.get((p.color or "other").lower(), COLOR_INDEX["other"]) for p in products],
+        dtype=np.intp,
+    )
+    prefs = _preference_vector(payload.user_info.color_preferences)
+    item_pref = prefs[item_colors]
+    by_category: Dict[str, np.ndarray] = {}
+    for cat in {(p.category or "other").lower() for p in products}:
+        idx = np.array([i for i, p in enumerate(products) if (p.category or "other").lower() == cat], dtype=np.intp)
+        # keep the best-liked colors first, newest (higher id) breaks ties
+        order = np.lexsort((-np.array([products[i].id for i in idx]), -item_pref[idx]))
+        by_category[cat] = idx[order][:MAX_ITEMS_PER_SLOT]
+
+    target = occasion_formality(payload.occasion)
+    candidates: List[Tuple[float, str, Tuple[int, ...]]] = []
+    for label, cats, formality in OUTFIT_TEMPLATES:
+        if not all(c in by_category for c in cats):
+            continue
+        combos, scores = _score_template(
+            [by_category[c] for c in cats], item_colors, prefs, 1.0 - abs(formality - target)
+        )
+        top = np.argsort(-scores, kind="stable")[: count * 4]
+        candidates.extend((float(scores[k]), label, tuple(int(i) for i in combos[k])) for k in top)
+
+    # Wardrobe can't complete any template: pair up whatever is there
+    if not candidates:
+        ranked = sorted(range(len(products)), key=lambda i: (-item_pref[i], -products[i].id))
+        for n in range(0, len(ranked), 2):
+            candidates.append((0.0, "Simple Pairing", tuple(ranked[n:n + 2])))
+
+    candidates.sort(key=lambda c: -c[0])
+    chosen: List[Tuple[str, Tuple[int, ...]]] = []
+    for max_shared, per_label in ((1, 2), (1, None), (None, None)):  # prefer diverse outfits, then relax
+        for _, label, combo in candidates:
+            if len(chosen) >= count:
+                break
+            if any(combo == c for _, c in chosen):
+                continue
+            if max_shared is not None and any(len(set(combo) & set(c)) > max_shared for _, c in chosen):
+                continue
+            if per_label is not None and sum(1 for l, _ in chosen if l == label) >= per_label:
+                continue
+            chosen.append((label, combo))
+
+    recommendations = []
+    for n, (label, combo) in enumerate(chosen, start=1):
+        items = [products[i] for i in combo]
+        recommendations.append({
+            "name": f"{label} #{n}",
+            "description": _describe(label, items, payload),
+            "product_ids": [p.id for p in items],
+        })
+    return AIRecommendations(recommendations=recommendations)
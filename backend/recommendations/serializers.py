@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from .models import Outfit, Recommendation
+
 
 class DrawerProductSerializer(serializers.Serializer):
     id = serializers.IntegerField()
@@ -13,6 +16,7 @@ class RecommendRequestSerializer(serializers.Serializer):
     """
     Minimal payload from frontend.
     drawer_products is optional; if not provided we fetch from DB.
+    engine is optional; "rules" uses the offline rule engine instead of the LLM.
     """
     destination = serializers.CharField(max_length=100)
     occasion = serializers.CharField(max_length=50)
@@ -20,6 +24,42 @@ class RecommendRequestSerializer(serializers.Serializer):
     drawer_products = serializers.ListField(
         child=DrawerProductSerializer(), required=False, default=list
     )
+    engine = serializers.ChoiceField(choices=["llm", "rules"], required=False)
+
+
+class RecommendSlotSerializer(RecommendRequestSerializer):
+    """
+    One (occasion, datetime) slot of a batch.
+    destination and drawer_products are shared by the whole batch.
+    """
+    destination = None
+    drawer_products = None
+    engine = None
+
+
+class RecommendBatchRequestSerializer(serializers.Serializer):
+    """
+    Several slots (e.g. days of a trip) for one destination.
+    """
+    destination = serializers.CharField(max_length=100)
+    slots = serializers.ListField(
+        child=RecommendSlotSerializer(),
+        min_length=1,
+        max_length=getattr(settings, "RECOMMENDATION_BATCH_MAX_SLOTS", 14),
+    )
+    drawer_products = serializers.ListField(
+        child=DrawerProductSerializer(), required=False, default=list
+    )
+    engine = serializers.ChoiceField(choices=["llm", "rules"], required=False)
+
+
+class RecommendRefineRequestSerializer(serializers.Serializer):
+    """
+    A follow-up on the latest recommendation ("swap the shoes in outfit 2").
+    recommendation_id is optional; it refines a stored recommendation instead.
+    """
+    message = serializers.CharField(max_length=300)
+    recommendation_id = serializers.IntegerField(required=False, min_value=1)
 
 
 class RecommendItemSerializer(serializers.Serializer):
@@ -30,3 +70,31 @@ class RecommendItemSerializer(serializers.Serializer):
 
 class RecommendResponseSerializer(serializers.Serializer):
     recommendations = serializers.ListField(child=RecommendItemSerializer())
+
+
+class OutfitHistorySerializer(serializers.ModelSerializer):
+    """
+    Stored outfit. `missing_product_ids` lists wardrobe items deleted since it
+    was generated (context["missing_item_ids"], computed once per page).
+    """
+    missing_product_ids = serializers.SerializerMethodField()
+    is_complete = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Outfit
+        fields = ["position", "name", "description", "product_ids", "missing_product_ids", "is_complete"]
+
+    def get_missing_product_ids(self, obj):
+        missing = self.context.get("missing_item_ids") or set()
+        return [pid for pid in obj.product_ids if pid in missing]
+
+    def get_is_complete(self, obj):
+        return not self.get_missing_product_ids(obj)
+
+
+class RecommendationHistorySerializer(serializers.ModelSerializer):
+    outfits = OutfitHistorySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Recommendation
+        fields = ["id", "destination", "occasion", "event_datetime", "source", "model", "created_at", "outfits"]
@@ -1,17 +1,109 @@
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Union
+from typing import Callable, ContextManager, Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
 from django.shortcuts import get_object_or_404
 
 from accounts.models import User
 from client.models import ClientProfile
 
-from agents.style_agent import get_outfit_recommendations, StylistRequestPayload, AIRecommendations
+from agents.encoders import get_encoder
+from agents.metrics import STAGE_SECONDS
+from agents.style_agent import (
+    get_outfit_recommendations,
+    refine_outfit_recommendations,
+    stream_outfit_recommendations,
+    StylistRequestPayload,
+    AIRecommendations,
+)
 
+from .admission import AdmissionController, AdmissionRejected
+from .cache import RecommendationCache, payload_digest
+from .compatibility import CompatibilityGraph
+from .embeddings import WardrobeIndex
+from .gazetteer import resolve as resolve_destination
+from .history import HistoryEntry, pregenerated_answer, save_history
+from .models import Recommendation
+from .pruning import select_candidates
+from .refinement import RefinementStore, checkpoint_payload, known_ids_only, new_checkpoint
+from .resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, is_transient
+from .rule_engine import generate_outfits
+from .singleflight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+# Recommendation engines: the LangChain stylist agent or the offline rule engine
+ENGINE_LLM = "llm"
+ENGINE_RULES = "rules"
+ENGINES = (ENGINE_LLM, ENGINE_RULES)
 
 # Required profile fields for the AI
 REQUIRED_PROFILE_FIELDS = ("gender", "skin_tone", "face_shape", "body_shape")
 
+# Process-wide cache of AI results, keyed by payload digest
+recommendation_cache = RecommendationCache(
+    max_entries=getattr(settings, "RECOMMENDATION_CACHE_MAX_ENTRIES", 512),
+    ttl_seconds=getattr(settings, "RECOMMENDATION_CACHE_TTL", 900),
+)
+
+# Identical concurrent cache misses share one agent call (also across processes via Redis)
+recommendation_flight = SingleFlight(
+    "stylegenie:recommend",
+    timeout=getattr(settings, "RECOMMENDATION_SINGLEFLIGHT_TIMEOUT", 75),
+    reraise=(AdmissionRejected,),
+)
+
+# Per-user quota + global concurrency limit in front of every LLM call
+llm_admission = AdmissionController(
+    "stylegenie:llm",
+    max_concurrency=getattr(settings, "RECOMMENDATION_LLM_MAX_CONCURRENCY", 8),
+    queue_size=getattr(settings, "RECOMMENDATION_LLM_QUEUE_SIZE", 16),
+    wait_timeout=getattr(settings, "RECOMMENDATION_LLM_QUEUE_TIMEOUT", 10),
+    lease_seconds=getattr(settings, "RECOMMENDATION_LLM_LEASE_SECONDS", 120),
+    user_rate_per_minute=getattr(settings, "RECOMMENDATION_USER_RATE_PER_MINUTE", 6),
+    user_burst=getattr(settings, "RECOMMENDATION_USER_BURST", 5),
+)
+
+# Deadlines, retries, hedging and circuit breaker for the agent call
+llm_resilience = ResilientCaller(
+    CircuitBreaker(
+        "stylist-llm",
+        failure_threshold=getattr(settings, "RECOMMENDATION_BREAKER_FAILURES", 5),
+        reset_timeout=getattr(settings, "RECOMMENDATION_BREAKER_RESET", 30),
+    ),
+    attempt_timeout=getattr(settings, "STYLIST_LLM_TIMEOUT", 25),
+    deadline=getattr(settings, "RECOMMENDATION_LLM_DEADLINE", 60),
+    max_retries=getattr(settings, "RECOMMENDATION_LLM_MAX_RETRIES", 1),
+    backoff_base=getattr(settings, "RECOMMENDATION_LLM_BACKOFF_BASE", 0.5),
+    backoff_max=getattr(settings, "RECOMMENDATION_LLM_BACKOFF_MAX", 4),
+    hedge=getattr(settings, "RECOMMENDATION_LLM_HEDGE", False),
+    hedge_after=getattr(settings, "RECOMMENDATION_LLM_HEDGE_AFTER", 8),
+)
+
+# Latest refinable recommendation per user (bounded checkpoints, see refinement.py)
+refinement_sessions = RefinementStore(
+    "stylegenie:refine",
+    max_sessions=getattr(settings, "RECOMMENDATION_REFINE_MAX_SESSIONS", 1000),
+    idle_ttl=getattr(settings, "RECOMMENDATION_REFINE_TTL", 1800),
+    max_age=getattr(settings, "RECOMMENDATION_REFINE_MAX_AGE", 14400),
+    max_turns=getattr(settings, "RECOMMENDATION_REFINE_MAX_TURNS", 5),
+)
+
+# Per-user top-k compatible partners per item, kept in the DB (see compatibility.py)
+compatibility_graph = CompatibilityGraph(top_k=getattr(settings, "RECOMMENDATION_COMPAT_TOP_K", 8))
+
+# Per-user wardrobe vectors for similar items / duplicates (see embeddings.py)
+wardrobe_index = WardrobeIndex(
+    max_users=getattr(settings, "WARDROBE_INDEX_MAX_USERS", 256),
+    ttl_seconds=getattr(settings, "WARDROBE_INDEX_TTL", 300),
+)
+
 
 def _map_skin_tone(v: Optional[str]) -> Optional[str]:
     """Convert app skin tone values to what the AI expects."""
@@ -34,44 +126,63 @@ def _validate_profile(profile: ClientProfile) -> List[str]:
     return [f for f in REQUIRED_PROFILE_FIELDS if not getattr(profile, f, None)]
 
 
-def _fetch_drawer_products_from_db(user: User) -> List[Dict[str, Any]]:
+def _fetch_drawer_products_from_db(
+    user: User,
+    ids: Optional[Iterable[int]] = None,
+    skip_duplicates: bool = False,
+) -> List[Dict[str, Any]]:
     """
-    Query the user's wardrobe and map to what the AI expects.
+    Query the user's whole wardrobe (or just `ids`) and map to what the AI expects.
+    Which items reach the prompt is decided later by pruning.select_candidates.
+    skip_duplicates leaves out items marked as near-duplicates of a newer one
+    (ItemEmbedding.duplicate_of, maintained on save by recommendations/signals.py)
+    that still exists.
     """
     try:
         from client.models import WardrobeItem
     except Exception:
         return []
 
+    qs = WardrobeItem.objects.filter(user=user)
+    if ids is not None:
+        qs = qs.filter(id__in=list(ids))
+    if skip_duplicates:
+        # duplicate_of is a plain id: a mark left pointing at a deleted item is ignored
+        newer = WardrobeItem.objects.filter(pk=OuterRef("embedding__duplicate_of"))
+        qs = qs.filter(Q(embedding__duplicate_of__isnull=True) | ~Exists(newer))
     qs = (
-        WardrobeItem.objects.filter(user=user)
-        .only("id", "title", "color", "category", "description")
-        .order_by("-id")[:20]
+        qs.order_by("-id")
+        .values("id", "title", "color", "category", "description")
     )
 
     out: List[Dict[str, Any]] = []
     for i in qs:
         out.append({
-            "id": i.id,
-            "title": i.title,
-            "color": i.color,
-            "category": getattr(i, "category", "") or "",
-            "description": getattr(i, "description", "") or "",
+            "id": i["id"],
+            "title": i["title"],
+            "color": i["color"],
+            "category": i["category"] or "",
+            "description": i["description"] or "",
         })
     return out
 
 
-def recommend(
+class RecommendationContext(NamedTuple):
+    """DB-loaded inputs of a request, reusable across slots of a batch."""
+    user: User
+    profile: ClientProfile
+    drawer_products: List[Dict[str, Any]]
+    from_db: bool  # False when the client sent drawer_products (never pruned)
+
+
+def load_context(
     *,
     user_id: int,
-    destination: str,
-    occasion: str,
-    dt_iso: str,
     drawer_products_override: Optional[List[Dict[str, Any]]] = None,
-) -> Dict[str, Any]:
+) -> RecommendationContext:
     """
-    Build payload from stored profile (+ optional drawer override), call local stylist agent,
-    and return structured AIRecommendations.
+    Load user, profile and drawer products once (the DB part of a request).
+    Raises ValueError with a clean message when the profile/wardrobe isn't usable.
     """
     user = get_object_or_404(User, pk=user_id)
     profile = get_object_or_404(ClientProfile, user=user)
@@ -82,10 +193,35 @@ def recommend(
         raise ValueError(f"Missing required profile fields: {', '.join(missing)}")
 
     # 2) Get drawer products: prefer client override; else load from DB
-    drawer_products = (drawer_products_override or []) or _fetch_drawer_products_from_db(user)
+    # Near-duplicate items would only crowd out alternatives; the newest of each is kept
+    from_db = not drawer_products_override
+    drawer_products = (drawer_products_override or []) or _fetch_drawer_products_from_db(
+        user, skip_duplicates=getattr(settings, "RECOMMENDATION_DEDUPE_THRESHOLD", 0.95) > 0
+    )
     if not drawer_products:
         raise ValueError("You have no wardrobe items yet. Please add at least one item.")
 
+    return RecommendationContext(user, profile, drawer_products, from_db)
+
+
+def build_payload(
+    *,
+    user_id: int,
+    destination: str,
+    occasion: str,
+    dt_iso: str,
+    drawer_products_override: Optional[List[Dict[str, Any]]] = None,
+    context: Optional[RecommendationContext] = None,
+) -> Tuple[User, StylistRequestPayload]:
+    """
+    Build the agent payload from the stored profile (+ optional drawer override).
+    Pass a preloaded `context` (from load_context) to skip the DB entirely.
+    """
+    if context is None:
+        with STAGE_SECONDS.time(stage="load_context"):
+            context = load_context(user_id=user_id, drawer_products_override=drawer_products_override)
+    user, profile, drawer_products, from_db = context
+
     # 2.5) Parse datetime (optional / tolerant)
     dt_value: Optional[datetime] = None
     if dt_iso:
@@ -95,24 +231,455 @@ def recommend(
         except Exception:
             # If parsing fails, we just ignore and continue without datetime
             dt_value = None
-            
-    # 3) Build payload for your agent
-    payload: StylistRequestPayload = StylistRequestPayload(
-        user_info={
-            "gender": profile.gender,
-            "skin_tone": _map_skin_tone(profile.skin_tone),
-            "color_preferences": (getattr(profile, "style_preferences", {}) or {}).get("colors", []),
-            "face_shape": profile.face_shape,
-            "body_shape": profile.body_shape,
-        },
-        drawer_products=drawer_products,
-        location=destination,
+
+    # 2.55) Local time, season and climate at the destination (offline gazetteer)
+    with STAGE_SECONDS.time(stage="resolve_destination"):
+        conditions = resolve_destination(destination, dt_value)
+
+    # 2.6) Keep only the wardrobe items relevant to this occasion/season
+    color_preferences = (getattr(profile, "style_preferences", {}) or {}).get("colors", [])
+    if from_db:
+        partner_k = getattr(settings, "RECOMMENDATION_COMPAT_PARTNERS", 3)
+        with STAGE_SECONDS.time(stage="prune"):
+            drawer_products = select_candidates(
+                drawer_products,
+                occasion=occasion,
+                dt=dt_value,
+                season=conditions.season if conditions else None,
+                color_preferences=color_preferences,
+                token_budget=getattr(settings, "RECOMMENDATION_PROMPT_TOKEN_BUDGET", 1200),
+                token_cost=get_encoder().estimate_item_tokens,
+                partners=(lambda ids: compatibility_graph.partner_scores(ids, k=partner_k)) if partner_k > 0 else None,
+            )
+
+    # 3) Build payload for your agent (Pydantic validation happens here)
+    with STAGE_SECONDS.time(stage="build_payload"):
+        payload: StylistRequestPayload = StylistRequestPayload(
+            user_info={
+                "gender": profile.gender,
+                "skin_tone": _map_skin_tone(profile.skin_tone),
+                "color_preferences": color_preferences,
+                "face_shape": profile.face_shape,
+                "body_shape": profile.body_shape,
+            },
+            drawer_products=drawer_products,
+            location=destination,
+            occasion=occasion,
+            datetime=dt_value,
+            **(conditions.payload_fields() if conditions else {}),
+        )
+    return user, payload
+
+
+def recommend(
+    *,
+    user_id: int,
+    destination: str,
+    occasion: str,
+    dt_iso: str,
+    drawer_products_override: Optional[List[Dict[str, Any]]] = None,
+    context: Optional[RecommendationContext] = None,
+    engine: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build payload from stored profile (+ optional drawer override), call local stylist agent,
+    and return structured AIRecommendations.
+    engine: "llm" (default, settings.RECOMMENDATION_ENGINE) or "rules" for the offline engine.
+    Stage timings go to agents.metrics.STAGE_SECONDS.
+    Freshly generated answers are stored in history (see recommendations/history.py).
+    """
+    with STAGE_SECONDS.time(stage="recommend"):
+        payload, result, entry = _recommend(
+            user_id=user_id,
+            destination=destination,
+            occasion=occasion,
+            dt_iso=dt_iso,
+            drawer_products_override=drawer_products_override,
+            context=context,
+            engine=engine,
+        )
+        stored = []
+        if entry is not None:
+            with STAGE_SECONDS.time(stage="save_history"):
+                stored = save_history([entry])
+        start_refinement(user_id, payload, result, stored[0].pk if stored else None)
+    return result
+
+
+def _cached_answer(user_id: Any, cache_key: str) -> Optional[Dict[str, Any]]:
+    """The process cache, then answers pre-generated for an upcoming event (shared by all processes)."""
+    cached = recommendation_cache.get(cache_key)
+    if cached is None:
+        cached = pregenerated_answer(user_id, cache_key)
+        if cached is not None:
+            recommendation_cache.set(cache_key, copy.deepcopy(cached), user_id=user_id)
+    return cached
+
+
+def pregenerate(*, user_id: Any, destination: str, occasion: str, dt_iso: str) -> Recommendation:
+    """
+    Generate an agent answer ahead of time (appointments' scheduled job) and
+    return its stored Recommendation, which `_cached_answer` then serves once
+    an event links to it. No rule-engine fallback: failures raise so the job
+    retries later instead of pinning a fallback answer.
+    """
+    with STAGE_SECONDS.time(stage="recommend"):
+        payload, _, entry = _recommend(
+            user_id=user_id,
+            destination=destination,
+            occasion=occasion,
+            dt_iso=dt_iso,
+            drawer_products_override=None,
+            context=None,
+            engine=ENGINE_LLM,
+            fallback=False,
+        )
+        if entry is not None:
+            with STAGE_SECONDS.time(stage="save_history"):
+                stored = save_history([entry])
+            if stored:
+                return stored[0]
+    # Served from cache / an identical in-flight call: the answer is already in history
+    stored = (
+        Recommendation.objects.filter(user_id=user_id, request_digest=payload_digest(payload))
+        .order_by("-created_at")
+        .first()
+    )
+    if stored is None:
+        raise RuntimeError("The pre-generated answer could not be stored.")
+    return stored
+
+
+def _recommend(
+    *,
+    user_id: int,
+    destination: str,
+    occasion: str,
+    dt_iso: str,
+    drawer_products_override: Optional[List[Dict[str, Any]]],
+    context: Optional[RecommendationContext],
+    engine: Optional[str],
+    fallback: Optional[bool] = None,
+    admit: Optional[Callable[[], ContextManager[None]]] = None,
+) -> Tuple[StylistRequestPayload, Dict[str, Any], Optional[HistoryEntry]]:
+    """
+    recommend() without the history write: (payload, result, entry to store or None).
+    fallback: answer with the rule engine when the agent fails (default RECOMMENDATION_RULES_FALLBACK).
+    admit: admission for the agent call (default llm_admission.admit: one quota token per call).
+    """
+    engine = engine or getattr(settings, "RECOMMENDATION_ENGINE", ENGINE_LLM)
+    if fallback is None:
+        fallback = getattr(settings, "RECOMMENDATION_RULES_FALLBACK", True)
+    user, payload = build_payload(
+        user_id=user_id,
+        destination=destination,
         occasion=occasion,
-        datetime=dt_value,
+        dt_iso=dt_iso,
+        drawer_products_override=drawer_products_override,
+        context=context,
+    )
+
+    # 4) Offline rule engine: cheap enough to skip the cache
+    if engine == ENGINE_RULES:
+        with STAGE_SECONDS.time(stage="rule_engine"):
+            result = generate_outfits(payload).model_dump()
+        return payload, result, HistoryEntry(user.pk, payload, result, Recommendation.Source.RULES)
+
+    # 5) Serve identical requests from cache (already in history)
+    with STAGE_SECONDS.time(stage="cache_lookup"):
+        cache_key = payload_digest(payload)
+        cached = _cached_answer(user.pk, cache_key)
+    if cached is not None:
+        return payload, copy.deepcopy(cached), None
+
+    # 6) Call your local LangChain agent, once per identical in-flight request and
+    #    only when admitted (AdmissionRejected propagates -> 429), with deadlines,
+    #    retries and the circuit breaker; fall back to the rule engine if it fails
+    usage: Dict[str, Any] = {}
+
+    def call_agent() -> Dict[str, Any]:
+        structured_result: AIRecommendations = llm_resilience.call(
+            lambda: get_outfit_recommendations(payload, thread_id=f"user-{user.pk}", usage=usage),
+            admit=admit() if admit is not None else llm_admission.admit(user.pk),
+            extra_slot=llm_admission.try_slot,
+        )
+        return structured_result.model_dump()
+
+    try:
+        result, shared = recommendation_flight.do(cache_key, call_agent)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        if not fallback:
+            raise
+        if isinstance(e, CircuitOpenError):
+            logger.info("Stylist circuit open; using rule-based fallback")
+        else:
+            logger.warning("Stylist agent failed; using rule-based fallback", exc_info=True)
+        with STAGE_SECONDS.time(stage="rule_engine"):
+            result = generate_outfits(payload).model_dump()
+        entry = HistoryEntry(user.pk, payload, result, Recommendation.Source.FALLBACK, request_digest=cache_key)
+        return payload, result, entry
+
+    # 7) Return the structured dict (instead of hitting API); the leader caches + stores it
+    if shared:
+        return payload, copy.deepcopy(result), None
+    recommendation_cache.set(cache_key, copy.deepcopy(result), user_id=user.pk)
+    entry = HistoryEntry(
+        user.pk, payload, result, Recommendation.Source.LLM, model=usage.get("model", ""), request_digest=cache_key
+    )
+    return payload, result, entry
+
+
+def recommend_batch(
+    *,
+    user_id: int,
+    destination: str,
+    slots: List[Dict[str, str]],
+    drawer_products_override: Optional[List[Dict[str, Any]]] = None,
+    engine: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Recommend for several (occasion, dt_iso) slots at one destination.
+
+    Profile + wardrobe are loaded once; slots then run concurrently through
+    `_recommend()` and spend one quota token between them. `_recommend()` still
+    reads the DB per slot (compatibility partners, pre-generated answers), so
+    each worker thread closes its connections when its slot is done. A failing
+    slot is reported as {"status": "failed", "detail": ...} and never fails
+    the whole batch.
+    Profile/wardrobe problems still raise ValueError for the batch.
+    New answers of all slots are stored in history with one bulk insert.
+    """
+    context = load_context(user_id=user_id, drawer_products_override=drawer_products_override)
+    entries: List[Optional[HistoryEntry]] = [None] * len(slots)
+    admit = llm_admission.batch(user_id)
+
+    def run(index: int, slot: Dict[str, str]) -> Dict[str, Any]:
+        out = {"occasion": slot["occasion"], "datetime": slot["dt_iso"]}
+        try:
+            with STAGE_SECONDS.time(stage="recommend"):
+                _, out["result"], entries[index] = _recommend(
+                    user_id=user_id,
+                    destination=destination,
+                    occasion=slot["occasion"],
+                    dt_iso=slot["dt_iso"],
+                    drawer_products_override=None,
+                    context=context,
+                    engine=engine,
+                    admit=admit,
+                )
+            out["status"] = "complete"
+        except (ValueError, AdmissionRejected) as e:
+            out.update(status="failed", detail=str(e))
+        except Exception:
+            logger.exception("Batch recommendation slot failed")
+            out.update(status="failed", detail="Recommendation failed for this slot.")
+        finally:
+            # Connections opened in this pool thread are never closed by the request cycle
+            connections.close_all()
+        return out
+
+    workers = max(1, min(len(slots), getattr(settings, "RECOMMENDATION_BATCH_CONCURRENCY", 4)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, range(len(slots)), slots))
+
+    with STAGE_SECONDS.time(stage="save_history"):
+        save_history([e for e in entries if e is not None])
+    return results
+
+
+def _stream_rule_outfits(
+    user: User,
+    payload: StylistRequestPayload,
+    source: str,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    result = generate_outfits(payload).model_dump()
+    for outfit in result["recommendations"]:
+        yield "recommendation", outfit
+    stored = save_history([HistoryEntry(user.pk, payload, result, source)])
+    start_refinement(user.pk, payload, result, stored[0].pk if stored else None)
+    yield "summary", {"count": len(result["recommendations"]), "cached": False}
+
+
+def stream_recommendations(
+    user: User,
+    payload: StylistRequestPayload,
+    engine: Optional[str] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield ("recommendation", outfit) events as the model finishes each outfit,
+    then a single ("summary", {...}) event. A cache hit replays the stored outfits.
+    The complete answer is cached so the regular endpoint can reuse it, and
+    stored in history once the stream finishes.
+    """
+    engine = engine or getattr(settings, "RECOMMENDATION_ENGINE", ENGINE_LLM)
+    if engine == ENGINE_RULES:
+        yield from _stream_rule_outfits(user, payload, Recommendation.Source.RULES)
+        return
+
+    cache_key = payload_digest(payload)
+    cached = _cached_answer(user.pk, cache_key)
+    if cached is not None:
+        for item in cached["recommendations"]:
+            yield "recommendation", copy.deepcopy(item)
+        start_refinement(user.pk, payload, copy.deepcopy(cached))
+        yield "summary", {"count": len(cached["recommendations"]), "cached": True}
+        return
+
+    # Streams can't be retried or hedged once outfits are out; the breaker still applies
+    breaker = llm_resilience.breaker
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        if not getattr(settings, "RECOMMENDATION_RULES_FALLBACK", True):
+            raise
+        yield from _stream_rule_outfits(user, payload, Recommendation.Source.FALLBACK)
+        return
+
+    outfits: List[Dict[str, Any]] = []
+    usage: Dict[str, Any] = {}
+    recorded = False
+    try:
+        with llm_admission.admit(user.pk):
+            for item in stream_outfit_recommendations(payload, usage=usage):
+                outfit = item.model_dump()
+                outfits.append(outfit)
+                yield "recommendation", copy.deepcopy(outfit)
+    except AdmissionRejected:
+        recorded = True
+        breaker.cancel_probe()
+        raise
+    except Exception as e:
+        recorded = True
+        if is_transient(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        # Also reached on GeneratorExit (the client went away mid-stream): the
+        # outfits already sent show the provider is answering
+        if not recorded:
+            breaker.record_success()
+
+    result = {"recommendations": outfits}
+    recommendation_cache.set(cache_key, result, user_id=user.pk)
+    stored = save_history([HistoryEntry(
+        user.pk, payload, result, Recommendation.Source.LLM, model=usage.get("model", ""), request_digest=cache_key
+    )])
+    start_refinement(user.pk, payload, copy.deepcopy(result), stored[0].pk if stored else None)
+    yield "summary", {"count": len(outfits), "cached": False}
+
+
+# --------- Conversational refinement --------- #
+
+def start_refinement(
+    user_id: Any,
+    payload: StylistRequestPayload,
+    result: Dict[str, Any],
+    recommendation_id: Optional[int] = None,
+) -> None:
+    """Make `result` the user's refinable recommendation (replaces the previous checkpoint)."""
+    with STAGE_SECONDS.time(stage="checkpoint"):
+        refinement_sessions.save(user_id, new_checkpoint(
+            payload,
+            result,
+            recommendation_id=recommendation_id,
+            alternates_budget=getattr(settings, "RECOMMENDATION_REFINE_TOKEN_BUDGET", 400),
+            token_cost=get_encoder("compact").estimate_item_tokens,
+        ))
+
+
+def _checkpoint_from_history(user: User, recommendation_id: int) -> Dict[str, Any]:
+    """Rebuild a checkpoint from a stored recommendation (e.g. after the live one expired)."""
+    stored = get_object_or_404(Recommendation.objects.prefetch_related("outfits"), pk=recommendation_id, user=user)
+    context = stored.context or {}
+    items = _fetch_drawer_products_from_db(user, ids=context.get("drawer_product_ids") or [])
+    if not items:
+        raise ValueError("The items of this recommendation are no longer in your wardrobe.")
+    conditions = resolve_destination(stored.destination, stored.event_datetime)
+    payload = StylistRequestPayload(
+        user_info=context["user_info"],
+        drawer_products=items,
+        location=stored.destination,
+        occasion=stored.occasion,
+        datetime=stored.event_datetime,
+        **(conditions.payload_fields() if conditions else {}),
     )
+    previous = {"recommendations": [
+        {"name": o.name, "description": o.description, "product_ids": o.product_ids}
+        for o in stored.outfits.all()
+    ]}
+    return new_checkpoint(
+        payload,
+        known_ids_only(previous, items),
+        recommendation_id=stored.pk,
+        alternates_budget=getattr(settings, "RECOMMENDATION_REFINE_TOKEN_BUDGET", 400),
+        token_cost=get_encoder("compact").estimate_item_tokens,
+    )
+
+
+def refine(
+    *,
+    user_id: int,
+    message: str,
+    recommendation_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Apply a follow-up ("swap the shoes in outfit 2", "warmer please") to the
+    user's latest recommendation, or to `recommendation_id` from history.
+
+    Only the change request, the previous structured result and the small
+    checkpoint payload reach the model, never the full wardrobe again.
+    Goes through the same admission control and resilience as recommend();
+    there is no rule-engine fallback, since rules can't follow free text.
+    Returns {"recommendations": [...], "refinement": {"recommendation_id", "turns"}}.
+    """
+    with STAGE_SECONDS.time(stage="refine"):
+        user = get_object_or_404(User, pk=user_id)
 
-    # 4) Call your local LangChain agent
-    structured_result: AIRecommendations = get_outfit_recommendations(payload)
+        # 1) The conversation to continue: live checkpoint, or one rebuilt from history
+        checkpoint = refinement_sessions.get(user.pk)
+        if recommendation_id is not None and (checkpoint is None or checkpoint["recommendation_id"] != recommendation_id):
+            checkpoint = _checkpoint_from_history(user, recommendation_id)
+        if checkpoint is None:
+            raise ValueError("There is nothing to refine yet. Please generate recommendations first.")
+        payload = checkpoint_payload(checkpoint)
 
-    # 5) Return the structured dict (instead of hitting API)
-    return structured_result.model_dump()
+        # 2) Delta turn to the agent
+        usage: Dict[str, Any] = {}
+        structured: AIRecommendations = llm_resilience.call(
+            lambda: refine_outfit_recommendations(
+                payload,
+                checkpoint["result"],
+                message,
+                earlier_requests=checkpoint["turns"],
+                thread_id=f"user-{user.pk}",
+                usage=usage,
+            ),
+            admit=llm_admission.admit(user.pk),
+            extra_slot=llm_admission.try_slot,
+        )
+        result = known_ids_only(structured.model_dump(), checkpoint["items"])
+        if not result["recommendations"]:
+            raise ValueError("AI returned an invalid response. Please try again.")
+
+        # 3) Store it and move the checkpoint forward
+        with STAGE_SECONDS.time(stage="save_history"):
+            stored = save_history([HistoryEntry(
+                user.pk,
+                payload,
+                result,
+                Recommendation.Source.LLM,
+                model=usage.get("model", ""),
+                refinement={"message": message, "parent_id": checkpoint["recommendation_id"]},
+            )])
+        checkpoint = refinement_sessions.record_turn(
+            user.pk, checkpoint, message, copy.deepcopy(result), stored[0].pk if stored else None
+        )
+
+    return {
+        **result,
+        "refinement": {"recommendation_id": checkpoint["recommendation_id"], "turns": len(checkpoint["turns"])},
+    }
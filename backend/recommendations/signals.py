@@ -0,0 +1,84 @@
+"""
+recommendations/signals.py
+
+Keep derived recommendation data in sync with the user's wardrobe and profile.
+
+Design:
+- Any WardrobeItem save/delete or ClientProfile save drops the user's cached
+  AI results, so the next request sees the new wardrobe/profile, and their
+  refinement checkpoint, which may reference changed or deleted items.
+- A WardrobeItem save re-embeds that one item (one upsert) and patches the
+  cached index row; a delete removes the row (the stored vector cascades).
+- The same events update the compatibility graph incrementally: only the
+  partner lists the item belongs (or belonged) in are re-ranked.
+- They also keep the near-duplicate marks prompts are filtered by
+  (RECOMMENDATION_DEDUPE_THRESHOLD): only items similar to, or marked with, the
+  changed item are rescored, so recommendations never scan for duplicates.
+- Bulk writes (client/bulk.py) skip the per-row handlers and send one
+  `wardrobe_bulk_changed`: one cache drop, one embedding upsert for all saved
+  items (the cached index is reloaded lazily) and one graph refresh per batch.
+"""
+
+# --- Django core ---
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+# --- Local apps ---
+from client.models import ClientProfile, WardrobeItem
+from client.signals import bulk_write_in_progress, wardrobe_bulk_changed
+from recommendations.embeddings import store_embedding, store_embeddings
+from recommendations.services import compatibility_graph, recommendation_cache, refinement_sessions, wardrobe_index
+
+
+def _mark_duplicates(user_id, changed_ids) -> None:
+    threshold = getattr(settings, "RECOMMENDATION_DEDUPE_THRESHOLD", 0.95)
+    if threshold > 0:
+        wardrobe_index.mark_duplicates(user_id, threshold, changed_ids)
+
+
+@receiver(post_save, sender=WardrobeItem)
+@receiver(post_delete, sender=WardrobeItem)
+def invalidate_on_wardrobe_change(sender, instance: WardrobeItem, **kwargs):
+    if bulk_write_in_progress():
+        return
+    recommendation_cache.invalidate_user(instance.user_id)
+    refinement_sessions.drop(instance.user_id)
+
+
+@receiver(post_save, sender=WardrobeItem)
+def index_wardrobe_item(sender, instance: WardrobeItem, **kwargs):
+    wardrobe_index.upsert(instance.user_id, instance.pk, store_embedding(instance))
+    compatibility_graph.refresh(instance.user_id, saved=[(instance.pk, instance.category)])
+    _mark_duplicates(instance.user_id, [instance.pk])
+
+
+@receiver(post_delete, sender=WardrobeItem)
+def unindex_wardrobe_item(sender, instance: WardrobeItem, **kwargs):
+    if bulk_write_in_progress():
+        return
+    wardrobe_index.remove(instance.user_id, instance.pk)
+    compatibility_graph.refresh(instance.user_id, removed_categories=[instance.category])
+    _mark_duplicates(instance.user_id, [instance.pk])
+
+
+@receiver(wardrobe_bulk_changed)
+def refresh_after_bulk_change(sender, user_id, items, deleted, **kwargs):
+    recommendation_cache.invalidate_user(user_id)
+    refinement_sessions.drop(user_id)
+    if items:
+        store_embeddings(items)
+    wardrobe_index.invalidate_user(user_id)
+    compatibility_graph.refresh(
+        user_id,
+        saved=[(item.pk, item.category) for item in items],
+        removed_categories={category for _, category in deleted},
+    )
+    _mark_duplicates(user_id, [item.pk for item in items] + [item_id for item_id, _ in deleted])
+
+
+@receiver(post_save, sender=ClientProfile)
+@receiver(post_delete, sender=ClientProfile)
+def invalidate_on_profile_change(sender, instance: ClientProfile, **kwargs):
+    recommendation_cache.invalidate_user(instance.user_id)
+    refinement_sessions.drop(instance.user_id)
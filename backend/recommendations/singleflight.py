@@ -0,0 +1,218 @@
+"""
+recommendations/singleflight.py
+
+Coalesce identical, concurrent recommendation calls into one LLM call.
+
+Design:
+- Calls are keyed by the payload digest (the same key as the result cache).
+- In-process: the first caller (leader) runs the function; callers arriving
+  with the same key while it runs (followers) wait on its threading.Event and
+  share its result or its failure.
+- Across processes: the leader also holds a Redis lock for the key and
+  publishes the outcome under a short-lived result key; followers in other
+  processes poll for it. The lock has a short TTL (`lock_ttl`) that the
+  leader keeps renewing while it runs, however long that takes (admission
+  queue wait included), so only a dead leader loses it; the next follower to
+  grab it then becomes the leader.
+- Without Redis (REDIS_URL empty or unreachable) coalescing is per-process.
+- Nobody waits longer than `timeout`: a follower that times out runs the
+  function itself.
+- Followers of a failed leader get LeaderFailed, except for the exception
+  types in `reraise`, which they get as-is (e.g. AdmissionRejected -> 429),
+  in this process and in others. Those types must be rebuildable as
+  `cls(**vars(exc))`.
+- Leader/coalesced counters are exposed via `stats()`.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from common.redis_client import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderFailed(RuntimeError):
+    """The identical call this caller waited on failed."""
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run a function at most once per key among concurrent callers."""
+
+    # Seconds a published result stays readable by late followers
+    RESULT_TTL = 30
+    # Failures are published only long enough to release current followers
+    FAILURE_TTL_MS = 2000
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        timeout: float = 60.0,
+        poll_interval: float = 0.05,
+        redis_factory: Callable[[], Any] = get_redis_client,
+        reraise: Tuple[Type[BaseException], ...] = (),
+        lock_ttl: float = 10.0,
+    ):
+        self.namespace = namespace
+        self.reraise = reraise
+        self.lock_ttl = lock_ttl
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._redis_factory = redis_factory
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced_local = 0
+        self.coalesced_remote = 0
+        self.wait_timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Return (value, shared). `shared` is True when the value came from
+        another caller's run; treat it as read-only (copy before mutating).
+        Followers of a failed leader get LeaderFailed.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced_local += 1
+
+        if not is_leader:
+            if not call.done.wait(self.timeout):
+                self._count("wait_timeouts")
+                return fn(), False
+            if isinstance(call.error, self.reraise):
+                raise call.error
+            if call.error is not None:
+                raise LeaderFailed("Identical in-flight request failed") from call.error
+            return call.value, True
+
+        try:
+            call.value, shared = self._run_across_processes(key, fn)
+            return call.value, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced_local + self.coalesced_remote,
+                "coalesced_local": self.coalesced_local,
+                "coalesced_remote": self.coalesced_remote,
+                "wait_timeouts": self.wait_timeouts,
+                "in_flight": len(self._calls),
+            }
+
+    # --------- internals --------- #
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _run(self, fn: Callable[[], Any]) -> Any:
+        self._count("leaders")
+        return fn()
+
+    def _run_across_processes(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        from redis.exceptions import LockError, RedisError
+
+        client = self._redis_factory()
+        if client is None:
+            return self._run(fn), False
+
+        result_key = f"{self.namespace}:result:{key}"
+        lock = client.lock(f"{self.namespace}:lock:{key}", timeout=self.lock_ttl, blocking=False)
+        deadline = time.monotonic() + self.timeout
+        try:
+            # 1) Another process already finished (or is running) this call?
+            while True:
+                raw = client.get(result_key)
+                if raw is not None:
+                    self._count("coalesced_remote")
+                    outcome = json.loads(raw)
+                    if not outcome["ok"]:
+                        raise self._remote_error(outcome)
+                    return outcome["value"], True
+                if lock.acquire(blocking=False):
+                    break
+                if time.monotonic() >= deadline:
+                    self._count("wait_timeouts")
+                    return self._run(fn), False
+                time.sleep(self.poll_interval)
+        except RedisError:
+            logger.warning("Redis unavailable for request coalescing; running locally", exc_info=True)
+            return self._run(fn), False
+
+        # 2) We hold the lock: run it and publish the outcome for other processes
+        stop_renewing = self._keep_lock(lock)
+        try:
+            try:
+                value = self._run(fn)
+            except Exception as e:
+                outcome: Dict[str, Any] = {"ok": False}
+                if isinstance(e, self.reraise):
+                    outcome.update(error=type(e).__name__, detail=vars(e))
+                self._publish(client, result_key, outcome, px=self.FAILURE_TTL_MS)
+                raise
+            self._publish(client, result_key, {"ok": True, "value": value}, ex=self.RESULT_TTL)
+            return value, False
+        finally:
+            stop_renewing.set()
+            try:
+                lock.release()
+            except (LockError, RedisError):
+                pass  # expired or Redis gone; the lock times out on its own
+
+    def _keep_lock(self, lock) -> threading.Event:
+        """Renew `lock` every third of its TTL until the returned event is set."""
+        from redis.exceptions import LockError, RedisError
+
+        stop = threading.Event()
+
+        def renew() -> None:
+            while not stop.wait(self.lock_ttl / 3):
+                try:
+                    lock.extend(self.lock_ttl, replace_ttl=True)
+                except (LockError, RedisError):
+                    logger.warning("Could not renew coalescing lock", exc_info=True)
+                    return
+
+        threading.Thread(target=renew, name="singleflight-lock", daemon=True).start()
+        return stop
+
+    def _remote_error(self, outcome: Dict[str, Any]) -> BaseException:
+        for cls in self.reraise:
+            if cls.__name__ == outcome.get("error"):
+                return cls(**outcome["detail"])
+        return LeaderFailed("Identical in-flight request failed in another worker")
+
+    def _publish(self, client, result_key: str, outcome: Dict[str, Any], **expiry) -> None:
+        from redis.exceptions import RedisError
+
+        try:
+            client.set(result_key, json.dumps(outcome, default=str), **expiry)
+        except (RedisError, TypeError, ValueError):
+            logger.warning("Could not publish coalesced result", exc_info=True)
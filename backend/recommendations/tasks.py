@@ -0,0 +1,58 @@
+from typing import Any, Dict, List, Optional
+
+from celery import shared_task
+from celery.signals import worker_process_init
+from django.http import Http404
+
+from agents.style_agent import warm_up
+
+from .admission import AdmissionRejected
+from .serializers import RecommendResponseSerializer
+from .services import recommend
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    """Build the stylist backend in each Celery worker process after fork."""
+    warm_up()
+
+
+@shared_task(bind=True, name="recommendations.generate_recommendations", max_retries=5)
+def generate_recommendations_task(
+    self,
+    user_id: str,
+    destination: str,
+    occasion: str,
+    dt_iso: str,
+    drawer_products_override: Optional[List[Dict[str, Any]]] = None,
+    engine: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run `recommend()` in a worker so web requests don't wait on the LLM.
+
+    Business errors (incomplete profile, empty wardrobe) are returned as a
+    "failed" result instead of raised, so the status endpoint can show the
+    same clean message the synchronous endpoint would.
+    Ownership is recorded by the view (RecommendationJob) before queueing.
+    Calls rejected by admission control are retried after their Retry-After.
+    """
+    try:
+        result = recommend(
+            user_id=user_id,
+            destination=destination,
+            occasion=occasion,
+            dt_iso=dt_iso,
+            drawer_products_override=drawer_products_override,
+            engine=engine,
+        )
+    except (ValueError, Http404) as e:
+        return {"user_id": user_id, "status": "failed", "detail": str(e) or "Not found."}
+    except AdmissionRejected as e:
+        if self.request.retries >= self.max_retries:
+            return {"user_id": user_id, "status": "failed", "detail": str(e)}
+        raise self.retry(countdown=e.retry_after)
+
+    # Validate outgoing contract (defensive), same as RecommendView
+    out = RecommendResponseSerializer(data=result)
+    out.is_valid(raise_exception=True)
+    return {"user_id": user_id, "status": "complete", "result": out.data}
@@ -1,3 +1,1221 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from agents import style_agent
+from agents.backends import BACKENDS, FakeBackend, FakeBackendError, register_backend
+from agents.encoders import estimate_tokens, get_encoder
+from agents.stream_parser import RecommendationStreamParser
+from agents.stylist_types import AIRecommendations, StylistRequestPayload
+from client.bulk import delete_items, import_items, update_items
+from client.models import ClientProfile, WardrobeItem
+from recommendations import gazetteer, services, signals, views
+from recommendations.admission import AdmissionController, AdmissionRejected
+from recommendations.cache import RecommendationCache, payload_digest
+from recommendations.embeddings import WardrobeIndex
+from recommendations.history import HistoryEntry, save_history
+from recommendations.models import ItemCompatibility, ItemEmbedding, Recommendation, RecommendationJob
+from recommendations.pruning import season_for, select_candidates
+from recommendations.refinement import RefinementStore, new_checkpoint
+from recommendations.resilience import AttemptTimeout, CircuitBreaker, CircuitOpenError, ResilientCaller
+from recommendations.rule_engine import generate_outfits
+from recommendations.services import (
+    build_payload, compatibility_graph, load_context, recommend, recommend_batch, recommendation_cache, refine,
+    refinement_sessions, wardrobe_index,
+)
+from recommendations.singleflight import LeaderFailed, SingleFlight
+
+User = get_user_model()
+
+
+def make_client(email="client@example.com"):
+    """A client with a complete profile (what the recommendation endpoints require)."""
+    user = User.objects.create_user(email=email, username=email.split("@")[0], password="pw-123456!")
+    ClientProfile.objects.filter(user=user).update(gender="female", skin_tone="medium", body_shape="pear", face_shape="oval")
+    return user
+
+
+def add_item(user, title, category="top", color="black", description=""):
+    return WardrobeItem.objects.create(
+        user=user, image_url="https://example.com/item.jpg", title=title,
+        category=category, color=color, description=description,
+    )
+
+
+# =========================
+# Embeddings and near-duplicates
+# =========================
+class NearDuplicateTests(TestCase):
+    """Near-duplicate marks are kept on the write path; recommendations only filter by them."""
+
+    def setUp(self):
+        self.user = make_client()
+
+    def marks(self):
+        return dict(ItemEmbedding.objects.filter(user=self.user).values_list("item_id", "duplicate_of"))
+
+    def test_save_marks_the_older_copy(self):
+        old = add_item(self.user, "Black cotton tee")
+        new = add_item(self.user, "Black cotton tee")
+        boots = add_item(self.user, "Leather boots", category="footwear", color="brown")
+        self.assertEqual(self.marks(), {old.pk: new.pk, new.pk: None, boots.pk: None})
+
+    def test_edit_and_delete_clear_marks(self):
+        old = add_item(self.user, "Black cotton tee")
+        new = add_item(self.user, "Black cotton tee")
+        new.title, new.category, new.color = "Red silk scarf", "accessory", "red"
+        new.save()
+        self.assertIsNone(self.marks()[old.pk])
+
+        again = add_item(self.user, "Black cotton tee")
+        self.assertEqual(self.marks()[old.pk], again.pk)
+        again.delete()
+        self.assertIsNone(self.marks()[old.pk])
+
+    def test_stale_index_of_another_worker_cannot_hide_an_item(self):
+        worker_a, worker_b = WardrobeIndex(), WardrobeIndex()
+        with mock.patch.object(signals, "wardrobe_index", worker_a):
+            tee = add_item(self.user, "Black cotton tee")
+            copy = add_item(self.user, "Black cotton tee")
+        self.assertEqual(self.marks(), {tee.pk: copy.pk, copy.pk: None})
+        worker_a.vectors(self.user.pk)  # worker A caches both items
+
+        with mock.patch.object(signals, "wardrobe_index", worker_b):
+            copy.delete()
+        self.assertEqual(self.marks(), {tee.pk: None})
+        with mock.patch.object(signals, "wardrobe_index", worker_a):
+            tee.image_url = "https://example.com/new-photo.jpg"
+            tee.save()
+        self.assertEqual(self.marks(), {tee.pk: None})
+        self.assertEqual([p["id"] for p in load_context(user_id=self.user.pk).drawer_products], [tee.pk])
+
+    def test_marks_of_deleted_items_hide_nothing(self):
+        tee = add_item(self.user, "Black cotton tee")
+        ItemEmbedding.objects.filter(item=tee).update(duplicate_of=10 ** 9)
+        self.assertEqual([p["id"] for p in load_context(user_id=self.user.pk).drawer_products], [tee.pk])
+
+    def test_bulk_import_marks_once_per_batch(self):
+        rows = [
+            {"image_url": "https://example.com/a.jpg", "title": "Navy chinos", "category": "bottom", "color": "blue"},
+            {"image_url": "https://example.com/b.jpg", "title": "Navy chinos", "category": "bottom", "color": "blue"},
+        ]
+        items, errors = import_items(self.user, rows)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.marks(), {items[0].pk: items[1].pk, items[1].pk: None})
+
+    def test_recommendation_context_skips_marked_items_without_scanning(self):
+        old = add_item(self.user, "Black cotton tee")
+        add_item(self.user, "Black cotton tee")
+        add_item(self.user, "Leather boots", category="footwear", color="brown")
+        with mock.patch.object(wardrobe_index, "vectors", side_effect=AssertionError("index loaded")), \
+                self.assertNumQueries(3):  # user, profile, wardrobe
+            context = load_context(user_id=self.user.pk)
+        ids = [product["id"] for product in context.drawer_products]
+        self.assertEqual(len(ids), 2)
+        self.assertNotIn(old.pk, ids)
+
+    def test_similar_items_and_duplicate_report(self):
+        tee = add_item(self.user, "Black cotton tee", description="crew neck")
+        copy = add_item(self.user, "Black cotton tee", description="crew neck")
+        polo = add_item(self.user, "Black cotton polo")
+        add_item(self.user, "Leather boots", category="footwear", color="brown")
+        api = APIClient()
+        api.force_authenticate(self.user)
+
+        response = api.get(f"/client/wardrobe/{tee.pk}/similar/?k=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["item"]["id"] for r in response.data["results"]], [copy.pk, polo.pk])
+        self.assertAlmostEqual(response.data["results"][0]["score"], 1.0, places=3)
+
+        response = api.get("/client/wardrobe/duplicates/?threshold=0.99")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([[i["id"] for i in g["items"]] for g in response.data["groups"]], [[tee.pk, copy.pk]])
+
+
+# =========================
+# Compatibility graph
+# =========================
+class CompatibilityGraphTests(TestCase):
+    """Incremental maintenance must leave exactly the graph a full rebuild produces."""
+
+    CATEGORIES = ("top", "bottom", "footwear", "outerwear", "dress", "suit", "accessory")
+    COLORS = ("black", "white", "blue", "red", "beige", "brown", "green")
+
+    def setUp(self):
+        self.user = make_client()
+        self.rng = random.Random(7)
+
+    def edges(self):
+        return set(
+            ItemCompatibility.objects.filter(user=self.user)
+            .values_list("item_id", "other_id", "other_category", "rank", "score")
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.edges()
+        compatibility_graph.rebuild_user(self.user.pk)
+        self.assertEqual(incremental, self.edges())
+
+    def random_row(self):
+        return {
+            "image_url": "https://example.com/x.jpg", "title": "Item",
+            "category": self.rng.choice(self.CATEGORIES), "color": self.rng.choice(self.COLORS),
+        }
+
+    def test_saves_and_deletes_match_rebuild(self):
+        items = [add_item(self.user, "Item", self.rng.choice(self.CATEGORIES), self.rng.choice(self.COLORS)) for _ in range(25)]
+        self.assertMatchesRebuild()
+        for step in range(30):
+            roll = self.rng.random()
+            if roll < 0.4 or len(items) < 5:
+                items.append(add_item(self.user, "Item", self.rng.choice(self.CATEGORIES), self.rng.choice(self.COLORS)))
+            elif roll < 0.75:
+                item = self.rng.choice(items)
+                item.category, item.color = self.rng.choice(self.CATEGORIES), self.rng.choice(self.COLORS)
+                item.save()
+            else:
+                victim = self.rng.choice(items)
+                items.remove(victim)
+                victim.delete()
+        self.assertMatchesRebuild()
+
+    def test_bulk_changes_match_rebuild(self):
+        created, _ = import_items(self.user, [self.random_row() for _ in range(30)])
+        self.assertMatchesRebuild()
+        update_items(self.user, [
+            {"id": item.pk, "category": self.rng.choice(self.CATEGORIES), "color": self.rng.choice(self.COLORS)}
+            for item in self.rng.sample(created, 10)
+        ])
+        self.assertMatchesRebuild()
+        delete_items(self.user, [item.pk for item in self.rng.sample(created, 8)])
+        self.assertMatchesRebuild()
+
+
+# =========================
+# Batch recommendations
+# =========================
+class BatchRecommendationTests(TransactionTestCase):
+    """Slots run in pool threads (committed data: they use their own connections)."""
+
+    def setUp(self):
+        self.user = make_client()
+        add_item(self.user, "White oxford shirt", "top", "white")
+        add_item(self.user, "Navy chinos", "bottom", "blue")
+        add_item(self.user, "Brown loafers", "footwear", "brown")
+
+    def test_slots_close_their_connections(self):
+        closed_in = []
+        close_all = connections.close_all
+
+        def spy():
+            closed_in.append(threading.current_thread())
+            close_all()
+
+        slots = [{"occasion": occasion, "dt_iso": "2030-05-01T10:00:00+00:00"} for occasion in ("office", "brunch", "wedding")]
+        with mock.patch.object(connections, "close_all", side_effect=spy):
+            results = recommend_batch(user_id=self.user.pk, destination="London", slots=slots, engine="rules")
+
+        self.assertEqual([r["status"] for r in results], ["complete"] * 3)
+        self.assertEqual(len(closed_in), 3)
+        self.assertNotIn(threading.main_thread(), closed_in)
+        self.assertEqual(Recommendation.objects.filter(user=self.user).count(), 3)
+
+    def test_batch_spends_one_quota_token(self):
+        admission = local_admission(max_concurrency=4, user_rate_per_minute=1, user_burst=1)
+        slots = [{"occasion": occasion, "dt_iso": "2030-05-01T10:00:00+00:00"} for occasion in ("office", "brunch", "gym")]
+        with mock.patch.object(services, "llm_admission", admission), \
+                mock.patch.object(services, "get_outfit_recommendations", side_effect=lambda payload, **kw: generate_outfits(payload)) as agent:
+            results = recommend_batch(user_id=self.user.pk, destination="London", slots=slots, engine="llm")
+        self.assertEqual([r["status"] for r in results], ["complete"] * 3)
+        self.assertEqual(agent.call_count, 3)
+        with self.assertRaises(AdmissionRejected):
+            admission.check_user_quota(self.user.pk)
+
+
+# =========================
+# Resilience
+# =========================
+def local_admission(**kwargs):
+    options = {"max_concurrency": 1, "queue_size": 0, "wait_timeout": 0.1, "user_rate_per_minute": 0}
+    options.update(kwargs)
+    return AdmissionController("test:llm", redis_factory=lambda: None, **options)
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class AdmissionControllerTests(TestCase):
+    def test_busy_rejection_refunds_the_token(self):
+        admission = local_admission(user_rate_per_minute=1, user_burst=2)
+        release = admission.try_slot()
+        with self.assertRaises(AdmissionRejected) as busy:
+            with admission.admit("u1"):
+                pass
+        self.assertEqual(busy.exception.reason, AdmissionRejected.BUSY)
+        release()
+
+        for _ in range(2):
+            with admission.admit("u1"):
+                pass
+        with self.assertRaises(AdmissionRejected) as quota:
+            with admission.admit("u1"):
+                pass
+        self.assertEqual(quota.exception.reason, AdmissionRejected.QUOTA)
+        self.assertGreaterEqual(quota.exception.retry_after, 1)
+
+    def test_batch_calls_share_one_token(self):
+        admission = local_admission(user_rate_per_minute=1, user_burst=1)
+        admit = admission.batch("u1")
+        for _ in range(3):
+            with admit():
+                pass
+        with self.assertRaises(AdmissionRejected):
+            admission.check_user_quota("u1")
+
+    def test_waiters_queue_up_to_queue_size(self):
+        admission = local_admission(queue_size=1, wait_timeout=2)
+        release = admission.try_slot()
+        admitted = threading.Event()
+
+        def waiter():
+            with admission.slot():
+                admitted.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        wait_until(lambda: admission._local.waiting == 1)
+        with self.assertRaises(AdmissionRejected):  # queue full
+            with admission.slot():
+                pass
+        self.assertFalse(admitted.is_set())
+        release()
+        thread.join()
+        self.assertTrue(admitted.is_set())
+
+
+class ResilientCallerTests(TestCase):
+    def caller(self, **kwargs):
+        options = {"attempt_timeout": 1.0, "deadline": 2.0, "backoff_base": 0, "backoff_max": 0}
+        options.update(kwargs)
+        return ResilientCaller(CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05), **options)
+
+    def test_retries_transient_errors_only(self):
+        caller = self.caller()
+        answers = iter([ConnectionError("reset"), "outfits"])
+
+        def flaky():
+            answer = next(answers)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        self.assertEqual(caller.call(flaky), "outfits")
+        bad = mock.Mock(side_effect=ValueError("bad request"))
+        with self.assertRaises(ValueError):
+            caller.call(bad)
+        self.assertEqual(bad.call_count, 1)
+        self.assertEqual(caller.breaker.stats()["state"], CircuitBreaker.CLOSED)
+
+    def test_passed_deadline_fails_without_calling(self):
+        fn = mock.Mock(return_value="outfits")
+        with self.assertRaises(AttemptTimeout):
+            self.caller(deadline=0).call(fn)
+        fn.assert_not_called()
+
+    def test_breaker_opens_then_one_probe_closes_it(self):
+        caller = self.caller(max_retries=0)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                caller.call(mock.Mock(side_effect=ConnectionError("down")))
+        fn = mock.Mock(return_value="outfits")
+        with self.assertRaises(CircuitOpenError):
+            caller.call(fn)
+        fn.assert_not_called()
+
+        time.sleep(0.06)
+        caller.breaker.before_call()  # a probe is in flight
+        with self.assertRaises(CircuitOpenError):
+            caller.call(fn)
+        caller.breaker.cancel_probe()
+        self.assertEqual(caller.call(fn), "outfits")
+        self.assertEqual(caller.breaker.stats()["state"], CircuitBreaker.CLOSED)
+
+    def test_abandoned_attempt_keeps_its_admission_slot(self):
+        admission = local_admission()
+        caller = self.caller(attempt_timeout=0.05, deadline=0.05, max_retries=0)
+        release = threading.Event()
+        with self.assertRaises(AttemptTimeout):
+            caller.call(release.wait, admit=admission.slot(), extra_slot=admission.try_slot)
+
+        self.assertIsNone(admission.try_slot())  # the provider call is still running
+        release.set()
+        wait_until(lambda: admission._local.active == 0)
+        admission.try_slot()()
+
+    def test_hedge_needs_a_free_slot(self):
+        for max_concurrency, expected_calls in ((1, 1), (2, 2)):
+            admission = local_admission(max_concurrency=max_concurrency)
+            caller = self.caller(hedge=True, hedge_after=0.02)
+            calls = []
+
+            def slow():
+                calls.append(1)
+                time.sleep(0.1)
+                return "outfits"
+
+            self.assertEqual(caller.call(slow, admit=admission.slot(), extra_slot=admission.try_slot), "outfits")
+            self.assertEqual(len(calls), expected_calls)
+            wait_until(lambda: admission._local.active == 0)
+
+
+class StreamBreakerTests(TestCase):
+    """The streaming endpoint drives the breaker by hand; every exit must settle the probe."""
+
+    def setUp(self):
+        self.user = make_client()
+        add_item(self.user, "White oxford shirt", "top", "white")
+        _, self.payload = build_payload(
+            user_id=self.user.pk, destination="London", occasion="office", dt_iso="2030-05-01T10:00:00+00:00"
+        )
+        self.breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+        self.breaker.record_failure()
+        time.sleep(0.02)  # half open: the next call is the probe
+        patches = [
+            mock.patch.object(services, "llm_resilience", ResilientCaller(self.breaker)),
+            mock.patch.object(services, "llm_admission", local_admission()),
+            mock.patch.object(services, "_cached_answer", return_value=None),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def outfits(self, count):
+        outfit = mock.Mock()
+        outfit.model_dump.return_value = {"items": []}
+        return mock.patch.object(services, "stream_outfit_recommendations", return_value=iter([outfit] * count))
+
+    def test_client_disconnect_closes_the_breaker(self):
+        with self.outfits(3):
+            stream = services.stream_recommendations(self.user, self.payload, engine="llm")
+            self.assertEqual(next(stream)[0], "recommendation")
+            stream.close()
+        self.assertEqual(self.breaker.stats()["state"], CircuitBreaker.CLOSED)
+
+
+# =========================
+# Request coalescing
+# =========================
+class FakeRedis:
+    """The slice of redis-py SingleFlight uses, shared by "processes" in one test."""
+
+    def __init__(self):
+        self.values = {}
+        self.locks = {}
+        self.guard = threading.Lock()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, **expiry):
+        self.values[key] = value
+
+    def lock(self, name, timeout, blocking):
+        return FakeLock(self, name, timeout)
+
+
+class FakeLock:
+    def __init__(self, client, name, timeout):
+        self.client, self.name, self.timeout = client, name, timeout
+        self.token = object()
+
+    def acquire(self, blocking):
+        with self.client.guard:
+            owner, expires = self.client.locks.get(self.name, (None, 0))
+            if owner is not None and expires > time.monotonic():
+                return False
+            self.client.locks[self.name] = (self.token, time.monotonic() + self.timeout)
+            return True
+
+    def extend(self, additional_time, replace_ttl=False):
+        with self.client.guard:
+            if self.client.locks.get(self.name, (None,))[0] is self.token:
+                self.client.locks[self.name] = (self.token, time.monotonic() + additional_time)
+        return True
+
+    def release(self):
+        with self.client.guard:
+            if self.client.locks.get(self.name, (None,))[0] is self.token:
+                del self.client.locks[self.name]
+
+
+class SingleFlightTests(TestCase):
+    def flight(self, client=None, **kwargs):
+        return SingleFlight("test", timeout=2, poll_interval=0.01, redis_factory=lambda: client,
+                            reraise=(AdmissionRejected,), **kwargs)
+
+    def run_leader(self, flight, fn):
+        """Start `flight.do("key", fn)` in a thread; returns (thread, outcome list)."""
+        outcome = []
+
+        def lead():
+            try:
+                outcome.append(flight.do("key", fn))
+            except Exception as e:
+                outcome.append(e)
+
+        thread = threading.Thread(target=lead)
+        thread.start()
+        return thread, outcome
+
+    def test_local_followers_share_the_leaders_result(self):
+        flight, go, calls = self.flight(), threading.Event(), []
+
+        def fn():
+            calls.append(1)
+            go.wait()
+            return {"recommendations": []}
+
+        thread, outcome = self.run_leader(flight, fn)
+        wait_until(lambda: calls)
+        follower, shared = self.run_leader(flight, fn)
+        wait_until(lambda: flight.stats()["coalesced_local"] == 1)
+        go.set()
+        thread.join()
+        follower.join()
+        self.assertEqual(outcome, [({"recommendations": []}, False)])
+        self.assertEqual(shared, [({"recommendations": []}, True)])
+        self.assertEqual(len(calls), 1)
+
+    def test_followers_in_every_process_get_the_admission_rejection(self):
+        client, go = FakeRedis(), threading.Event()
+        leader_flight, remote_flight = self.flight(client), self.flight(client)
+
+        def rejected():
+            go.wait()
+            raise AdmissionRejected(AdmissionRejected.BUSY, 7)
+
+        thread, outcome = self.run_leader(leader_flight, rejected)
+        wait_until(lambda: client.locks)
+        local, local_outcome = self.run_leader(leader_flight, rejected)
+        remote, remote_outcome = self.run_leader(remote_flight, rejected)
+        wait_until(lambda: leader_flight.stats()["coalesced_local"] == 1)
+        go.set()
+        for t in (thread, local, remote):
+            t.join()
+
+        for result in (outcome, local_outcome, remote_outcome):
+            self.assertIsInstance(result[0], AdmissionRejected)
+            self.assertEqual((result[0].reason, result[0].retry_after), (AdmissionRejected.BUSY, 7))
+
+    def test_other_failures_reach_remote_followers_as_leader_failed(self):
+        client, go = FakeRedis(), threading.Event()
+
+        def broken():
+            go.wait()
+            raise ValueError("bad answer")
+
+        thread, _ = self.run_leader(self.flight(client), broken)
+        wait_until(lambda: client.locks)
+        remote, outcome = self.run_leader(self.flight(client), broken)
+        go.set()
+        thread.join()
+        remote.join()
+        self.assertIsInstance(outcome[0], LeaderFailed)
+
+    def test_slow_leader_keeps_its_lock(self):
+        client, calls = FakeRedis(), []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.3)  # many lock TTLs
+            return "outfits"
+
+        thread, outcome = self.run_leader(self.flight(client, lock_ttl=0.06), slow)
+        wait_until(lambda: calls)
+        remote, shared = self.run_leader(self.flight(client, lock_ttl=0.06), slow)
+        thread.join()
+        remote.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(shared, [("outfits", True)])
+
+
+# =========================
+# Recommendation jobs
+# =========================
+class RecommendationJobTests(TestCase):
+    URL = "/client/recommendations/jobs/"
+
+    def setUp(self):
+        self.user = make_client()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        patcher = mock.patch.object(views.generate_recommendations_task, "apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, api=None):
+        body = {"destination": "London", "occasion": "office", "datetime": "2030-05-01T10:00:00Z"}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = (api or self.api).post(self.URL, body, format="json")
+        self.assertEqual(response.status_code, 202)
+        return response.data["job_id"]
+
+    def poll(self, job_id, api=None, result=None):
+        job = mock.Mock(**{"ready.return_value": result is not None, "successful.return_value": True, "result": result})
+        with mock.patch.object(views, "AsyncResult", return_value=job):
+            return (api or self.api).get(f"{self.URL}{job_id}/")
+
+    def test_owner_polls_their_job(self):
+        job_id = self.queue()
+        self.assertEqual(self.apply_async.call_args.kwargs["task_id"], job_id)
+        self.assertEqual(self.poll(job_id).data, {"job_id": job_id, "status": "pending"})
+        failed = {"user_id": str(self.user.pk), "status": "failed", "detail": "Please complete your profile."}
+        self.assertEqual(self.poll(job_id, result=failed).data["detail"], "Please complete your profile.")
+
+    def test_task_is_queued_after_commit_and_a_failed_queue_leaves_no_job(self):
+        body = {"destination": "London", "occasion": "office", "datetime": "2030-05-01T10:00:00Z"}
+        with self.captureOnCommitCallbacks() as callbacks:
+            job_id = self.api.post(self.URL, body, format="json").data["job_id"]
+        self.apply_async.assert_not_called()
+        self.assertTrue(RecommendationJob.objects.filter(id=job_id).exists())
+
+        self.apply_async.side_effect = OSError("broker down")
+        with self.assertRaises(OSError):
+            callbacks[0]()
+        self.assertFalse(RecommendationJob.objects.filter(id=job_id).exists())
+
+    def test_unknown_foreign_and_expired_jobs_are_not_found(self):
+        job_id = self.queue()
+        other = APIClient()
+        other.force_authenticate(make_client("other@example.com"))
+        failed = {"user_id": str(self.user.pk), "status": "failed", "detail": "secret"}
+        self.assertEqual(self.poll(job_id, api=other, result=failed).status_code, 404)
+        self.assertEqual(self.poll(job_id, api=other).status_code, 404)
+        self.assertEqual(self.poll("no-such-job").status_code, 404)
+
+        RecommendationJob.objects.filter(id=job_id).update(created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.poll(job_id).status_code, 404)
+        self.queue()  # expired ownership rows are pruned
+        self.assertFalse(RecommendationJob.objects.filter(id=job_id).exists())
+
+
+# =========================
+# Health and metrics endpoints
+# =========================
+class OperationalEndpointTests(TestCase):
+    def test_health_is_only_a_heartbeat(self):
+        response = self.client.get("/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {"status", "database", "environment", "version"})
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_without_token_are_staff_only(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.client.force_login(make_client())
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.client.force_login(User.objects.create_user(
+            email="ops@example.com", username="ops", password="pw-123456!", is_staff=True
+        ))
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"stylegenie_llm_circuit_open", response.content)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_with_token_need_the_bearer(self):
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"stylegenie_wardrobe_index_users", response.content)
+
+
+# =========================
+# Result cache
+# =========================
+class RecommendationCacheTests(TestCase):
+    def setUp(self):
+        self.addCleanup(recommendation_cache.clear)
+        self.user = make_client()
+        for title, category in (("White oxford shirt", "top"), ("Navy chinos", "bottom"), ("Brown loafers", "footwear")):
+            add_item(self.user, title, category)
+
+    def payload(self, dt_iso="2030-05-01T09:00:00+00:00", occasion="office"):
+        return build_payload(user_id=self.user.pk, destination="London", occasion=occasion, dt_iso=dt_iso)[1]
+
+    def test_digest_ignores_drawer_order_and_minutes_within_a_part_of_day(self):
+        payload = self.payload()
+        shuffled = payload.model_copy(update={"drawer_products": list(reversed(payload.drawer_products))})
+        self.assertEqual(payload_digest(payload), payload_digest(shuffled))
+        self.assertEqual(payload_digest(payload), payload_digest(self.payload("2030-05-01T09:40:00+00:00")))
+        self.assertNotEqual(payload_digest(payload), payload_digest(self.payload("2030-05-01T19:00:00+00:00")))
+        self.assertNotEqual(payload_digest(payload), payload_digest(self.payload(occasion="wedding")))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = RecommendationCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", {"n": 1}, user_id=1)
+        cache.set("b", {"n": 2}, user_id=1)
+        cache.get("a")
+        cache.set("c", {"n": 3}, user_id=2)
+        self.assertIsNone(cache.get("b"))  # least recently used
+        self.assertEqual(cache.get("a"), {"n": 1})
+        self.assertEqual(cache.invalidate_user(1), 1)
+        self.assertEqual(cache.stats()["size"], 1)
+
+        expired = RecommendationCache(ttl_seconds=0)
+        expired.set("a", {"n": 1}, user_id=1)
+        self.assertIsNone(expired.get("a"))
+
+    def test_repeat_request_is_served_from_cache_until_the_wardrobe_changes(self):
+        request = {"user_id": self.user.pk, "destination": "London", "occasion": "office",
+                   "dt_iso": "2030-05-01T09:00:00+00:00", "engine": "llm"}
+        with mock.patch.object(services, "llm_admission", local_admission(max_concurrency=0)), \
+                mock.patch.object(services, "get_outfit_recommendations",
+                                  side_effect=lambda payload, **kw: generate_outfits(payload)) as agent:
+            first = recommend(**request)
+            self.assertEqual(recommend(**dict(request, dt_iso="2030-05-01T09:30:00+00:00")), first)
+            self.assertEqual(agent.call_count, 1)
+
+            other = make_client("other@example.com")
+            recommendation_cache.set("other-key", {"recommendations": []}, user_id=other.pk)
+            add_item(self.user, "Grey blazer", "outerwear", "grey")
+            self.assertIsNotNone(recommendation_cache.get("other-key"))
+            recommend(**request)
+            self.assertEqual(agent.call_count, 2)
+
+            ClientProfile.objects.get(user=self.user).save()
+            recommend(**request)
+            self.assertEqual(agent.call_count, 3)
+
+
+# =========================
+# Streaming (SSE)
+# =========================
+class StreamParserTests(TestCase):
+    ANSWER = (
+        'Sure! ```json\n{"recommendations": ['
+        '{"name": "City {brunch}", "description": "a \\"quoted\\" ] bracket", "product_ids": [1, 2]},'
+        '{"name": "Evening", "description": "}{", "product_ids": [3]}'
+        ']}\n```'
+    )
+
+    def test_outfits_come_out_as_their_objects_close(self):
+        parser, outfits = RecommendationStreamParser(), []
+        for ch in self.ANSWER:  # worst case: one character per chunk
+            outfits.extend(parser.feed(ch))
+            if len(outfits) == 1:
+                self.assertFalse(parser.done)
+        self.assertTrue(parser.done)
+        self.assertEqual([o["name"] for o in outfits], ["City {brunch}", "Evening"])
+        self.assertEqual(outfits[0]["description"], 'a "quoted" ] bracket')
+
+    def test_whole_answer_in_one_chunk(self):
+        outfits = RecommendationStreamParser().feed(self.ANSWER)
+        self.assertEqual([o["product_ids"] for o in outfits], [[1, 2], [3]])
+
+
+class StreamEndpointTests(TestCase):
+    URL = "/client/recommendations/stream/"
+
+    def setUp(self):
+        self.addCleanup(recommendation_cache.clear)
+        self.user = make_client()
+        for title, category in (("White oxford shirt", "top"), ("Navy chinos", "bottom"), ("Brown loafers", "footwear")):
+            add_item(self.user, title, category)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def events(self, **body):
+        body = {"destination": "London", "occasion": "office", "datetime": "2030-05-01T09:00:00Z", **body}
+        response = self.api.post(self.URL, body, format="json")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        raw = b"".join(response.streaming_content).decode()
+        out = []
+        for block in raw.strip().split("\n\n"):
+            event, data = block.split("\n")
+            out.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return out
+
+    def test_llm_outfits_stream_then_replay_from_cache(self):
+        with mock.patch.object(style_agent, "get_backend", return_value=FakeBackend(style_agent.SYSTEM_PROMPT)), \
+                mock.patch.object(services, "llm_admission", local_admission(max_concurrency=0)):
+            events = self.events()
+            self.assertEqual([e for e, _ in events], ["recommendation"] * 5 + ["summary"])
+            self.assertEqual(events[-1][1], {"count": 5, "cached": False})
+            self.assertEqual(events[0][1]["name"], "Fake Outfit 1")
+
+            replay = self.events()
+            self.assertEqual(replay[-1][1], {"count": 5, "cached": True})
+            self.assertEqual(replay[:-1], events[:-1])
+        self.assertEqual(Recommendation.objects.filter(user=self.user).count(), 1)
+
+    def test_profile_errors_are_reported_before_the_stream(self):
+        ClientProfile.objects.filter(user=self.user).update(gender="")
+        response = self.api.post(self.URL, {"destination": "London", "occasion": "office",
+                                            "datetime": "2030-05-01T09:00:00Z"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+# =========================
+# Rule engine
+# =========================
+class RuleEngineTests(SimpleTestCase):
+    WARDROBE = [
+        (1, "top", "white"), (2, "top", "blue"), (3, "top", "red"),
+        (4, "bottom", "black"), (5, "bottom", "beige"),
+        (6, "footwear", "brown"), (7, "footwear", "black"),
+        (8, "suit", "gray"), (9, "outerwear", "blue"), (10, "accessory", "brown"),
+    ]
+
+    def payload(self, occasion="office", wardrobe=WARDROBE, colors=()):
+        return StylistRequestPayload.model_validate({
+            "user_info": {"gender": "male", "skin_tone": "olive", "body_shape": "rectangle", "color_preferences": list(colors)},
+            "drawer_products": [{"id": i, "name": f"{color} {category}", "category": category, "color": color}
+                                for i, category, color in wardrobe],
+            "location": "London",
+            "occasion": occasion,
+        })
+
+    def outfits(self, **kwargs):
+        return generate_outfits(self.payload(**kwargs)).model_dump()["recommendations"]
+
+    def test_formality_follows_the_occasion(self):
+        self.assertTrue(self.outfits(occasion="wedding")[0]["name"].startswith(("Tailored Suit", "Sharp Suit")))
+        casual = self.outfits(occasion="beach picnic")[0]
+        self.assertNotIn(8, casual["product_ids"])
+
+    def test_outfits_are_deterministic_diverse_and_from_the_drawer(self):
+        outfits = self.outfits()
+        self.assertEqual(outfits, self.outfits())
+        self.assertEqual(len(outfits), 5)
+        drawer = {i for i, _, _ in self.WARDROBE}
+        for n, outfit in enumerate(outfits):
+            self.assertLessEqual(set(outfit["product_ids"]), drawer)
+            self.assertIn("It suits office in London.", outfit["description"])
+            for other in outfits[n + 1:]:
+                self.assertLessEqual(len(set(outfit["product_ids"]) & set(other["product_ids"])), 1)
+
+    def test_preferred_colors_win_ties(self):
+        wardrobe = [(1, "top", "red"), (2, "top", "green"), (3, "bottom", "black")]
+        self.assertEqual(self.outfits(occasion="park", wardrobe=wardrobe, colors=["green"])[0]["product_ids"], [2, 3])
+        self.assertEqual(self.outfits(occasion="park", wardrobe=wardrobe, colors=["red"])[0]["product_ids"], [1, 3])
+
+    def test_incomplete_wardrobes(self):
+        self.assertEqual(self.outfits(wardrobe=[]), [])
+        pairs = self.outfits(wardrobe=[(1, "accessory", "black"), (2, "footwear", "white"), (3, "outerwear", "beige")])
+        self.assertEqual([o["name"].split(" #")[0] for o in pairs], ["Simple Pairing"] * 2)
+        self.assertEqual(sorted(i for o in pairs for i in o["product_ids"]), [1, 2, 3])
+
+
+# =========================
+# Prompt pruning
+# =========================
+class PruningTests(SimpleTestCase):
+    def wardrobe(self):
+        items, n = [], 0
+        for category, count in (("top", 12), ("bottom", 8), ("footwear", 5), ("suit", 3), ("outerwear", 4), ("accessory", 6)):
+            for k in range(count):
+                n += 1
+                items.append({"id": n, "title": f"{category} {k}", "category": category,
+                              "color": ("black", "white", "beige", "red")[k % 4]})
+        return items
+
+    def test_every_category_is_kept_within_the_budget(self):
+        items = self.wardrobe()
+        chosen = select_candidates(items, occasion="office", dt=None, token_budget=300, token_cost=lambda item: 20)
+        self.assertEqual(len(chosen), 15)
+        self.assertEqual({i["category"] for i in chosen}, {i["category"] for i in items})
+        self.assertEqual(len({i["id"] for i in chosen}), 15)
+
+    def test_occasion_and_season_shift_the_mix(self):
+        items = self.wardrobe()
+
+        def count(category, **kwargs):
+            chosen = select_candidates(items, token_budget=200, token_cost=lambda item: 20, **kwargs)
+            return sum(1 for i in chosen if i["category"] == category)
+
+        self.assertGreater(count("suit", occasion="wedding", dt=None), count("suit", occasion="beach", dt=None))
+        self.assertGreater(count("outerwear", occasion="park", dt=None, season="winter"),
+                           count("outerwear", occasion="park", dt=None, season="summer"))
+
+    def test_compatible_partners_move_up(self):
+        items = [{"id": 1, "category": "top", "color": "black"}, {"id": 2, "category": "top", "color": "black"},
+                 {"id": 3, "category": "top", "color": "black"}, {"id": 4, "category": "bottom", "color": "black"}]
+        plain = select_candidates(items, occasion="park", dt=None, token_budget=60, token_cost=lambda item: 20)
+        self.assertEqual([i["id"] for i in plain], [4, 3, 2])  # heads first, newest wins ties
+        paired = select_candidates(items, occasion="park", dt=None, token_budget=60, token_cost=lambda item: 20,
+                                   partners=lambda ids: {1: 1.0})
+        self.assertEqual([i["id"] for i in paired], [4, 3, 1])
+
+    def test_edge_cases(self):
+        self.assertEqual(select_candidates([], occasion="office", dt=None, token_cost=lambda item: 20), [])
+        huge = [{"id": 1, "category": "top", "description": "x" * 10000}]
+        self.assertEqual(select_candidates(huge, occasion="office", dt=None, token_budget=10,
+                                           token_cost=lambda item: 2500), huge)
+        self.assertEqual(season_for(datetime(2030, 1, 15)), "winter")
+        self.assertEqual(season_for(datetime(2030, 1, 15), southern_hemisphere=True), "summer")
+
+
+# =========================
+# Payload encoders
+# =========================
+class PayloadEncoderTests(SimpleTestCase):
+    def payload(self, extra_items=0):
+        products = [
+            {"id": 7, "title": "Linen | cotton shirt", "category": "top", "color": "white",
+             "description": "Relaxed fit,\nrolled  sleeves"},
+            {"id": 9, "title": "Navy chinos", "category": "bottom", "color": "blue", "description": ""},
+        ]
+        products += [{"id": 100 + n, "title": f"Wool sweater {n}", "category": "top", "color": "gray",
+                      "description": "Crew neck, ribbed cuffs"} for n in range(extra_items)]
+        return StylistRequestPayload.model_validate({
+            "user_info": {"gender": "female", "skin_tone": "tan", "body_shape": "pear", "color_preferences": ["navy", "beige"]},
+            "drawer_products": products,
+            "location": "Lisbon",
+            "occasion": "office",
+            "datetime": "2030-05-01T09:00:00Z",
+        })
+
+    def test_compact_encoding_carries_every_json_field(self):
+        payload = self.payload()
+        encoded = get_encoder("json").encode(payload)
+        data = json.loads(encoded[encoded.index("{"):encoded.rindex("}") + 1])
+        lines = get_encoder("compact").encode(payload).split("\n")
+
+        self.assertIn("user_info: gender=female; skin_tone=tan; color_preferences=navy,beige; body_shape=pear", lines)
+        aliases = {"event_datetime": "datetime"}
+        for key, value in data.items():
+            if key not in ("user_info", "drawer_products") and value is not None:
+                self.assertIn(f"{aliases.get(key, key)}: {value}", lines)
+
+        table = lines.index("drawer_products (2):")
+        header, rows = lines[table + 1].split("|"), [line.split("|") for line in lines[table + 2:]]
+        self.assertEqual(header, ["id", "title", "category", "color", "description"])
+        self.assertLessEqual({k for p in data["drawer_products"] for k, v in p.items() if v not in (None, "")}, set(header))
+        # one row per item: `|` and newlines inside values can't add columns or rows
+        self.assertEqual(rows, [
+            ["7", "Linen / cotton shirt", "top", "white", "Relaxed fit, rolled sleeves"],
+            ["9", "Navy chinos", "bottom", "blue", ""],
+        ])
+
+    def test_token_estimates(self):
+        payload = self.payload(extra_items=20)
+        pretty, compact = get_encoder("json"), get_encoder("compact")
+        self.assertLess(estimate_tokens(compact.encode(payload)), estimate_tokens(pretty.encode(payload)))
+        item = payload.drawer_products[0].model_dump()
+        self.assertLess(compact.estimate_item_tokens(item), pretty.estimate_item_tokens(item))
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("a|b wardrobe"), 5)  # punctuation is one token, words ~4 chars each
+
+    def test_unknown_encoder(self):
+        with self.assertRaisesMessage(ValueError, "Unknown payload encoder: 'xml'"):
+            get_encoder("xml")
+
+
+# =========================
+# LLM backends
+# =========================
+class BackendRegistryTests(SimpleTestCase):
+    PAYLOAD = {
+        "user_info": {"gender": "male", "skin_tone": "olive"},
+        "drawer_products": [{"id": n, "category": "top"} for n in range(1, 5)],
+        "location": "Paris",
+        "occasion": "office",
+    }
+
+    def backend(self, name):
+        with override_settings(STYLIST_LLM_BACKEND=name), mock.patch.object(style_agent, "_backend", None):
+            return style_agent.get_backend()
+
+    def test_backend_is_chosen_by_setting(self):
+        self.assertLessEqual({"gemini", "openai", "fake"}, set(BACKENDS))
+        backend = self.backend("fake")
+        self.assertIsInstance(backend, FakeBackend)
+        self.assertEqual(backend.system_prompt, style_agent.SYSTEM_PROMPT)
+        with self.assertRaisesMessage(ValueError, "Unknown LLM backend: 'llama'"):
+            self.backend("llama")
+
+    def test_register_backend(self):
+        @register_backend("echo")
+        class EchoBackend(FakeBackend):
+            pass
+
+        self.addCleanup(BACKENDS.pop, "echo")
+        self.assertEqual(EchoBackend.name, "echo")
+        self.assertIsInstance(self.backend("echo"), EchoBackend)
+
+    def run_fake(self, calls=20, **overrides):
+        """(outcome, simulated delay) of each call to a fake backend built with `overrides`."""
+        overrides = {"STYLIST_FAKE_LATENCY_MS": 0, "STYLIST_FAKE_JITTER_MS": 0, "STYLIST_FAKE_ERROR_RATE": 0,
+                    "STYLIST_FAKE_SEED": 0, **overrides}
+        payload = StylistRequestPayload.model_validate(self.PAYLOAD)
+        with override_settings(**overrides):
+            backend = FakeBackend(style_agent.SYSTEM_PROMPT)
+        outcomes = []
+        with mock.patch("agents.backends.time.sleep") as sleep:
+            for _ in range(calls):
+                sleep.reset_mock()
+                try:
+                    answer = backend.invoke([], payload=payload, config={})
+                    outcome = [o.product_ids for o in answer.recommendations]
+                except FakeBackendError:
+                    outcome = "error"
+                outcomes.append((outcome, sleep.call_args.args[0] if sleep.called else 0))
+        return outcomes
+
+    def test_fake_latency_and_errors_are_seeded(self):
+        first = self.run_fake(STYLIST_FAKE_LATENCY_MS=40, STYLIST_FAKE_JITTER_MS=20, STYLIST_FAKE_ERROR_RATE=0.3, STYLIST_FAKE_SEED=7)
+        self.assertEqual(first, self.run_fake(STYLIST_FAKE_LATENCY_MS=40, STYLIST_FAKE_JITTER_MS=20,
+                                              STYLIST_FAKE_ERROR_RATE=0.3, STYLIST_FAKE_SEED=7))
+        self.assertNotEqual(first, self.run_fake(STYLIST_FAKE_LATENCY_MS=40, STYLIST_FAKE_JITTER_MS=20,
+                                                 STYLIST_FAKE_ERROR_RATE=0.3, STYLIST_FAKE_SEED=8))
+        outcomes = [outcome for outcome, _ in first]
+        self.assertIn("error", outcomes)
+        windows = [[1, 2, 3], [4, 1, 2], [3, 4, 1], [2, 3, 4], [1, 2, 3]]  # drawer ids, in order
+        self.assertTrue(all(outcome == windows for outcome in outcomes if outcome != "error"))
+        delays = [delay for _, delay in first]
+        self.assertTrue(all(0.04 <= delay <= 0.06 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_fake_without_injection_never_sleeps_or_fails(self):
+        self.assertEqual({delay for _, delay in self.run_fake()}, {0})
+        self.assertNotIn("error", [outcome for outcome, _ in self.run_fake()])
+
+
+# =========================
+# Recommendation history
+# =========================
+class RecommendationHistoryTests(TestCase):
+    URL = "/client/recommendations/history/"
+
+    def setUp(self):
+        self.user = make_client()
+        self.shirt = add_item(self.user, "White oxford shirt", "top", "white")
+        self.chinos = add_item(self.user, "Navy chinos", "bottom", "blue")
+        self.loafers = add_item(self.user, "Brown loafers", "footwear", "brown")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def store(self, occasion="office", user=None, outfits=None):
+        user = user or self.user
+        payload = StylistRequestPayload.model_validate({
+            "user_info": {"gender": "female", "skin_tone": "medium"},
+            "drawer_products": [{"id": self.shirt.pk}, {"id": self.chinos.pk}, {"id": self.loafers.pk}],
+            "location": "London",
+            "occasion": occasion,
+        })
+        outfits = outfits or [[self.shirt.pk, self.chinos.pk]]
+        result = {"recommendations": [
+            {"name": f"Look {n}", "description": "", "product_ids": ids} for n, ids in enumerate(outfits, start=1)
+        ]}
+        [recommendation] = save_history([HistoryEntry(user.pk, payload, result, Recommendation.Source.RULES)])
+        return recommendation
+
+    def page(self, url, queries=3):
+        with self.assertNumQueries(queries):  # page, its outfits, the deleted-item check
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [r["occasion"] for r in response.data["results"]], response.data["next"]
+
+    def test_pages_are_newest_first_and_stable_across_inserts(self):
+        for n in range(1, 6):
+            self.store(f"occasion {n}")
+        occasions, next_url = self.page(f"{self.URL}?page_size=2")
+        self.assertEqual(occasions, ["occasion 5", "occasion 4"])
+
+        self.store("occasion 6")  # a new answer while paging
+        occasions, next_url = self.page(next_url)
+        self.assertEqual(occasions, ["occasion 3", "occasion 2"])
+        occasions, next_url = self.page(next_url)
+        self.assertEqual((occasions, next_url), (["occasion 1"], None))
+
+        occasions, _ = self.page(f"{self.URL}?page_size=50")
+        self.assertEqual(len(occasions), 6)
+
+    def test_history_is_per_user(self):
+        other = make_client("other@example.com")
+        theirs = self.store(user=other)
+        mine = self.store()
+        response = self.api.get(self.URL)
+        self.assertEqual([r["id"] for r in response.data["results"]], [mine.pk])
+        self.assertEqual(self.api.get(f"{self.URL}{mine.pk}/").status_code, 200)
+        self.assertEqual(self.api.get(f"{self.URL}{theirs.pk}/").status_code, 404)
+
+    def test_deleted_items_are_flagged(self):
+        shirt, chinos, loafers = self.shirt.pk, self.chinos.pk, self.loafers.pk
+        recommendation = self.store(outfits=[[shirt, chinos], [shirt, loafers]])
+        self.chinos.delete()
+        with self.assertNumQueries(3):
+            response = self.api.get(f"{self.URL}{recommendation.pk}/")
+        self.assertEqual(
+            [(o["product_ids"], o["missing_product_ids"], o["is_complete"]) for o in response.data["outfits"]],
+            [([shirt, chinos], [chinos], False), ([shirt, loafers], [], True)],
+        )
+        self.assertEqual(self.api.get(self.URL).data["results"][0]["outfits"][0]["missing_product_ids"], [chinos])
+
+
+# =========================
+# Conversational refinement
+# =========================
+class RefinementTests(TestCase):
+    def setUp(self):
+        self.addCleanup(recommendation_cache.clear)
+        self.user = make_client()
+        self.addCleanup(refinement_sessions.drop, self.user.pk)
+        categories = ("top", "bottom", "footwear", "outerwear", "accessory")
+        import_items(self.user, [
+            {"image_url": "https://example.com/x.jpg", "title": f"Item {n}", "category": categories[n % 5],
+             "color": ("black", "white", "blue", "beige")[n % 4], "description": "cotton " * 10}
+            for n in range(120)
+        ])
+        self.request = {"user_id": self.user.pk, "destination": "London", "occasion": "office",
+                        "dt_iso": "2030-05-01T09:00:00+00:00", "engine": "rules"}
+
+    def test_checkpoint_keeps_used_items_and_a_few_alternates(self):
+        _, payload = build_payload(**{k: v for k, v in self.request.items() if k != "engine"})
+        result = generate_outfits(payload).model_dump()
+        used = {pid for outfit in result["recommendations"] for pid in outfit["product_ids"]}
+        checkpoint = new_checkpoint(payload, result, alternates_budget=200, token_cost=lambda item: 40)
+        ids = [item["id"] for item in checkpoint["items"]]
+        self.assertLessEqual(used, set(ids))
+        self.assertEqual(len(ids), len(used) + 5)
+        self.assertNotIn("drawer_products", checkpoint["context"])
+
+    def test_turns_send_only_the_delta(self):
+        recommend(**self.request)
+        checkpoint = refinement_sessions.get(self.user.pk)
+        calls = []
+
+        def agent(payload, previous, message, earlier_requests, **kwargs):
+            calls.append((len(payload.drawer_products), previous, list(earlier_requests)))
+            first = previous["recommendations"][0]
+            return AIRecommendations.model_validate({"recommendations": [
+                {**first, "product_ids": first["product_ids"] + [999999]},  # unknown id is dropped
+            ]})
+
+        with mock.patch.object(services, "llm_admission", local_admission(max_concurrency=0)), \
+                mock.patch.object(services, "refine_outfit_recommendations", side_effect=agent):
+            first = refine(user_id=self.user.pk, message="warmer please")
+            second = refine(user_id=self.user.pk, message="swap the shoes")
+
+        self.assertEqual(calls[0][0], len(checkpoint["items"]))
+        self.assertLess(calls[0][0], 120)
+        self.assertEqual(calls[1], (calls[0][0], {"recommendations": first["recommendations"]}, ["warmer please"]))
+        self.assertNotIn(999999, first["recommendations"][0]["product_ids"])
+        self.assertEqual(second["refinement"]["turns"], 2)
+        self.assertEqual(Recommendation.objects.filter(user=self.user).count(), 3)  # answer + one per turn
+        self.assertNotEqual(second["refinement"]["recommendation_id"], first["refinement"]["recommendation_id"])
+
+    def test_wardrobe_change_drops_the_checkpoint(self):
+        recommend(**self.request)
+        add_item(self.user, "Grey blazer", "outerwear", "gray")
+        with self.assertRaises(ValueError):
+            refine(user_id=self.user.pk, message="warmer please")
+
+    def test_store_limits(self):
+        store = RefinementStore("test", max_sessions=2, max_turns=2, redis_factory=lambda: None)
+        checkpoint = {"turns": ["a", "b", "c"], "created_at": time.time(), "result": {}}
+        for user in ("u1", "u2", "u3"):
+            store.save(user, dict(checkpoint))
+        self.assertIsNone(store.get("u1"))  # evicted
+        self.assertEqual(store.get("u3")["turns"], ["b", "c"])
+
+        store.save("old", {**checkpoint, "created_at": time.time() - store.max_age})
+        self.assertIsNone(store.get("old"))
+
+
+# =========================
+# Destination gazetteer
+# =========================
+class GazetteerTests(SimpleTestCase):
+    def test_local_time_and_part_of_day(self):
+        conditions = gazetteer.resolve("Tokyo", datetime(2030, 4, 16, 10, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual((conditions.city, conditions.country, conditions.timezone), ("Tokyo", "JP", "Asia/Tokyo"))
+        self.assertEqual(conditions.local_time.isoformat(), "2030-04-16T19:30:00+09:00")
+        self.assertEqual(conditions.time_of_day, "evening")
+        # naive datetimes are already local
+        self.assertEqual(gazetteer.resolve("Tokyo", datetime(2030, 4, 16, 10, 30)).time_of_day, "morning")
+
+    def test_season_follows_the_hemisphere(self):
+        january = datetime(2030, 1, 16, 12, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(gazetteer.resolve("New York", january).season, "winter")
+        self.assertEqual(gazetteer.resolve("Sydney", january).season, "summer")
+        self.assertEqual(gazetteer.resolve("Singapore", january).season, "tropical")
+
+    def test_temperature_is_interpolated_between_monthly_normals(self):
+        # New York normals: Dec 3.9, Jan 0.8 °C; mid-month is the monthly mean
+        mid_january = gazetteer.resolve("New York", datetime(2030, 1, 16, 12, 0))
+        self.assertAlmostEqual(mid_january.avg_temp_c, 0.8, delta=0.1)
+        self.assertEqual(mid_january.temperature_band, "cold")
+        new_year = gazetteer.resolve("New York", datetime(2030, 1, 1, 12, 0))
+        self.assertTrue(0.8 < new_year.avg_temp_c < 3.9)
+        self.assertEqual(gazetteer.temperature_band(-2), "freezing")
+        self.assertEqual(gazetteer.temperature_band(30), "hot")
+
+    def test_names_aliases_and_unknown_cities(self):
+        july = datetime(2030, 7, 1, 12, 0)
+        for name in ("New York", "NYC", "  new york city ", "Manhattan", "New York, USA"):
+            self.assertEqual(gazetteer.resolve(name, july).city, "New York")
+        self.assertEqual(gazetteer.resolve("paris, france", july).city, "Paris")
+        self.assertEqual(gazetteer.resolve("São Paulo", july).city, "Sao Paulo")
+        self.assertIsNone(gazetteer.find_city("Atlantis"))
+        self.assertIsNone(gazetteer.resolve("Atlantis", july))
+        self.assertIsNone(gazetteer.resolve("Paris", None))
+
+    def test_shipped_table_matches_the_csv(self):
+        built = gazetteer.build_table()
+        shipped = np.load(gazetteer.TABLE_PATH, allow_pickle=False)
+        self.assertEqual(shipped.dtype, built.dtype)
+        self.assertEqual(shipped.tobytes(), built.tobytes())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "gazetteer.npy")
+            call_command("build_gazetteer", output=output, stdout=io.StringIO())
+            self.assertEqual(np.load(output, allow_pickle=False).tobytes(), built.tobytes())
+
+
+# =========================
+# Benchmark command
+# =========================
+class BenchmarkCommandTests(SimpleTestCase):
+    def test_tiny_run_writes_the_report(self):
+        # A subprocess: the command sets up (and tears down) its own test database
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            subprocess.run(
+                [sys.executable, "manage.py", "bench_recommend", "--sizes", "5", "--concurrency", "1",
+                 "--targets", "service,view", "--requests", "2", "--warmup", "1", "--memory-samples", "1",
+                 "--latency-ms", "0", "--output", output],
+                cwd=settings.BASE_DIR, check=True, capture_output=True, timeout=120,
+            )
+            with open(output, encoding="utf-8") as fh:
+                report = json.load(fh)
+
+        self.assertEqual(set(report), {"benchmark", "created_at", "environment", "config", "results"})
+        self.assertEqual((report["config"]["sizes"], report["environment"]["db_vendor"]), ([5], "sqlite"))
+        self.assertEqual([(r["target"], r["wardrobe_size"], r["concurrency"]) for r in report["results"]],
+                         [("service", 5, 1), ("view", 5, 1)])
+        for result in report["results"]:
+            self.assertEqual((result["ok"], result["errors"]), (2, 0))
+            self.assertLessEqual({"p50", "p95", "p99", "mean", "max"}, set(result["latency_ms"]))
+            self.assertLessEqual({"throughput_rps", "sql_queries", "peak_memory_bytes", "wall_seconds"}, set(result))
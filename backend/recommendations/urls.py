@@ -1,7 +1,23 @@
 # myapp/urls.py
 from django.urls import path
-from .views import RecommendView
+from .views import (
+    RecommendView,
+    RecommendBatchView,
+    RecommendRefineView,
+    RecommendStreamView,
+    RecommendJobView,
+    RecommendJobStatusView,
+    RecommendationHistoryView,
+    RecommendationHistoryDetailView,
+)
 
 urlpatterns = [
     path('recommendations/', RecommendView.as_view(), name='recommendations'),
+    path('recommendations/batch/', RecommendBatchView.as_view(), name='recommendations-batch'),
+    path('recommendations/stream/', RecommendStreamView.as_view(), name='recommendations-stream'),
+    path('recommendations/jobs/', RecommendJobView.as_view(), name='recommendation-jobs'),
+    path('recommendations/jobs/<str:job_id>/', RecommendJobStatusView.as_view(), name='recommendation-job-status'),
+    path('recommendations/refine/', RecommendRefineView.as_view(), name='recommendation-refine'),
+    path('recommendations/history/', RecommendationHistoryView.as_view(), name='recommendation-history'),
+    path('recommendations/history/<int:pk>/', RecommendationHistoryDetailView.as_view(), name='recommendation-history-detail'),
 ]
@@ -1,12 +1,52 @@
+import json
+import logging
+import uuid
+from datetime import timedelta
+
+from celery.result import AsyncResult
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
+from rest_framework.exceptions import Throttled
+
+from agents.metrics import STAGE_SECONDS
+from common.pagination import NewestFirstCursorPagination
+from core.celery import app as celery_app
 
 from .serializers import (
     RecommendRequestSerializer,
+    RecommendBatchRequestSerializer,
+    RecommendRefineRequestSerializer,
+    RecommendItemSerializer,
     RecommendResponseSerializer,
+    RecommendationHistorySerializer,
 )
-from .services import recommend
+from .admission import AdmissionRejected
+from .history import missing_item_ids
+from .models import Recommendation, RecommendationJob
+from .resilience import CircuitOpenError
+from .services import build_payload, recommend, recommend_batch, refine, stream_recommendations
+from .tasks import generate_recommendations_task
+
+
+logger = logging.getLogger(__name__)
+
+
+def _recommend_kwargs(request, data):
+    """Map validated request data to `recommend()` keyword arguments."""
+    return {
+        "user_id": request.user.id,
+        "destination": data["destination"],
+        "occasion": data["occasion"],
+        "dt_iso": data["datetime"].isoformat(),
+        "drawer_products_override": data.get("drawer_products") or None,
+        "engine": data.get("engine"),
+    }
 
 
 class RecommendView(APIView):
@@ -24,18 +64,280 @@ class RecommendView(APIView):
         data = s.validated_data
 
         try:
-            result = recommend(
+            result = recommend(**_recommend_kwargs(request, data))
+        except ValueError as e:
+            # Validation or AI error bubbled up as clean message
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except AdmissionRejected as e:
+            # Per-user quota or LLM capacity exhausted -> 429 + Retry-After
+            raise Throttled(wait=e.retry_after, detail=str(e))
+        except CircuitOpenError as e:
+            # Provider unhealthy and the rule-engine fallback is disabled
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+        # Validate outgoing contract (defensive)
+        with STAGE_SECONDS.time(stage="response_validation"):
+            out = RecommendResponseSerializer(data=result)
+            out.is_valid(raise_exception=True)
+            data = out.data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class RecommendRefineView(APIView):
+    """
+    Authenticated endpoint (conversational follow-up):
+    - message: the change, e.g. "swap the shoes in outfit 2" or "warmer please"
+    - Optional recommendation_id to refine a stored recommendation instead of the latest
+    - Returns {"recommendations": [...], "refinement": {"recommendation_id", "turns"}}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        s = RecommendRefineRequestSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        data = s.validated_data
+
+        try:
+            result = refine(
+                user_id=request.user.id,
+                message=data["message"],
+                recommendation_id=data.get("recommendation_id"),
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except AdmissionRejected as e:
+            raise Throttled(wait=e.retry_after, detail=str(e))
+        except CircuitOpenError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        except Exception:
+            # No rule-engine fallback for free-text changes
+            logger.exception("Recommendation refinement failed")
+            return Response(
+                {"detail": "The stylist could not refine these outfits right now. Please try again."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        # Validate outgoing contract (defensive)
+        with STAGE_SECONDS.time(stage="response_validation"):
+            out = RecommendResponseSerializer(data=result)
+            out.is_valid(raise_exception=True)
+            data = {**out.data, "refinement": result["refinement"]}
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class RecommendBatchView(APIView):
+    """
+    Authenticated endpoint (multi-day trips / several occasions):
+    - destination, slots: [{occasion, datetime}, ...], optional drawer_products
+    - Profile + wardrobe are loaded once; slots run concurrently
+    - Returns {"results": [...]} in slot order, each `complete` with `recommendations`
+      or `failed` with `detail`; one failed slot doesn't fail the batch
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        s = RecommendBatchRequestSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        data = s.validated_data
+
+        try:
+            results = recommend_batch(
                 user_id=request.user.id,
                 destination=data["destination"],
-                occasion=data["occasion"],
-                dt_iso=data["datetime"].isoformat(),
+                slots=[
+                    {"occasion": slot["occasion"], "dt_iso": slot["datetime"].isoformat()}
+                    for slot in data["slots"]
+                ],
                 drawer_products_override=data.get("drawer_products") or None,
+                engine=data.get("engine"),
             )
         except ValueError as e:
-            # Validation or AI error bubbled up as clean message
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Validate outgoing contract (defensive)
-        out = RecommendResponseSerializer(data=result)
-        out.is_valid(raise_exception=True)
-        return Response(out.data, status=status.HTTP_200_OK)
+        out = []
+        for item in results:
+            entry = {"occasion": item["occasion"], "datetime": item["datetime"], "status": item["status"]}
+            if item["status"] == "complete":
+                # Validate outgoing contract (defensive)
+                slot_out = RecommendResponseSerializer(data=item["result"])
+                slot_out.is_valid(raise_exception=True)
+                entry["recommendations"] = slot_out.data["recommendations"]
+            else:
+                entry["detail"] = item["detail"]
+            out.append(entry)
+        return Response({"results": out}, status=status.HTTP_200_OK)
+
+
+def _sse(event, data):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class RecommendStreamView(APIView):
+    """
+    Authenticated endpoint (server-sent events):
+    - Same body as RecommendView
+    - Emits `recommendation` events one outfit at a time as the model writes them,
+      then a `summary` event ({"count", "cached"})
+    - Errors after the stream has started arrive as an `error` event
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        s = RecommendRequestSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+
+        # Profile/wardrobe problems are reported before the stream opens
+        kwargs = _recommend_kwargs(request, s.validated_data)
+        engine = kwargs.pop("engine")
+        try:
+            user, payload = build_payload(**kwargs)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def events():
+            try:
+                for event, data in stream_recommendations(user, payload, engine=engine):
+                    if event == "recommendation":
+                        # Same per-outfit contract as RecommendResponseSerializer
+                        out = RecommendItemSerializer(data=data)
+                        out.is_valid(raise_exception=True)
+                        data = out.data
+                    yield _sse(event, data)
+            except ValueError as e:
+                yield _sse("error", {"detail": str(e)})
+            except (AdmissionRejected, CircuitOpenError) as e:
+                yield _sse("error", {"detail": str(e), "retry_after": e.retry_after})
+            except Exception:
+                yield _sse("error", {"detail": "Recommendation stream failed."})
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+        return response
+
+
+class RecommendJobView(APIView):
+    """
+    Authenticated endpoint (job mode):
+    - Same body as RecommendView
+    - Queues the LLM call on a Celery worker and returns a job id right away (202)
+    - Poll RecommendJobStatusView for the result
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        s = RecommendRequestSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+
+        kwargs = _recommend_kwargs(request, s.validated_data)
+        kwargs["user_id"] = str(kwargs["user_id"])  # UUID -> JSON-safe task arg
+        job_id = str(uuid.uuid4())
+        with transaction.atomic():
+            # Owner first, so the job is never visible without one; queued only once the row is
+            # committed, so a fast worker can't finish a job whose owner doesn't exist yet
+            RecommendationJob.objects.filter(user=request.user, created_at__lt=_job_cutoff()).delete()
+            RecommendationJob.objects.create(id=job_id, user=request.user)
+            transaction.on_commit(lambda: _enqueue_job(job_id, kwargs))
+
+        return Response({"job_id": job_id, "status": "pending"}, status=status.HTTP_202_ACCEPTED)
+
+
+def _enqueue_job(job_id, kwargs):
+    """Queue the task of a committed job; no row is left behind if queueing fails."""
+    try:
+        generate_recommendations_task.apply_async(kwargs=kwargs, task_id=job_id)
+    except Exception:
+        RecommendationJob.objects.filter(id=job_id).delete()
+        raise
+
+
+def _job_cutoff():
+    """Jobs queued before this have no pollable result any more (CELERY_RESULT_EXPIRES)."""
+    return timezone.now() - timedelta(seconds=getattr(settings, "CELERY_RESULT_EXPIRES", 3600))
+
+
+class RecommendJobStatusView(APIView):
+    """
+    GET /client/recommendations/jobs/<job_id>/
+    Returns {"job_id", "status": pending|complete|failed} plus
+    `result` (RecommendResponseSerializer payload) or `detail`.
+    Unknown, expired and other users' job ids are 404.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        owned = RecommendationJob.objects.filter(
+            id=job_id, user=request.user, created_at__gte=_job_cutoff()
+        ).exists()
+        if not owned:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        job = AsyncResult(job_id, app=celery_app)
+
+        if not job.ready():
+            return Response({"job_id": job_id, "status": "pending"}, status=status.HTTP_200_OK)
+
+        if not job.successful():
+            # Unexpected worker error; don't leak the traceback
+            return Response(
+                {"job_id": job_id, "status": "failed", "detail": "Recommendation job failed."},
+                status=status.HTTP_200_OK,
+            )
+
+        payload = job.result or {}
+        body = {"job_id": job_id, "status": payload["status"]}
+        if payload["status"] == "complete":
+            body["result"] = payload["result"]
+        else:
+            body["detail"] = payload.get("detail", "")
+        return Response(body, status=status.HTTP_200_OK)
+
+
+class RecommendationHistoryMixin:
+    """Own recommendations with outfits prefetched; deleted items flagged per page."""
+    serializer_class = RecommendationHistorySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # Served by the (user, -created_at) index
+        return Recommendation.objects.filter(user=self.request.user).prefetch_related("outfits")
+
+    def flag_missing(self, recommendations):
+        self.missing_ids = missing_item_ids(self.request.user, recommendations)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["missing_item_ids"] = getattr(self, "missing_ids", set())
+        return context
+
+
+class RecommendationHistoryView(RecommendationHistoryMixin, generics.ListAPIView):
+    """
+    GET /client/recommendations/history/?cursor=...&page_size=...
+    Past recommendations, newest first (cursor pagination).
+    """
+    pagination_class = NewestFirstCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        self.flag_missing(page)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class RecommendationHistoryDetailView(RecommendationHistoryMixin, generics.RetrieveAPIView):
+    """GET /client/recommendations/history/<id>/"""
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        self.flag_missing([instance])
+        return Response(self.get_serializer(instance).data)
@@ -161,7 +161,19 @@ const Dashboard = () => {
   const wardrobeQuery = useQuery<WardrobeList>({
     queryKey: ["wardrobe", role],
     enabled: isClient,
-    queryFn: async () => authorizedRequest<WardrobeList>("/client/wardrobe/"),
+    queryFn: async () => {
+      // The list is cursor-paginated: follow `next` until the last page
+      const results: WardrobeItem[] = [];
+      let path: string | null = "/client/wardrobe/?page_size=100";
+      while (path) {
+        const page: WardrobeList = await authorizedRequest<WardrobeList>(path);
+        if (Array.isArray(page)) return page;
+        results.push(...page.results);
+        const next = page.next ? new URL(page.next) : null;
+        path = next ? next.pathname + next.search : null;
+      }
+      return results;
+    },
   });
 
   const profileMutation = useMutation({
@@ -71,7 +71,7 @@ export interface WardrobeItem {
   updated_at: string;
 }
 
-export type WardrobeList = WardrobeItem[] | { results: WardrobeItem[] };
+export type WardrobeList = WardrobeItem[] | { results: WardrobeItem[]; next?: string | null };
 
 export type ProfileField<T> = NonNullable<T> | "";
 